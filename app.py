@@ -1,7 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import (Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, g, Response,
+                   stream_with_context)
+from jinja2.utils import htmlsafe_json_dumps
 import sqlite3
-import requests
 import random
+import os
+import time
+import hashlib
+import logging
+import plant_model
+import metrics
+from metrics import span, record_cache
+from plant_catalogue import catalogue
+from climate_cache import cell_center
+from model_registry import ModelRegistry
+from inference_service import InferenceClient
+from recommendation_tiles import RecommendationTileStore
+from suitability import quick_recommendations
+from storage import LocationStore, DEFAULT_ROLLUP_INTERVAL
+from plant_images import PlantImageResolver, DEFAULT_THUMBNAIL_DIR, PLACEHOLDER_IMAGE
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Change this to a secure secret key in production
@@ -15,54 +33,325 @@ plant_database = [
     {"name": "Rose", "description": "Classic flowering shrub"},
 ]
 
-def recommend_plants(latitude, longitude):
-    # This is a dummy function. Replace with your actual recommendation logic.
-    return random.sample(plant_database, 3)
+plant_descriptions = {plant["name"]: plant["description"] for plant in plant_database}
 
-def get_plant_image(plant_name):
-    url = f"https://pixabay.com/api/?key=2b10itQ9lIJq3gulBGOljmPyWO&q={plant_name}+plant&image_type=photo&per_page=3"
+# The trained model is loaded once per process and shared by every request.
+# PLANT_MODEL_PRELOAD=1 loads it at import time, so with gunicorn --preload the
+# workers inherit it copy-on-write; PLANT_MODEL_MMAP=r memory-maps its arrays.
+model_registry = ModelRegistry(mmap_mode=os.environ.get('PLANT_MODEL_MMAP') or None)
+if os.environ.get('PLANT_MODEL_PRELOAD') == '1':
+    model_registry.preload()
+first_request_seconds = None
+
+# PLANT_INFERENCE_ADDRESS=socket path (or host:port) sends inference to inference_service.py, which batches
+# requests from every worker; the web workers then never load the model themselves
+inference_client = InferenceClient.from_env()
+
+# Recommendations precomputed per grid tile by recommendation_tiles.py
+tile_store = RecommendationTileStore()
+
+def describe_plant(plant_data):
+    low, high = plant_data['optimal_temperature']
+    ph_low, ph_high = plant_data['optimal_soil_ph']
+    return f"Grows best at {low:g}-{high:g} C in soil with pH {ph_low:g}-{ph_high:g}"
+
+# No usable model artifact and no inference service; fall back to the sample list
+def sample_recommendations():
+    return [{**plant, "score": random.uniform(0.5, 1.0)} for plant in random.sample(plant_database, 3)]
+
+# Version of the model serving recommendations, or None if there is no usable model
+def current_model_version():
+    if inference_client is None:
+        return model_registry.version if model_registry.get() is not None else None
     try:
-        response = requests.get(url)
-        data = response.json()
-        if data['hits'] and len(data['hits']) > 0:
-            return data['hits'][0]['webformatURL']
-    except Exception as e:
-        print(f"Error fetching image for {plant_name}: {str(e)}")
-    return "https://via.placeholder.com/200x200?text=No+Image"
+        return inference_client.current_version()
+    except (ConnectionError, RuntimeError) as e:
+        logger.error(f"Inference service error: {str(e)}")
+    return inference_client.model_version
+
+# Recommendations stored for this tile by recommendation_tiles.py, or None if there are
+# none for this model or they were scored on an outdated climate window
+def precomputed_recommendations(latitude, longitude, model_version, top_k=5):
+    _, window_end = plant_model.power_date_window()
+    with span('tile_lookup'):
+        precomputed = tile_store.get(latitude, longitude, model_version, window_end)
+    record_cache('recommendation_tiles', precomputed is not None)
+    if precomputed is None or len(precomputed) < top_k:
+        return None
+    return [{**rec, 'data': catalogue.get(rec['plant'])} for rec in precomputed[:top_k]
+            if rec['plant'] in catalogue]
+
+# degraded marks rule-based rankings served because the climate fetch failed
+def describe_recommendations(recommendations, degraded=False):
+    return [{
+        "name": str(rec['plant']),
+        "description": plant_descriptions.get(rec['plant']) or describe_plant(rec['data']),
+        "score": float(rec['score']),
+        "degraded": degraded
+    } for rec in recommendations]
+
+# Function to score fetched land data, on the inference service when one is configured
+def score_land_data(land_data, top_k=5):
+    if inference_client is not None:
+        try:
+            return inference_client.recommend_for_land_data(land_data, catalogue, top_k)
+        except (ConnectionError, RuntimeError) as e:
+            logger.error(f"Inference service error: {str(e)}")
+            return []
+    model, imputer, scaler = model_registry.get()
+    return plant_model.recommend_for_land_data(land_data, model, imputer, scaler, catalogue, top_k,
+                                               forest=model_registry.forest)
+
+# Returns (recommendations, stale); stale means NASA POWER was unavailable and the
+# climate data is the last we have for the cell
+def recommend_plants(latitude, longitude, top_k=5):
+    recommendations = recommendations_without_land_data(latitude, longitude, top_k)
+    if recommendations is not None:
+        return recommendations, False
+    return recommend_for_land_data(latitude, longitude, plant_model.get_land_data(latitude, longitude), top_k)
+
+# The steps of recommend_plants either side of fetching the land data, shared with asgi.py.
+# Returns the recommendations when the land data is not needed, or None.
+def recommendations_without_land_data(latitude, longitude, top_k=5):
+    model_version = current_model_version()
+    if model_version is None:
+        # An unreachable inference service gets no recommendations, not the sample list
+        return sample_recommendations() if inference_client is None else []
+    recommendations = precomputed_recommendations(latitude, longitude, model_version, top_k)
+    return describe_recommendations(recommendations) if recommendations is not None else None
+
+# With no land data, because the climate fetch failed or missed its deadline, plants are
+# ranked by the rule-based suitability scorer on any climate data held locally
+def recommend_for_land_data(latitude, longitude, land_data, top_k=5):
+    if land_data is None:
+        with span('suitability_fallback'):
+            recommendations = quick_recommendations(latitude, longitude, catalogue, top_k)
+        return describe_recommendations(recommendations, degraded=True), bool(recommendations)
+    return describe_recommendations(score_land_data(land_data, top_k)), bool(land_data.get('stale'))
+
+# Set PLANT_THUMBNAIL_DIR to keep local copies of plant images and serve them from /thumbnails/
+THUMBNAIL_DIR = os.environ.get('PLANT_THUMBNAIL_DIR')
+image_resolver = PlantImageResolver(thumbnail_dir=THUMBNAIL_DIR)
+
+def get_plant_image(plant_name):
+    return image_resolver.resolve(plant_name)
+
+def get_plant_images(plant_names):
+    return image_resolver.resolve_many(plant_names)
+
+def recommendation_cards(recommendations, images):
+    return [{
+        "name": rec["name"],
+        "description": rec["description"],
+        "image": images[rec["name"]],
+        "score": rec["score"]
+    } for rec in recommendations]
+
+# PLANT_STREAM_RECOMMENDATIONS=1 (or ?stream=1 on one request) sends the recommendations
+# page shell before any upstream call, then streams the cards and their images into it
+STREAM_RECOMMENDATIONS = os.environ.get('PLANT_STREAM_RECOMMENDATIONS') == '1'
+# Shown in place of the cards when a streamed page fails after its 200 was sent
+STREAM_ERROR_MESSAGE = 'Could not load recommendations right now. Please try again later.'
+
+def stream_requested(value):
+    return STREAM_RECOMMENDATIONS if value is None else value == '1'
+
+# The streamed page, split where the updates go: just before </body>
+def recommendations_shell(latitude, longitude):
+    with span('render_template'):
+        html = render_template('recommendations.html', recommendations=[], latitude=latitude, longitude=longitude,
+                               streaming=True)
+    head, tail = html.rsplit('</body>', 1)
+    return head, '</body>' + tail
+
+# Function to wrap one update for the page's receivePlants() in an inline script
+def plant_update_script(update):
+    return f"<script>receivePlants({htmlsafe_json_dumps(update, dumps=app.json.dumps)});</script>\n"
+
+# Function to yield a streamed page's updates: the cards once scored, then each image as it resolves
+def recommendation_updates(latitude, longitude):
+    with span('recommend'):
+        recommendations, stale = recommend_plants(latitude, longitude)
+    yield plants_update(recommendations, stale)
+    for plant_name, image_url in image_resolver.iter_resolved([rec['name'] for rec in recommendations]):
+        yield {'images': {plant_name: image_url}}
+
+# The first update of a streamed page: the cards, with placeholders until their images resolve
+def plants_update(recommendations, stale):
+    return {'plants': recommendation_cards(recommendations, {rec['name']: PLACEHOLDER_IMAGE for rec in recommendations}),
+            'stale': stale}
+
+# Per-thread WAL connections to plants.db; PLANT_DB_WRITE_BEHIND=1 group-commits location inserts
+location_store = LocationStore(write_behind=os.environ.get('PLANT_DB_WRITE_BEHIND') == '1')
+
+# New locations are rolled up for /locations/heatmap on a background thread started by
+# init_db, every PLANT_LOCATION_ROLLUP_INTERVAL seconds; set it to 0 when a cron job runs
+# `python storage.py --maintain plants.db` instead
+LOCATION_ROLLUP_INTERVAL = float(os.environ.get('PLANT_LOCATION_ROLLUP_INTERVAL', DEFAULT_ROLLUP_INTERVAL))
 
 def init_db():
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS user_locations 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  latitude REAL NOT NULL, 
-                  longitude REAL NOT NULL, 
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit()
-    conn.close()
+    location_store.init_db()
+    tile_store.init_db()
+    if LOCATION_ROLLUP_INTERVAL > 0:
+        location_store.start_rollup(LOCATION_ROLLUP_INTERVAL)
 
 def get_db():
-    conn = sqlite3.connect('plants.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def close_db(conn):
-    if conn is not None:
-        conn.close()
+    return location_store.connection()
 
 def save_location(latitude, longitude):
-    conn = None
     try:
-        conn = get_db()
-        c = conn.cursor()
-        c.execute("INSERT INTO user_locations (latitude, longitude) VALUES (?, ?)", (latitude, longitude))
-        conn.commit()
-        return c.lastrowid
+        return location_store.save_location(latitude, longitude)
     except sqlite3.Error as e:
         print(f"Database error: {str(e)}")
         return None
-    finally:
-        close_db(conn)
+
+@app.route('/thumbnails/<path:filename>')
+def plant_thumbnail(filename):
+    return send_from_directory(THUMBNAIL_DIR or DEFAULT_THUMBNAIL_DIR, filename, max_age=7 * 24 * 3600)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# Function to record the current request's latency
+def observe_request(endpoint, status):
+    global first_request_seconds
+    elapsed = time.perf_counter() - g.request_started
+    metrics.request_seconds.observe(elapsed, endpoint=endpoint, status=status)
+    if first_request_seconds is None:
+        first_request_seconds = elapsed
+        app.logger.info(f"First request in pid {os.getpid()} took {first_request_seconds:.3f}s")
+
+@app.after_request
+def record_first_request(response):
+    # Streamed pages record their latency when the stream ends, not when the headers go out
+    if 'request_started' in g and not g.get('streaming'):
+        observe_request(request.endpoint or 'unmatched', str(response.status_code))
+    return response
+
+# Prometheus scrape endpoint; counters and histograms are per worker process
+@app.route('/metrics')
+def metrics_endpoint():
+    text = metrics.registry.render()
+    if inference_client is not None:
+        try:
+            text += inference_client.metrics()
+        except (ConnectionError, RuntimeError) as e:
+            logger.error(f"Inference service error: {str(e)}")
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+@app.route('/model/status')
+def model_status():
+    return jsonify({**model_registry.status(), 'first_request_seconds': first_request_seconds,
+                    'nasa_power_breaker': plant_model.nasa_breaker.status(),
+                    'inference_service': inference_client and {'address': inference_client.address,
+                                                               'model_version': inference_client.model_version}})
+
+# Limits for /api/recommendations query parameters
+API_MAX_TOP_K = 50
+API_MAX_PER_PAGE = 50
+
+# ETag for one API response: same location, model, catalogue, climate window and query means same body
+def recommendations_etag(location_id, location, model_version, *query):
+    _, window_end = plant_model.power_date_window()
+    key = '|'.join(str(part) for part in (location_id, location['latitude'], location['longitude'],
+                                          model_version, catalogue.version, window_end.strftime('%Y%m%d'), *query))
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+@app.route('/api/recommendations/<int:location_id>')
+def api_recommendations(location_id):
+    try:
+        top_k = int(request.args.get('top_k', 5))
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+    except ValueError:
+        return jsonify({'error': 'top_k, page and per_page must be integers'}), 400
+    if not (1 <= top_k <= API_MAX_TOP_K and page >= 1 and 1 <= per_page <= API_MAX_PER_PAGE):
+        return jsonify({'error': f'top_k and per_page must be between 1 and {API_MAX_TOP_K}, page at least 1'}), 400
+    query = request.args.get('q', '').strip().lower()
+
+    with span('sqlite_query'):
+        location = location_store.get_location(location_id)
+    if not location:
+        return jsonify({'error': 'Location not found'}), 404
+
+    # The sample fallback is random, so only model-backed responses get an ETag. A 304 is safe
+    # here because degraded responses below are never tagged.
+    etag = None
+    model_version = current_model_version()
+    if model_version is None and inference_client is not None:
+        return jsonify({'error': 'Inference service unavailable'}), 503
+    if model_version is not None:
+        etag = recommendations_etag(location_id, location, model_version, top_k, query, page, per_page)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+    latitude, longitude = location['latitude'], location['longitude']
+    with span('recommend'):
+        recommendations, stale = recommend_plants(latitude, longitude, top_k)
+    # Same matching as the search box in recommendations.html
+    matches = [rec for rec in recommendations
+               if query in rec['name'].lower() or query in rec['description'].lower()]
+    items = matches[(page - 1) * per_page:page * per_page]
+    with span('plant_images'):
+        images = get_plant_images([rec['name'] for rec in items])
+
+    response = jsonify({
+        'location': {'id': location_id, 'latitude': latitude, 'longitude': longitude},
+        'model_version': model_version,
+        'catalogue_version': catalogue.version,
+        'stale': stale,
+        'degraded': any(rec.get('degraded') for rec in recommendations),
+        'total': len(matches),
+        'page': page,
+        'per_page': per_page,
+        'recommendations': [{**rec, 'image': images[rec['name']]} for rec in items]
+    })
+    # No results, stale climate data or placeholder images come from an upstream outage;
+    # keep them out of caches so clients refetch once it recovers
+    degraded = (not recommendations or stale
+                or any(images[rec['name']] == PLACEHOLDER_IMAGE for rec in items))
+    if etag is not None and not degraded:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Limits for /locations/heatmap query parameters
+HEATMAP_MAX_DAYS = 366
+HEATMAP_MAX_CELLS = 10000
+
+# Where requests come from, per grid cell, read from the user_locations rollups. Read-only:
+# the counts are as of the last rollup (see LOCATION_ROLLUP_INTERVAL).
+@app.route('/locations/heatmap')
+def locations_heatmap():
+    try:
+        days = int(request.args['days']) if 'days' in request.args else None
+        limit = int(request.args.get('limit', HEATMAP_MAX_CELLS))
+        bbox = [float(value) for value in request.args['bbox'].split(',')] if 'bbox' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'days and limit must be integers, bbox four comma-separated numbers'}), 400
+    if days is not None and not 1 <= days <= HEATMAP_MAX_DAYS:
+        return jsonify({'error': f'days must be between 1 and {HEATMAP_MAX_DAYS}'}), 400
+    if not 1 <= limit <= HEATMAP_MAX_CELLS:
+        return jsonify({'error': f'limit must be between 1 and {HEATMAP_MAX_CELLS}'}), 400
+    if bbox is not None and (len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+        return jsonify({'error': 'bbox must be south,west,north,east'}), 400
+
+    try:
+        with span('sqlite_query'):
+            cells = location_store.heatmap(days, bbox, limit)
+    except sqlite3.Error as e:
+        logger.error(f"Database error: {str(e)}")
+        return jsonify({'error': 'Heatmap unavailable'}), 503
+    points = []
+    for cell, count in cells:
+        latitude, longitude = cell_center(cell, location_store.resolution)
+        points.append({'latitude': latitude, 'longitude': longitude, 'count': count})
+    return jsonify({'resolution': location_store.resolution, 'days': days, 'cells': points})
 
 @app.route('/')
 def home():
@@ -91,28 +380,43 @@ def location_select():
 
 @app.route('/recommendations/<int:location_id>')
 def get_recommendations(location_id):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT latitude, longitude FROM user_locations WHERE id = ?", (location_id,))
-    location = c.fetchone()
-    close_db(conn)
+    with span('sqlite_query'):
+        location = location_store.get_location(location_id)
 
     if location:
         latitude, longitude = location['latitude'], location['longitude']
-        recommendations = recommend_plants(latitude, longitude)
-        
-        formatted_recommendations = []
-        for rec in recommendations:
-            plant_name = rec["name"]
-            formatted_rec = {
-                "name": plant_name,
-                "description": rec["description"],
-                "image": get_plant_image(plant_name),
-                "score": random.uniform(0.5, 1.0)  # Dummy score
-            }
-            formatted_recommendations.append(formatted_rec)
+        if stream_requested(request.args.get('stream')):
+            head, tail = recommendations_shell(latitude, longitude)
+
+            def stream_page():
+                try:
+                    yield head
+                    try:
+                        for update in recommendation_updates(latitude, longitude):
+                            yield plant_update_script(update)
+                    except Exception as e:
+                        # The 200 is already sent; show the error on the page and end the stream
+                        logger.error(f"Error streaming recommendations: {str(e)}")
+                        yield plant_update_script({'error': STREAM_ERROR_MESSAGE})
+                    yield plant_update_script({'done': True}) + tail
+                finally:
+                    observe_request('get_recommendations', '200')
+
+            g.streaming = True
+            response = Response(stream_with_context(stream_page()), mimetype='text/html')
+            # Keep proxies such as nginx from buffering the stream
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+
+        with span('recommend'):
+            recommendations, stale = recommend_plants(latitude, longitude)
+        with span('plant_images'):
+            images = get_plant_images([rec["name"] for rec in recommendations])
+        formatted_recommendations = recommendation_cards(recommendations, images)
         
-        return render_template('recommendations.html', recommendations=formatted_recommendations, latitude=latitude, longitude=longitude)
+        with span('render_template'):
+            return render_template('recommendations.html', recommendations=formatted_recommendations, latitude=latitude, longitude=longitude,
+                                   stale=stale)
     else:
         flash('Location not found.', 'error')
         return redirect(url_for('location_select'))
@@ -0,0 +1,295 @@
+import io
+import re
+import sys
+import time
+import asyncio
+import logging
+from urllib.parse import parse_qs
+from flask import render_template
+import plant_model
+import plant_images
+from app import (app, init_db, location_store, image_resolver, recommendations_without_land_data,
+                 recommend_for_land_data, recommendation_cards, plants_update, stream_requested,
+                 recommendations_shell, plant_update_script, STREAM_ERROR_MESSAGE)
+from async_http import AsyncHTTPClient
+import metrics
+from metrics import span
+
+# ASGI entry point: uvicorn asgi:application --workers 2
+# /recommendations/<id> runs on the event loop, with the climate fetch, soil lookup and
+# image lookups overlapping on a non-blocking HTTP client. SQLite lookups run on worker
+# threads. Every other route is the Flask app, called on a worker thread.
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_PATH = re.compile(r'^/recommendations/(\d+)$')
+
+http_client = AsyncHTTPClient()
+
+
+# Function to fetch the daily NASA POWER series without blocking the event loop; the same
+# budget, circuit breaker and error handling as plant_model.fetch_power_daily
+async def fetch_power_daily_async(lat, lon, start_date, end_date, max_retries=3, delay=0.5, deadline=None,
+                                  breaker=plant_model.nasa_breaker):
+    parameters = plant_model.power_request_params(lat, lon, start_date, end_date)
+    budget = plant_model.power_retry_budget(max_retries, delay, deadline)
+    for attempt in budget.attempts():
+        if not plant_model.power_attempt_allowed(breaker):
+            break
+        try:
+            with span('nasa_power_request'):
+                response = await http_client.get(plant_model.NASA_POWER_URL, params=parameters,
+                                                 timeout=budget.timeout())
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            if not plant_model.power_attempt_failed(e, breaker):
+                break
+        else:
+            return plant_model.power_attempt_succeeded(data, breaker)
+        pause = plant_model.power_retry_pause(budget, attempt)
+        if pause is None:
+            break
+        await asyncio.sleep(pause)
+    raise ConnectionError(f"Failed to fetch NASA POWER data within {budget.deadline}s")
+
+# Same lookups as plant_model.get_climate_data, with the NASA POWER request on the event loop
+async def get_climate_data_async(lat, lon):
+    climate_data, found = await asyncio.to_thread(plant_model.local_climate_data, lat, lon)
+    if found:
+        return climate_data
+    cache = plant_model.climate_cache
+    start_date, end_date = plant_model.power_date_window()
+    try:
+        parameter_data = await fetch_power_daily_async(lat, lon, start_date, end_date)
+    except (ValueError, ConnectionError) as e:
+        return await asyncio.to_thread(plant_model.fetch_failed_climate_data, lat, lon, e, cache)
+    return await asyncio.to_thread(plant_model.store_power_averages, lat, lon, start_date, end_date,
+                                   parameter_data, cache)
+
+# Function to fetch climate and soil data concurrently
+async def get_land_data_async(lat, lon):
+    with span('land_data'):
+        climate_data, soil_data = await asyncio.gather(get_climate_data_async(lat, lon),
+                                                       asyncio.to_thread(plant_model.get_soil_data, lat, lon))
+    return plant_model.combine_land_data(climate_data, soil_data)
+
+# Returns (recommendations, stale) like app.recommend_plants
+async def recommend_plants_async(latitude, longitude, top_k=5):
+    recommendations = await asyncio.to_thread(recommendations_without_land_data, latitude, longitude, top_k)
+    if recommendations is not None:
+        return recommendations, False
+    land_data = await get_land_data_async(latitude, longitude)
+    return await asyncio.to_thread(recommend_for_land_data, latitude, longitude, land_data, top_k)
+
+async def fetch_plant_image_async(plant_name):
+    try:
+        with span('pixabay_request'):
+            response = await http_client.get(plant_images.pixabay_url(plant_name), timeout=image_resolver.timeout)
+        # found() may download a thumbnail, so it runs on a worker thread
+        return await asyncio.to_thread(image_resolver.found, plant_name, response.json())
+    except Exception as e:
+        logger.error(f"Error fetching image for {plant_name}: {str(e)}")
+    image_resolver.cache_miss(plant_name)
+    return None
+
+# Same lookups as PlantImageResolver.resolve_many, with the misses fetched on the event loop
+async def get_plant_images_async(plant_names):
+    images = {}
+    missing = []
+    for plant_name in dict.fromkeys(plant_names):
+        image_url = image_resolver._cached(plant_name)
+        if image_url:
+            images[plant_name] = image_url
+        else:
+            missing.append(plant_name)
+
+    if missing:
+        tasks = {asyncio.ensure_future(fetch_plant_image_async(name)): name for name in missing}
+        with span('image_wait'):
+            done, pending = await asyncio.wait(tasks, timeout=image_resolver.deadline)
+        for task in done:
+            images[tasks[task]] = task.result()
+        for task in pending:
+            task.cancel()
+            logger.error(f"Image lookup for {tasks[task]} missed the {image_resolver.deadline}s deadline")
+
+    return {name: images.get(name) or plant_images.PLACEHOLDER_IMAGE for name in plant_names}
+
+# Function to build the /recommendations page; returns (status, headers, body), or None
+# for an unknown location, which the Flask route redirects with its flash message
+async def recommendations_page(location_id):
+    with span('sqlite_query'):
+        location = await asyncio.to_thread(location_store.get_location, location_id)
+    if not location:
+        return None
+
+    latitude, longitude = location['latitude'], location['longitude']
+    with span('recommend'):
+        recommendations, stale = await recommend_plants_async(latitude, longitude)
+    with span('plant_images'):
+        images = await get_plant_images_async([rec["name"] for rec in recommendations])
+
+    with span('render_template'), app.app_context():
+        html = render_template('recommendations.html', recommendations=recommendation_cards(recommendations, images),
+                               latitude=latitude, longitude=longitude, stale=stale)
+    return 200, [(b'content-type', b'text/html; charset=utf-8')], html.encode()
+
+# Function to yield a streamed page's updates, like app.recommendation_updates, with the
+# image lookups on the event loop
+async def recommendation_updates_async(latitude, longitude):
+    with span('recommend'):
+        recommendations, stale = await recommend_plants_async(latitude, longitude)
+    yield plants_update(recommendations, stale)
+    plant_names = list(dict.fromkeys(rec['name'] for rec in recommendations))
+
+    tasks = {}
+    try:
+        for plant_name in plant_names:
+            image_url = image_resolver._cached(plant_name)
+            if image_url:
+                yield {'images': {plant_name: image_url}}
+            else:
+                tasks[asyncio.ensure_future(fetch_plant_image_async(plant_name))] = plant_name
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + image_resolver.deadline
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=deadline - loop.time(),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                yield {'images': {tasks[task]: task.result() or plant_images.PLACEHOLDER_IMAGE}}
+        for task in pending:
+            logger.error(f"Image lookup for {tasks[task]} missed the {image_resolver.deadline}s deadline")
+            yield {'images': {tasks[task]: plant_images.PLACEHOLDER_IMAGE}}
+    finally:
+        # Also reached when the generator is closed early, e.g. the client went away
+        for task in tasks:
+            task.cancel()
+
+# Function to send the /recommendations page shell at once, then stream its updates;
+# returns False, having sent nothing, for an unknown location
+async def stream_recommendations_page(location_id, send):
+    with span('sqlite_query'):
+        location = await asyncio.to_thread(location_store.get_location, location_id)
+    if not location:
+        return False
+
+    latitude, longitude = location['latitude'], location['longitude']
+    with app.app_context():
+        head, tail = recommendations_shell(latitude, longitude)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/html; charset=utf-8'), (b'x-accel-buffering', b'no')]})
+    await send({'type': 'http.response.body', 'body': head.encode(), 'more_body': True})
+    updates = recommendation_updates_async(latitude, longitude)
+    try:
+        while True:
+            try:
+                update = await anext(updates)
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                # The 200 is already sent; show the error on the page and end the stream
+                logger.error(f"Error streaming recommendations: {str(e)}")
+                update = {'error': STREAM_ERROR_MESSAGE}
+            # Raises if the client has disconnected, which ends the stream here
+            await send({'type': 'http.response.body', 'body': plant_update_script(update).encode(), 'more_body': True})
+            if 'error' in update:
+                break
+    finally:
+        await updates.aclose()
+    await send({'type': 'http.response.body', 'body': (plant_update_script({'done': True}) + tail).encode()})
+    return True
+
+# Function to run the Flask app for one ASGI request on a worker thread
+async def call_flask(scope, receive, send):
+    body = []
+    while True:
+        message = await receive()
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body = b''.join(body)
+
+    host, port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': host,
+        'SERVER_PORT': str(port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = value.decode('latin-1')
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    def run():
+        result = app(environ, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    content = await asyncio.to_thread(run)
+    await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.to_thread(init_db)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await http_client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        # No websocket routes; returning without accepting makes the server reject it
+        return
+
+    match = RECOMMENDATIONS_PATH.match(scope['path'])
+    if scope['method'] == 'GET' and match:
+        # Flask's before/after_request hooks do not run here, so record the request metric directly
+        started = time.perf_counter()
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if stream_requested(query.get('stream', [None])[-1]):
+            if await stream_recommendations_page(int(match.group(1)), send):
+                metrics.request_seconds.observe(time.perf_counter() - started, endpoint='get_recommendations',
+                                                status='200')
+                return
+        else:
+            page = await recommendations_page(int(match.group(1)))
+            if page is not None:
+                status, headers, body = page
+                await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                await send({'type': 'http.response.body', 'body': body})
+                metrics.request_seconds.observe(time.perf_counter() - started, endpoint='get_recommendations',
+                                                status=str(status))
+                return
+    await call_flask(scope, receive, send)
@@ -0,0 +1,155 @@
+import ssl
+import json
+import asyncio
+import logging
+from urllib.parse import urlsplit, urlencode
+import requests
+from http_client import outbound_requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_PER_HOST = 20
+
+
+# A requests HTTPError, so plant_model's retry handling treats both clients' errors alike
+class HTTPError(requests.exceptions.HTTPError):
+    def __init__(self, response):
+        super().__init__(f"{response.status} error for {response.url}", response=response)
+
+
+class AsyncResponse:
+    def __init__(self, url, status, headers, content):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def status_code(self):
+        return self.status
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self)
+
+
+# Minimal non-blocking HTTP/1.1 GET client on asyncio streams. Connections are kept alive
+# in a pool per host and reused; a per-host semaphore caps concurrent requests (and so the
+# pool size), and concurrent GETs for the same URL share one request, as in
+# http_client.HTTPClient.
+class AsyncHTTPClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_per_host=DEFAULT_MAX_PER_HOST):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self._ssl = ssl.create_default_context()
+        self._host_limits = {}
+        self._in_flight = {}
+        # (host, port, secure) -> idle (reader, writer) pairs, most recently used last
+        self._idle = {}
+
+    def _limit(self, host):
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    async def get(self, url, params=None, timeout=None):
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(sorted(params.items()))}"
+        task = self._in_flight.get(url)
+        if task is None:
+            task = self._in_flight[url] = asyncio.ensure_future(self._get(url, timeout))
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        else:
+            outbound_requests.inc(host=urlsplit(url).netloc, result='coalesced')
+        # shield: a caller that gives up must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _get(self, url, timeout):
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        async with self._limit((parts.hostname, port)):
+            outbound_requests.inc(host=parts.netloc, result='sent')
+            return await asyncio.wait_for(self._request(url, parts, port, secure),
+                                          self.timeout if timeout is None else timeout)
+
+    async def _request(self, url, parts, port, secure):
+        key = (parts.hostname, port, secure)
+        idle = self._idle.setdefault(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if reader.at_eof() or writer.is_closing():
+                writer.close()
+                continue
+            try:
+                return await self._exchange(key, reader, writer, url, parts)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                # The server closed the idle connection first; GET is safe to resend
+                logger.debug(f"Pooled connection to {parts.netloc} failed ({e!r}); reconnecting")
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=self._ssl if secure else None)
+        return await self._exchange(key, reader, writer, url, parts)
+
+    # Send one request on a connection and read its response; the connection goes back
+    # to the pool only if the whole response was read and neither side asked to close
+    async def _exchange(self, key, reader, writer, url, parts):
+        reusable = False
+        try:
+            target = parts.path or '/'
+            if parts.query:
+                target += '?' + parts.query
+            writer.write((f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                          f"Accept: application/json\r\n\r\n").encode('latin-1'))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError(f"Connection to {parts.netloc} closed before the response")
+            version, status = status_line.split(None, 2)[:2]
+            status = int(status)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            if status in (204, 304) or status < 200:
+                content = b''
+            elif headers.get('transfer-encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if size == 0:
+                        # Skip any trailer fields up to the blank line that ends the response
+                        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                            pass
+                        break
+                    chunks.append(await reader.readexactly(size))
+                    await reader.readline()
+                content = b''.join(chunks)
+            elif 'content-length' in headers:
+                content = await reader.readexactly(int(headers['content-length']))
+            else:
+                # The body runs to the end of the connection
+                content = await reader.read()
+                keep_alive = False
+            reusable = keep_alive
+            return AsyncResponse(url, status, headers, content)
+        finally:
+            if reusable:
+                self._idle[key].append((reader, writer))
+            else:
+                writer.close()
+
+    async def close(self):
+        for idle in self._idle.values():
+            for reader, writer in idle:
+                writer.close()
+            idle.clear()
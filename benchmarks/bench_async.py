@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger('benchmarks')
+
+
+# Function to train a small model in the working directory under the default artifact name
+def make_model(workdir, rows=5_000):
+    import plant_model
+    from bench_plant_model import make_historical_csv
+    csv_path = make_historical_csv(os.path.join(workdir, 'historical.csv'), rows)
+    X, y = plant_model.prepare_data(plant_model.load_historical_data(csv_path), plant_model.plant_database)
+    model, imputer, scaler = plant_model.train_model(X, y, n_estimators=50)
+    plant_model.save_model(model, imputer, scaler)
+
+# Function to save one location per climate cell so every request misses the climate cache
+def make_locations(location_store, count, offset):
+    return [location_store.save_location(-60 + (offset + i) * 0.2 % 120, -170 + (offset + i) // 600 * 0.2)
+            for i in range(count)]
+
+# Function to serve requests through the Flask app with a fixed number of worker threads
+def run_sync(app, location_ids, workers):
+    def fetch(location_id):
+        response = app.test_client().get(f"/recommendations/{location_id}")
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(fetch, location_ids))
+    return time.perf_counter() - start, statuses
+
+# Function to serve requests through the ASGI application on one event loop
+def run_async(application, location_ids, concurrency):
+    async def fetch(location_id, limit):
+        async with limit:
+            scope = {'type': 'http', 'method': 'GET', 'path': f"/recommendations/{location_id}",
+                     'query_string': b'', 'headers': []}
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await application(scope, receive, send)
+            return messages[0]['status']
+
+    async def run_all():
+        limit = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(fetch(location_id, limit) for location_id in location_ids))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(run_all())
+    return time.perf_counter() - start, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare throughput of the sync and async recommendation paths')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8, help='threads serving the sync path')
+    parser.add_argument('--concurrency', type=int, default=200, help='requests in flight on the async path')
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds the upstream stub waits per request')
+    parser.add_argument('--output', default='bench_async.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_async_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from nasa_stub import NasaPowerStub
+        stub = NasaPowerStub(latency=args.latency).start()
+        import plant_model
+        import plant_images
+        plant_model.NASA_POWER_URL = stub.base_url
+        # Image lookups hit the stub too (as unknown paths), so both upstreams cost the same latency
+        plant_images.PIXABAY_URL = stub.base_url.rsplit('/api/', 1)[0] + '/pixabay?q={plant_name}'
+        make_model(workdir)
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+        import app
+        import asgi
+        app.init_db()
+
+        sync_ids = make_locations(app.location_store, args.requests, 0)
+        async_ids = make_locations(app.location_store, args.requests, args.requests)
+        app.model_registry.get()
+
+        sync_seconds, sync_statuses = run_sync(app.app, sync_ids, args.workers)
+        async_seconds, async_statuses = run_async(asgi.application, async_ids, args.concurrency)
+        stub.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'requests': args.requests,
+        'upstream_latency': args.latency,
+        'sync': {'workers': args.workers, 'seconds': sync_seconds, 'requests_per_second': args.requests / sync_seconds,
+                 'ok': sync_statuses.count(200)},
+        'async': {'concurrency': args.concurrency, 'seconds': async_seconds,
+                  'requests_per_second': args.requests / async_seconds, 'ok': async_statuses.count(200)}
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"sync ({args.workers} workers): {report['sync']['requests_per_second']:.1f} req/s; "
+                f"async (concurrency {args.concurrency}): {report['async']['requests_per_second']:.1f} req/s; "
+                f"results in {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger('benchmarks')
+
+
+# Function to send single-row predictions from client threads, one connection per thread
+# like the web workers; returns (seconds, per-request latencies)
+def run_clients(address, rows, clients):
+    from inference_service import InferenceClient
+    client = InferenceClient(address)
+    client.info()
+
+    def predict(row):
+        start = time.perf_counter()
+        client.predict_proba(row[None, :])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = list(executor.map(predict, rows))
+    return time.perf_counter() - start, latencies
+
+# Function to start a service with one batching configuration and measure it
+def measure(rows, clients, workers, window_ms, max_batch):
+    from inference_service import InferenceService, batch_size
+    service = InferenceService(('127.0.0.1', 0), workers=workers, window_ms=window_ms, max_batch=max_batch).start()
+    batches_before = batch_size.count()
+    try:
+        seconds, latencies = run_clients(service.address, rows, clients)
+    finally:
+        service.close()
+    batches = batch_size.count() - batches_before
+    return {
+        'window_ms': window_ms,
+        'max_batch': max_batch,
+        'seconds': seconds,
+        'requests_per_second': len(rows) / seconds,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'batches': batches,
+        'mean_batch_size': len(rows) / batches if batches else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the micro-batched inference service with per-request inference')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=32, help='client threads sending requests concurrently')
+    parser.add_argument('--workers', type=int, default=1, help='inference pool processes')
+    parser.add_argument('--window-ms', type=float, default=5.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--output', default='bench_inference_service.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_inference_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from bench_async import make_model
+        from plant_model import FEATURE_COLUMNS
+        make_model(workdir)
+        rows = np.random.default_rng(0).uniform(0, 100, (args.requests, len(FEATURE_COLUMNS)))
+
+        per_request = measure(rows, args.clients, args.workers, 0.0, 1)
+        batched = measure(rows, args.clients, args.workers, args.window_ms, args.max_batch)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'requests': args.requests, 'clients': args.clients, 'workers': args.workers,
+              'per_request': per_request, 'batched': batched}
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for name, result in (('per-request', per_request), ('batched', batched)):
+        logger.info(f"{name}: {result['requests_per_second']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                    f"p99 {result['p99_ms']:.1f} ms, mean batch {result['mean_batch_size']:.1f}")
+    logger.info(f"Results in {output}")
+
+if __name__ == "__main__":
+    main()
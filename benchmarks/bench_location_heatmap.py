@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import logging
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+logger = logging.getLogger('benchmarks')
+
+
+# Function to insert synthetic locations clustered around a few cities, spread over the last year
+def fill_locations(store, rows, seed=42):
+    rng = np.random.default_rng(seed)
+    cities = rng.uniform([-50, -170], [60, 170], (200, 2))
+    points = cities[rng.integers(0, len(cities), rows)] + rng.normal(0, 0.5, (rows, 2))
+    ages = rng.uniform(0, 365 * 86400, rows)
+    created = [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - age)) for age in ages]
+    conn = store.connection()
+    with conn:
+        conn.executemany('INSERT INTO user_locations (latitude, longitude, created_at) VALUES (?, ?, ?)',
+                         zip(points[:, 0].tolist(), points[:, 1].tolist(), created))
+
+# Function to count requests per cell the way popular_tiles used to: a scan of every row
+def full_scan_counts(store):
+    counts = {}
+    for latitude, longitude in store.connection().execute('SELECT latitude, longitude FROM user_locations'):
+        cell = (round(latitude / store.resolution), round(longitude / store.resolution))
+        counts[cell] = counts.get(cell, 0) + 1
+    return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+# Function to time one stage, returning (seconds, result)
+def timed(stage):
+    start = time.perf_counter()
+    result = stage()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-cell demand from raw user_locations and from rollups')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--new-rows', type=int, default=1000, help='rows added before the incremental rollup')
+    parser.add_argument('--retention-days', type=int, default=90)
+    parser.add_argument('--output', default='bench_location_heatmap.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    from storage import LocationStore
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocationStore(os.path.join(tmp, 'plants.db'))
+        store.init_db()
+        fill_locations(store, args.rows)
+
+        results['full_scan'], scanned = timed(lambda: full_scan_counts(store))
+        results['initial_rollup'], _ = timed(store.rollup)
+        results['heatmap_all_time'], cells = timed(store.heatmap)
+        results['heatmap_7_days'], _ = timed(lambda: store.heatmap(days=7))
+        fill_locations(store, args.new_rows, seed=7)
+        results['incremental_rollup'], _ = timed(store.rollup)
+        results['prune'], deleted = timed(lambda: store.prune(args.retention_days))
+        results['heatmap_after_prune'], _ = timed(store.heatmap)
+        cell_count = len(cells)
+
+    report = {'rows': args.rows, 'cells': cell_count, 'pruned_rows': deleted,
+              'full_scan_cells_match': len(scanned) == cell_count, 'seconds': results}
+    with open(os.path.abspath(args.output), 'w') as f:
+        json.dump(report, f, indent=2)
+    for stage, seconds in results.items():
+        logger.info(f"{stage}: {seconds * 1000:.1f} ms")
+    logger.info(f"{args.rows} rows in {cell_count} cells; pruned {deleted}; results in {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+logger = logging.getLogger('benchmarks')
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+# Function to call get_nasa_power_data for every cell concurrently and summarise latency
+def run_phase(plant_model, cells, threads):
+    def call(cell):
+        start = time.perf_counter()
+        result = plant_model.get_nasa_power_data(*cell)
+        return time.perf_counter() - start, result
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = list(executor.map(call, cells))
+    latencies = [seconds for seconds, _ in outcomes]
+    return {
+        'calls': len(outcomes),
+        'fresh': sum(1 for _, r in outcomes if r is not None and not r.get('stale')),
+        'stale': sum(1 for _, r in outcomes if r is not None and r.get('stale')),
+        'failed': sum(1 for _, r in outcomes if r is None),
+        'p50_seconds': percentile(latencies, 0.5),
+        'p99_seconds': percentile(latencies, 0.99),
+        'max_seconds': max(latencies)
+    }
+
+# Function to move every cached window into the past, so lookups miss but stale data remains
+def age_cache(cache):
+    conn = cache._connect()
+    conn.execute("UPDATE climate_cache SET start_date = 'aged-' || rowid WHERE start_date NOT LIKE 'aged-%'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure NASA POWER call latency during injected upstream outages')
+    parser.add_argument('--cells', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--deadline', type=float, default=3.0, help='NASA_POWER_DEADLINE for the run')
+    parser.add_argument('--hang', type=float, default=30.0, help='stub latency during the slow-upstream phase')
+    parser.add_argument('--output', default='bench_nasa_outage.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_outage_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from nasa_stub import NasaPowerStub
+        import plant_model
+        stub = NasaPowerStub().start()
+        plant_model.NASA_POWER_URL = stub.base_url
+        plant_model.NASA_POWER_DEADLINE = args.deadline
+        plant_model.NASA_POWER_ATTEMPT_TIMEOUT = args.deadline / 2
+        breaker = plant_model.nasa_breaker
+        cells = [(-60 + i * 0.2 % 120, 10 + i // 600 * 0.2) for i in range(args.cells)]
+
+        results = {'healthy': run_phase(plant_model, cells, args.threads)}
+        age_cache(plant_model.climate_cache)
+
+        phases = [('errors', {'failure_rate': 1.0}), ('hang', {'latency': args.hang}),
+                  ('recovered', {'failure_rate': 0.0, 'latency': 0.0})]
+        for name, settings in phases:
+            for key, value in settings.items():
+                setattr(stub, key, value)
+            if name == 'recovered':
+                # Let the breaker reach half-open so the probe can close it
+                time.sleep(max(0.0, breaker.reset_timeout - (time.monotonic() - (breaker.opened_at or 0))))
+            else:
+                # Each outage phase starts from a closed breaker, so it shows both the
+                # deadline-bounded attempts and the fail-fast calls after the breaker opens
+                breaker.record_success()
+            requests_before = stub.request_count
+            results[name] = run_phase(plant_model, cells, args.threads)
+            results[name]['upstream_requests'] = stub.request_count - requests_before
+            results[name]['breaker'] = breaker.status()
+            age_cache(plant_model.climate_cache)
+        stub.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump({'deadline': args.deadline, 'results': results}, f, indent=2)
+    for name, phase in results.items():
+        logger.info(f"{name:10} p50 {phase['p50_seconds']:.3f}s p99 {phase['p99_seconds']:.3f}s "
+                    f"max {phase['max_seconds']:.3f}s fresh {phase['fresh']} stale {phase['stale']} "
+                    f"failed {phase['failed']} upstream {phase.get('upstream_requests', '-')}")
+    logger.info(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
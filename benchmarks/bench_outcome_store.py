@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import logging
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger('benchmarks')
+
+
+# Function to load training data from the CSV and from the outcome store, all months and one month
+def run_suite(workdir, rows, months, repeats, append_rows):
+    os.chdir(workdir)
+    import plant_model
+    from outcome_store import OutcomeStore
+    from bench_plant_model import make_historical_csv, measure
+
+    csv_path = make_historical_csv(os.path.join(workdir, 'historical.csv'), rows)
+    store = OutcomeStore(os.path.join(workdir, 'outcome_store'))
+    data = pd.read_csv(csv_path)
+    for i, part in enumerate(range(0, rows, rows // months)):
+        store.append(data.iloc[part:part + rows // months], f"{2024 + i // 12}-{i % 12 + 1:02d}", 'europe')
+    last_month = f"{2024 + (months - 1) // 12}-{(months - 1) % 12 + 1:02d}"
+
+    results = {}
+    results['csv_full'], _ = measure(lambda: plant_model.prepare_data(plant_model.load_historical_data(csv_path),
+                                                                      plant_model.plant_database), repeats)
+    results['store_full'], _ = measure(lambda: plant_model.prepare_data_from_store(store, plant_model.plant_database),
+                                       repeats)
+    results['store_one_month'], _ = measure(lambda: plant_model.prepare_data_from_store(
+        store, plant_model.plant_database, start=last_month, end=last_month), repeats)
+    batch = pd.read_csv(make_historical_csv(os.path.join(workdir, 'batch.csv'), append_rows, seed=7))
+    results[f"append_{append_rows}"], _ = measure(lambda: store.append(batch, last_month, 'europe'), 1, memory=False)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare training reads from the outcomes CSV and the outcome store')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--months', type=int, default=12, help='partitions the rows are spread over')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--append-rows', type=int, default=1000)
+    parser.add_argument('--output', default='bench_outcome_store.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_outcomes_')
+    cwd = os.getcwd()
+    try:
+        results = run_suite(workdir, args.rows, args.months, args.repeats, args.append_rows)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump({'rows': args.rows, 'months': args.months, 'results': results}, f, indent=2)
+    for key, result in results.items():
+        peak = f", peak {result['peak_bytes'] / 2**20:.1f} MiB" if result['peak_bytes'] is not None else ''
+        logger.info(f"{key}: {result['seconds']:.4f}s{peak}")
+    logger.info(f"Results in {output}")
+
+if __name__ == "__main__":
+    main()
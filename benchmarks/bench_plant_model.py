@@ -0,0 +1,170 @@
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import logging
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+logger = logging.getLogger('benchmarks')
+
+
+# Function to write a synthetic historical outcomes CSV in the style of aa.py
+def make_historical_csv(path, rows, seed=42):
+    rng = np.random.default_rng(seed)
+    plants = np.array(['Tomato', 'Lettuce', 'Carrot', 'Cucumber', 'Pepper', 'Wheat', 'Rice', 'Maize'])
+    data = {
+        'plant_name': plants[rng.integers(0, len(plants), rows)],
+        'avg_temperature': rng.normal(22, 4, rows).round(1),  # °C
+        'avg_precipitation': rng.gamma(4, 35, rows).round(1),  # mm
+        'avg_solar_radiation': rng.normal(230, 25, rows).round(1),  # W/m²
+        'avg_humidity': rng.uniform(40, 90, rows).round(1),  # %
+        'avg_wind_speed': rng.gamma(2, 1.2, rows).round(2),  # m/s
+        'avg_soil_moisture': rng.uniform(0.15, 0.45, rows).round(3),  # fraction
+        'clay_content': rng.uniform(5, 40, rows).round(1),  # %
+        'sand_content': rng.uniform(15, 45, rows).round(1),  # %
+        'silt_content': rng.uniform(25, 60, rows).round(1),  # %
+        'soil_ph': rng.normal(6.5, 0.5, rows).round(2),  # pH
+        'soil_organic_carbon': rng.uniform(1, 5, rows).round(2),  # %
+        'successful_plant': rng.integers(0, 2, rows)  # 1 = success, 0 = failure
+    }
+    pd.DataFrame(data).to_csv(path, index=False)
+    return path
+
+# Function to run one stage, timing it, then optionally run it again under tracemalloc for peak memory
+def measure(stage, repeats=1, memory=True):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = stage()
+        timings.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        stage()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}, result
+
+# Function to run every stage at every size and return {"stage@rows": measurement}
+def run_suite(workdir, sizes, train_max_rows=100_000, repeats=5, memory=True):
+    # plant_model opens its climate cache relative to the working directory,
+    # so import it from inside the scratch directory
+    os.chdir(workdir)
+    import plant_model
+    from nasa_stub import NasaPowerStub
+
+    results = {}
+    stub = NasaPowerStub().start()
+    plant_model.NASA_POWER_URL = stub.base_url
+    try:
+        for rows in sizes:
+            csv_path = make_historical_csv(os.path.join(workdir, f"historical_{rows}.csv"), rows)
+            stage_repeats = repeats if rows <= 100_000 else 1
+
+            results[f"load_historical_data@{rows}"], historical = measure(
+                lambda: plant_model.load_historical_data(csv_path), stage_repeats, memory)
+            results[f"prepare_data@{rows}"], (X, y) = measure(
+                lambda: plant_model.prepare_data(historical, plant_model.plant_database), stage_repeats, memory)
+
+            train_rows = min(rows, train_max_rows)
+            results[f"train_model@{train_rows}"], trained = measure(
+                lambda: plant_model.train_model(X[:train_rows], y[:train_rows]), 1, memory)
+
+            filename = os.path.join(workdir, f"model_{train_rows}")
+            plant_model.save_model(*trained, filename=filename)
+            results[f"load_model@{train_rows}"], (model, imputer, scaler) = measure(
+                lambda: plant_model.load_model(filename), stage_repeats, memory)
+
+            def recommend_cold():
+                plant_model.climate_cache.clear()
+                return plant_model.recommend_plants(40.7128, -74.0060, model, imputer, scaler,
+                                                    plant_model.plant_database)
+            results[f"recommend_plants_cold@{train_rows}"], _ = measure(recommend_cold, stage_repeats, memory)
+            results[f"recommend_plants_warm@{train_rows}"], _ = measure(
+                lambda: plant_model.recommend_plants(40.7128, -74.0060, model, imputer, scaler,
+                                                     plant_model.plant_database), repeats, memory)
+            for key in list(results)[-6:]:
+                logger.info(f"{key}: {results[key]['seconds']:.4f}s, peak {results[key]['peak_bytes']} bytes")
+    finally:
+        stub.stop()
+    return results
+
+# Function to list stages that got slower than the baseline by more than the tolerance
+def compare(results, baseline, tolerance=0.2):
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get('results', {}).get(key)
+        if previous is None:
+            continue
+        ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        logger.info(f"{status:10} {key}: {previous['seconds']:.4f}s -> {current['seconds']:.4f}s ({ratio:.2f}x)")
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the plant_model hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='historical dataset sizes in rows (up to 10000000)')
+    parser.add_argument('--train-max-rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_')
+    cwd = os.getcwd()
+    try:
+        results = run_suite(workdir, args.sizes, args.train_max_rows, args.repeats, not args.no_memory)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {output}")
+
+    if args.save_baseline:
+        shutil.copy(output, baseline_path)
+        logger.info(f"Baseline saved to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            logger.error(f"{len(regressions)} stages regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
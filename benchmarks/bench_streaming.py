@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+import logging
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger('benchmarks')
+
+# First bytes of the card data in each kind of page
+BUFFERED_CARD_MARKER = b'const plants = [{'
+STREAMED_CARD_MARKER = b'receivePlants({"plants": [{'
+
+
+# Function to GET one page over HTTP and time the first byte, the first card and the last byte
+def fetch_page(port, path, marker):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    conn.request('GET', path)
+    response = conn.getresponse()
+    body = b''
+    first_byte = first_card = None
+    while True:
+        chunk = response.read1(65536)
+        if not chunk:
+            break
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        body += chunk
+        if first_card is None and marker in body:
+            first_card = time.perf_counter() - start
+    total = time.perf_counter() - start
+    conn.close()
+    return {'status': response.status, 'ttfb': first_byte, 'first_card': first_card, 'total': total}
+
+# Function to summarise one mode's timings as medians
+def summarise(samples):
+    return {key: statistics.median(sample[key] for sample in samples) for key in ('ttfb', 'first_card', 'total')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare TTFB and time-to-first-card of the buffered and streamed pages')
+    parser.add_argument('--requests', type=int, default=10, help='page loads per mode')
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds the upstream stub waits per request')
+    parser.add_argument('--output', default='bench_streaming.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='plant_bench_streaming_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from werkzeug.serving import make_server
+        from nasa_stub import NasaPowerStub
+        from bench_async import make_model, make_locations
+        stub = NasaPowerStub(latency=args.latency).start()
+        import plant_model
+        import plant_images
+        plant_model.NASA_POWER_URL = stub.base_url
+        # Image lookups hit the stub too (as unknown paths), so they cost the same latency
+        plant_images.PIXABAY_URL = stub.base_url.rsplit('/api/', 1)[0] + '/pixabay?q={plant_name}'
+        make_model(workdir)
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+        import app
+        app.init_db()
+        app.model_registry.get()
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # Every load uses a new climate cell, so each one waits on the upstreams
+        location_ids = make_locations(app.location_store, 2 * args.requests, 0)
+        buffered = [fetch_page(server.server_port, f"/recommendations/{location_id}?stream=0", BUFFERED_CARD_MARKER)
+                    for location_id in location_ids[:args.requests]]
+        streamed = [fetch_page(server.server_port, f"/recommendations/{location_id}?stream=1", STREAMED_CARD_MARKER)
+                    for location_id in location_ids[args.requests:]]
+        server.shutdown()
+        stub.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'requests': args.requests, 'upstream_latency': args.latency,
+              'buffered': summarise(buffered), 'streamed': summarise(streamed),
+              'ok': sum(sample['status'] == 200 for sample in buffered + streamed)}
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for mode in ('buffered', 'streamed'):
+        logger.info(f"{mode}: TTFB {report[mode]['ttfb'] * 1000:.0f} ms, first card {report[mode]['first_card'] * 1000:.0f} ms, "
+                    f"complete {report[mode]['total'] * 1000:.0f} ms")
+    logger.info(f"Results in {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from climate_cache import grid_cell, cell_center, DEFAULT_RESOLUTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGGREGATES_PATH = 'climate_aggregates.db'
+WINDOW_DAYS = 365
+FILL_VALUE = -999
+DAY_FORMAT = '%Y%m%d'
+
+
+# Running climate sums per grid cell. Daily values inside the trailing window are
+# kept so the window can roll forward one day at a time; monthly sums are kept for
+# every day ever fetched, which gives seasonal aggregates and multi-year normals.
+class ClimateAggregateStore:
+    def __init__(self, fetch, parameters, path=DEFAULT_AGGREGATES_PATH, resolution=DEFAULT_RESOLUTION,
+                 refresh_interval=3600):
+        # fetch(lat, lon, start_date, end_date) returns {parameter: {'YYYYMMDD': value}}
+        self.fetch = fetch
+        # parameters maps feature names (avg_temperature, ...) to NASA POWER parameters
+        self.features = list(parameters)
+        self.parameters = list(parameters.values())
+        self.path = path
+        self.resolution = resolution
+        # get() checks a cell for new days at most this often (seconds) per process
+        self.refresh_interval = refresh_interval
+        self._last_refresh = {}
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        values = ', '.join(f"{p} REAL NOT NULL" for p in self.parameters)
+        sums = ', '.join(f"sum_{p} REAL NOT NULL DEFAULT 0" for p in self.parameters)
+        conn = self._connect()
+        with conn:
+            conn.execute(f'''CREATE TABLE IF NOT EXISTS climate_days
+                             (cell_lat INTEGER NOT NULL, cell_lon INTEGER NOT NULL, day TEXT NOT NULL,
+                              {values}, PRIMARY KEY (cell_lat, cell_lon, day))''')
+            conn.execute(f'''CREATE TABLE IF NOT EXISTS climate_windows
+                             (cell_lat INTEGER NOT NULL, cell_lon INTEGER NOT NULL,
+                              start_day TEXT NOT NULL, end_day TEXT NOT NULL, history_start TEXT NOT NULL,
+                              count INTEGER NOT NULL DEFAULT 0, {sums},
+                              PRIMARY KEY (cell_lat, cell_lon))''')
+            conn.execute(f'''CREATE TABLE IF NOT EXISTS climate_monthly
+                             (cell_lat INTEGER NOT NULL, cell_lon INTEGER NOT NULL,
+                              year INTEGER NOT NULL, month INTEGER NOT NULL,
+                              count INTEGER NOT NULL DEFAULT 0, {sums},
+                              PRIMARY KEY (cell_lat, cell_lon, year, month))''')
+
+    # Turn a NASA POWER response into sorted (day, values) rows up to the last complete day.
+    # Days with a fill value before that are skipped (the window averages the days it has);
+    # NASA publishes the last few days late, so the trailing incomplete days are refetched.
+    def _complete_days(self, parameter_data):
+        days = sorted(parameter_data[self.parameters[0]])
+        rows = []
+        skipped = 0
+        for day in days:
+            values = [parameter_data[p].get(day, FILL_VALUE) for p in self.parameters]
+            if any(value is None or value == FILL_VALUE for value in values):
+                skipped += 1
+                continue
+            rows.append((day, values))
+        if rows:
+            gaps = skipped - sum(1 for day in days if day > rows[-1][0])
+            if gaps:
+                logger.info(f"Skipped {gaps} days with fill values before {rows[-1][0]}")
+        return rows
+
+    def _add_monthly(self, conn, cell, rows):
+        months = {}
+        for day, values in rows:
+            key = (int(day[:4]), int(day[4:6]))
+            count, sums = months.get(key, (0, [0.0] * len(values)))
+            months[key] = (count + 1, [s + v for s, v in zip(sums, values)])
+        sum_columns = ', '.join(f"sum_{p}" for p in self.parameters)
+        updates = ', '.join(f"sum_{p} = sum_{p} + excluded.sum_{p}" for p in self.parameters)
+        placeholders = ', '.join('?' * len(self.parameters))
+        conn.executemany(f'''INSERT INTO climate_monthly (cell_lat, cell_lon, year, month, count, {sum_columns})
+                             VALUES (?, ?, ?, ?, ?, {placeholders})
+                             ON CONFLICT (cell_lat, cell_lon, year, month)
+                             DO UPDATE SET count = count + excluded.count, {updates}''',
+                         [(cell[0], cell[1], year, month, count, *sums)
+                          for (year, month), (count, sums) in months.items()])
+
+    # Fetch only the days missing since the last refresh and roll the window forward
+    def refresh(self, lat, lon, today=None):
+        cell = grid_cell(lat, lon, self.resolution)
+        center_lat, center_lon = cell_center(cell, self.resolution)
+        today = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        target_end = today - timedelta(days=1)
+
+        conn = self._connect()
+        window = conn.execute('SELECT start_day, end_day FROM climate_windows WHERE cell_lat = ? AND cell_lon = ?',
+                              cell).fetchone()
+        if window is None:
+            fetch_start = target_end - timedelta(days=WINDOW_DAYS - 1)
+        else:
+            fetch_start = datetime.strptime(window[1], DAY_FORMAT) + timedelta(days=1)
+        if fetch_start > target_end:
+            return 0
+
+        rows = self._complete_days(self.fetch(center_lat, center_lon, fetch_start, target_end))
+        if not rows:
+            logger.info(f"No new complete days for cell {cell} since {fetch_start.strftime('%Y-%m-%d')}")
+            return 0
+
+        new_end = rows[-1][0]
+        new_start = (datetime.strptime(new_end, DAY_FORMAT) - timedelta(days=WINDOW_DAYS - 1)).strftime(DAY_FORMAT)
+        placeholders = ', '.join('?' * len(self.parameters))
+        sum_list = ', '.join(f"COALESCE(SUM({p}), 0)" for p in self.parameters)
+        with conn:
+            # Another worker may have refreshed this cell while we fetched; under the write
+            # lock, re-read the window and keep only the days it does not have yet
+            conn.execute('BEGIN IMMEDIATE')
+            window = conn.execute('SELECT end_day FROM climate_windows WHERE cell_lat = ? AND cell_lon = ?',
+                                  cell).fetchone()
+            if window is not None:
+                rows = [row for row in rows if row[0] > window[0]]
+                if not rows:
+                    return 0
+            if window is None:
+                conn.execute('''INSERT INTO climate_windows (cell_lat, cell_lon, start_day, end_day, history_start)
+                                VALUES (?, ?, ?, ?, ?)''', (cell[0], cell[1], rows[0][0], rows[0][0], rows[0][0]))
+            conn.executemany(f'''INSERT OR REPLACE INTO climate_days (cell_lat, cell_lon, day, {', '.join(self.parameters)})
+                                 VALUES (?, ?, ?, {placeholders})''',
+                             [(cell[0], cell[1], day, *values) for day, values in rows])
+            self._add_monthly(conn, cell, rows)
+
+            # Days that slid out of the window are subtracted, then dropped
+            dropped = conn.execute(f'''SELECT COUNT(*), {sum_list} FROM climate_days
+                                       WHERE cell_lat = ? AND cell_lon = ? AND day < ?''',
+                                   (cell[0], cell[1], new_start)).fetchone()
+            conn.execute('DELETE FROM climate_days WHERE cell_lat = ? AND cell_lon = ? AND day < ?',
+                         (cell[0], cell[1], new_start))
+            added = [sum(values[i] for _, values in rows) for i in range(len(self.parameters))]
+            updates = ', '.join(f"sum_{p} = sum_{p} + ? - ?" for p in self.parameters)
+            params = [v for pair in zip(added, dropped[1:]) for v in pair]
+            conn.execute(f'''UPDATE climate_windows SET start_day = ?, end_day = ?, count = count + ? - ?, {updates}
+                             WHERE cell_lat = ? AND cell_lon = ?''',
+                         (new_start, new_end, len(rows), dropped[0], *params, cell[0], cell[1]))
+        logger.info(f"Added {len(rows)} days to cell {cell}; window now ends {new_end}")
+        return len(rows)
+
+    def averages(self, lat, lon):
+        cell = grid_cell(lat, lon, self.resolution)
+        sum_columns = ', '.join(f"sum_{p}" for p in self.parameters)
+        row = self._connect().execute(f'''SELECT count, {sum_columns} FROM climate_windows
+                                          WHERE cell_lat = ? AND cell_lon = ?''', cell).fetchone()
+        if row is None or row[0] == 0:
+            return None
+        return {feature: total / row[0] for feature, total in zip(self.features, row[1:])}
+
+    # Refresh the cell, then return its trailing-window averages. A failed refresh counts
+    # as an attempt too, so an unavailable upstream is retried once per interval, not on
+    # every request; if the cell already has a window, it is served as it stands.
+    def get(self, lat, lon):
+        cell = grid_cell(lat, lon, self.resolution)
+        now = time.monotonic()
+        if now - self._last_refresh.get(cell, -self.refresh_interval) >= self.refresh_interval:
+            try:
+                self.refresh(lat, lon)
+            except Exception as e:
+                averages = self.averages(lat, lon)
+                if averages is None:
+                    raise
+                logger.warning(f"Could not refresh cell {cell}, serving its last window: {e}")
+                return averages
+            finally:
+                self._last_refresh[cell] = now
+        return self.averages(lat, lon)
+
+    # Fetch whole years before the earliest stored day; they only feed the monthly sums
+    def backfill(self, lat, lon, years=1):
+        cell = grid_cell(lat, lon, self.resolution)
+        center_lat, center_lon = cell_center(cell, self.resolution)
+        conn = self._connect()
+        window = conn.execute('SELECT history_start FROM climate_windows WHERE cell_lat = ? AND cell_lon = ?',
+                              cell).fetchone()
+        if window is None:
+            raise ValueError(f"Cell {cell} has not been refreshed yet")
+        history_start = datetime.strptime(window[0], DAY_FORMAT)
+        fetch_end = history_start - timedelta(days=1)
+        fetch_start = fetch_end.replace(year=fetch_end.year - years) + timedelta(days=1)
+        parameter_data = self.fetch(center_lat, center_lon, fetch_start, fetch_end)
+        rows = []
+        for day in sorted(parameter_data[self.parameters[0]]):
+            values = [parameter_data[p].get(day, FILL_VALUE) for p in self.parameters]
+            if all(value is not None and value != FILL_VALUE for value in values):
+                rows.append((day, values))
+        with conn:
+            self._add_monthly(conn, cell, rows)
+            conn.execute('UPDATE climate_windows SET history_start = ? WHERE cell_lat = ? AND cell_lon = ?',
+                         (fetch_start.strftime(DAY_FORMAT), cell[0], cell[1]))
+        return len(rows)
+
+    # Per-month averages for every stored year: {(year, month): averages}
+    def monthly(self, lat, lon):
+        cell = grid_cell(lat, lon, self.resolution)
+        sum_columns = ', '.join(f"sum_{p}" for p in self.parameters)
+        rows = self._connect().execute(f'''SELECT year, month, count, {sum_columns} FROM climate_monthly
+                                           WHERE cell_lat = ? AND cell_lon = ? AND count > 0
+                                           ORDER BY year, month''', cell).fetchall()
+        return {(row[0], row[1]): {feature: total / row[2] for feature, total in zip(self.features, row[3:])}
+                for row in rows}
+
+    # Multi-year normals per calendar month: {month: averages}
+    def monthly_normals(self, lat, lon):
+        cell = grid_cell(lat, lon, self.resolution)
+        sum_columns = ', '.join(f"SUM(sum_{p})" for p in self.parameters)
+        rows = self._connect().execute(f'''SELECT month, SUM(count), {sum_columns} FROM climate_monthly
+                                           WHERE cell_lat = ? AND cell_lon = ? GROUP BY month
+                                           HAVING SUM(count) > 0 ORDER BY month''', cell).fetchall()
+        return {row[0]: {feature: total / row[1] for feature, total in zip(self.features, row[2:])}
+                for row in rows}
@@ -0,0 +1,132 @@
+import sqlite3
+import json
+import time
+import itertools
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'climate_cache.db'
+DEFAULT_RESOLUTION = 0.1      # degrees; NASA POWER's own grid is 0.5 x 0.625
+DEFAULT_TTL = 7 * 24 * 3600   # seconds
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_ACCESS_RESOLUTION = 3600   # seconds; a hit rewrites accessed_at at most this often
+DEFAULT_EVICT_EVERY = 256          # inserts between eviction passes
+
+# Function to snap a coordinate onto the cache grid
+def grid_cell(lat, lon, resolution=DEFAULT_RESOLUTION):
+    return int(round(lat / resolution)), int(round(lon / resolution))
+
+# Function to get the centre point of a grid cell
+def cell_center(cell, resolution=DEFAULT_RESOLUTION):
+    return round(cell[0] * resolution, 6), round(cell[1] * resolution, 6)
+
+
+# SQLite-backed climate cache shared by every process that opens the same file.
+# The file is created on first use, not when the cache object is made. LRU order is
+# kept at access_resolution granularity, and eviction runs once every evict_every
+# inserts, so neither a hit nor a set pays for a write or a table scan every time.
+class ClimateCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, resolution=DEFAULT_RESOLUTION,
+                 ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 access_resolution=DEFAULT_ACCESS_RESOLUTION, evict_every=DEFAULT_EVICT_EVERY):
+        self.path = path
+        self.resolution = resolution
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.access_resolution = access_resolution
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._inserts = itertools.count(1)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            if not self._initialized:
+                with self._init_lock:
+                    if not self._initialized:
+                        self._init_db(conn)
+                        self._initialized = True
+        return conn
+
+    def _init_db(self, conn):
+        conn.execute('''CREATE TABLE IF NOT EXISTS climate_cache
+                        (cell_lat INTEGER NOT NULL,
+                         cell_lon INTEGER NOT NULL,
+                         start_date TEXT NOT NULL,
+                         end_date TEXT NOT NULL,
+                         payload TEXT NOT NULL,
+                         created_at REAL NOT NULL,
+                         accessed_at REAL NOT NULL,
+                         PRIMARY KEY (cell_lat, cell_lon, start_date, end_date))''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_climate_cache_accessed ON climate_cache (accessed_at)')
+
+    def get(self, lat, lon, start_date, end_date):
+        cell_lat, cell_lon = grid_cell(lat, lon, self.resolution)
+        conn = self._connect()
+        row = conn.execute('''SELECT payload, created_at, accessed_at FROM climate_cache
+                              WHERE cell_lat = ? AND cell_lon = ? AND start_date = ? AND end_date = ?''',
+                           (cell_lat, cell_lon, start_date, end_date)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        # Expired rows stay until evict(), so get_latest() can still serve them during an outage
+        if self.ttl is not None and now - row[1] > self.ttl:
+            return None
+        if now - row[2] >= self.access_resolution:
+            conn.execute('''UPDATE climate_cache SET accessed_at = ?
+                            WHERE cell_lat = ? AND cell_lon = ? AND start_date = ? AND end_date = ?''',
+                         (now, cell_lat, cell_lon, start_date, end_date))
+        return json.loads(row[0])
+
+    # Most recent entry for the cell, whatever its date window; ignores the TTL unless max_age is given
+    def get_latest(self, lat, lon, max_age=None):
+        cell_lat, cell_lon = grid_cell(lat, lon, self.resolution)
+        row = self._connect().execute('''SELECT payload, created_at FROM climate_cache
+                                         WHERE cell_lat = ? AND cell_lon = ?
+                                         ORDER BY end_date DESC, created_at DESC LIMIT 1''',
+                                      (cell_lat, cell_lon)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def set(self, lat, lon, start_date, end_date, averages):
+        cell_lat, cell_lon = grid_cell(lat, lon, self.resolution)
+        now = time.time()
+        conn = self._connect()
+        conn.execute('''INSERT OR REPLACE INTO climate_cache
+                        (cell_lat, cell_lon, start_date, end_date, payload, created_at, accessed_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                     (cell_lat, cell_lon, start_date, end_date, json.dumps(averages), now, now))
+        if next(self._inserts) % self.evict_every == 0:
+            self.evict()
+
+    # Drop expired rows, then the least recently used ones beyond max_entries.
+    # The newest row for each cell outlives the TTL as the stale fallback for outages.
+    def evict(self):
+        conn = self._connect()
+        if self.ttl is not None:
+            conn.execute('''DELETE FROM climate_cache WHERE created_at < ? AND EXISTS
+                            (SELECT 1 FROM climate_cache AS newer
+                             WHERE newer.cell_lat = climate_cache.cell_lat AND newer.cell_lon = climate_cache.cell_lon
+                               AND newer.created_at > climate_cache.created_at)''', (time.time() - self.ttl,))
+        if self.max_entries is not None:
+            count = conn.execute('SELECT COUNT(*) FROM climate_cache').fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute('''DELETE FROM climate_cache WHERE rowid IN
+                                (SELECT rowid FROM climate_cache ORDER BY accessed_at LIMIT ?)''', (excess,))
+                logger.info(f"Evicted {excess} climate cache entries")
+
+    def clear(self):
+        self._connect().execute('DELETE FROM climate_cache')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM climate_cache').fetchone()[0]
@@ -0,0 +1,112 @@
+import time
+import threading
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+import plant_model
+from http_client import shared_client
+from climate_cache import grid_cell, cell_center
+from climate_tiles import ClimateTileStore, DEFAULT_TILE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+# Token bucket shared by the fetch threads
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Function to list the grid cells covering a bounding box
+def cells_in_bbox(south, west, north, east, resolution):
+    lat_min, lon_min = grid_cell(south, west, resolution)
+    lat_max, lon_max = grid_cell(north, east, resolution)
+    return [(cell_lat, cell_lon)
+            for cell_lat in range(lat_min, lat_max + 1)
+            for cell_lon in range(lon_min, lon_max + 1)]
+
+# Function to fetch the climate averages for one cell, raising on failure
+def fetch_cell(cell, resolution, start_date, end_date, limiter=None, timeout=60, max_retries=3):
+    lat, lon = cell_center(cell, resolution)
+    params = plant_model.power_request_params(lat, lon, start_date, end_date)
+    for attempt in range(max_retries):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = shared_client.get(plant_model.NASA_POWER_URL, params=params, timeout=timeout)
+            # 429 and 5xx are worth retrying; anything else is final
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.exceptions.HTTPError(f"{response.status_code} from NASA POWER", response=response)
+            response.raise_for_status()
+            return plant_model.average_power_parameters(response.json()['properties']['parameter'])
+        except requests.exceptions.RequestException as e:
+            if attempt == max_retries - 1:
+                raise
+            logger.info(f"Retrying cell {cell} after error: {e}")
+            time.sleep(2 ** attempt)
+
+# Function to fetch every missing cell in a bounding box into the tile store.
+# Finished cells are checkpointed in batches, so an interrupted run resumes where it stopped.
+def prefetch(store, cells, start_date, end_date, concurrency=8, rate=5.0, checkpoint_every=50):
+    start_key, end_key = start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d")
+    pending = [cell for cell in cells if not store.has_cell(cell, start_key, end_key)]
+    logger.info(f"{len(cells) - len(pending)} of {len(cells)} cells already stored; fetching {len(pending)}")
+
+    limiter = RateLimiter(rate, burst=concurrency) if rate else None
+    finished = []
+    failed = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(fetch_cell, cell, store.resolution, start_date, end_date, limiter): cell
+                   for cell in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            cell = futures[future]
+            try:
+                finished.append((cell, future.result()))
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to fetch cell {cell}: {e}")
+            if len(finished) >= checkpoint_every:
+                store.put_many(finished, start_key, end_key)
+                finished = []
+                logger.info(f"Checkpointed {done} of {len(pending)} cells "
+                            f"({done / (time.perf_counter() - started):.1f} cells/s)")
+    if finished:
+        store.put_many(finished, start_key, end_key)
+    logger.info(f"Prefetch finished: {len(pending) - failed} cells stored, {failed} failed")
+    return len(pending) - failed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefetch NASA POWER climate averages for a region')
+    parser.add_argument('--bbox', nargs=4, type=float, required=True, metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'))
+    parser.add_argument('--resolution', type=float, default=0.5, help='grid cell size in degrees')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=5.0, help='maximum requests per second')
+    parser.add_argument('--tile-dir', default=DEFAULT_TILE_DIR)
+    args = parser.parse_args()
+
+    store = ClimateTileStore(args.tile_dir, resolution=args.resolution, readonly=False)
+    start_date, end_date = plant_model.power_date_window()
+    prefetch(store, cells_in_bbox(*args.bbox, store.resolution), start_date, end_date,
+             concurrency=args.concurrency, rate=args.rate)
+
+if __name__ == "__main__":
+    main()
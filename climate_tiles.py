@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import pathlib
+import threading
+import logging
+from datetime import timedelta
+import numpy as np
+from climate_cache import grid_cell
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TILE_DIR = 'climate_tiles'
+# Same order as plant_model.POWER_PARAMETERS
+CLIMATE_COLUMNS = [
+    'avg_temperature',
+    'avg_precipitation',
+    'avg_solar_radiation',
+    'avg_humidity',
+    'avg_wind_speed',
+    'avg_soil_moisture'
+]
+GROW_ROWS = 4096
+# How many days a tile's window may end before the requested window and still be served
+DEFAULT_MAX_WINDOW_LAG_DAYS = 7
+DAY_FORMAT = '%Y%m%d'
+
+
+# Local store of per-cell climate averages: a float32 (rows, 6) memory-mapped
+# array plus a SQLite index from grid cell to row. Read-only openers share the
+# mapped pages through the OS page cache, and open the index without writing to it.
+class ClimateTileStore:
+    def __init__(self, directory=DEFAULT_TILE_DIR, resolution=None, readonly=True,
+                 max_window_lag_days=DEFAULT_MAX_WINDOW_LAG_DAYS):
+        self.directory = directory
+        self.readonly = readonly
+        self.max_window_lag = timedelta(days=max_window_lag_days)
+        self.values_path = os.path.join(directory, 'values.f32')
+        self.index_path = os.path.join(directory, 'index.db')
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._values = None
+        self._lock = threading.Lock()
+        self._init_index(resolution)
+
+    @classmethod
+    def open_if_exists(cls, directory=DEFAULT_TILE_DIR):
+        if not os.path.exists(os.path.join(directory, 'index.db')):
+            return None
+        return cls(directory)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.readonly:
+                uri = pathlib.Path(self.index_path).absolute().as_uri() + '?mode=ro'
+                conn = sqlite3.connect(uri, uri=True, timeout=30)
+            else:
+                conn = sqlite3.connect(self.index_path, timeout=30)
+                conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_index(self, resolution):
+        if self.readonly:
+            self._read_resolution(resolution)
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS cells
+                            (cell_lat INTEGER NOT NULL,
+                             cell_lon INTEGER NOT NULL,
+                             row INTEGER NOT NULL,
+                             start_date TEXT NOT NULL,
+                             end_date TEXT NOT NULL,
+                             PRIMARY KEY (cell_lat, cell_lon))''')
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'resolution'").fetchone() is None:
+                if resolution is None:
+                    raise ValueError(f"Climate tile store {self.directory} has no resolution; pass one to create it")
+                conn.execute("INSERT INTO meta (key, value) VALUES ('resolution', ?)", (repr(resolution),))
+        self._read_resolution(resolution)
+
+    def _read_resolution(self, resolution):
+        try:
+            stored = self._connect().execute("SELECT value FROM meta WHERE key = 'resolution'").fetchone()
+        except sqlite3.OperationalError:
+            stored = None
+        if stored is None:
+            raise ValueError(f"Climate tile store {self.directory} has no resolution; open it writable to create it")
+        self.resolution = float(stored[0])
+        if resolution is not None and resolution != self.resolution:
+            raise ValueError(f"Climate tile store {self.directory} uses resolution {self.resolution}, "
+                             f"not {resolution}")
+
+    def _mapped_values(self, min_rows):
+        values = self._values
+        if values is None or len(values) < min_rows:
+            with self._lock:
+                values = self._values
+                if values is None or len(values) < min_rows:
+                    if not os.path.exists(self.values_path):
+                        return None
+                    rows = os.path.getsize(self.values_path) // (4 * len(CLIMATE_COLUMNS))
+                    if rows < min_rows:
+                        return None
+                    values = np.memmap(self.values_path, dtype=np.float32, mode='r' if self.readonly else 'r+',
+                                       shape=(rows, len(CLIMATE_COLUMNS)))
+                    self._values = values
+        return values
+
+    def _ensure_capacity(self, rows):
+        size = os.path.getsize(self.values_path) if os.path.exists(self.values_path) else 0
+        needed = rows * 4 * len(CLIMATE_COLUMNS)
+        if size < needed:
+            grown = (rows + GROW_ROWS) * 4 * len(CLIMATE_COLUMNS)
+            with open(self.values_path, 'ab') as f:
+                f.truncate(grown)
+            self._values = None
+
+    def cell_of(self, lat, lon):
+        return grid_cell(lat, lon, self.resolution)
+
+    # Averages for the point's cell, or None. Given the requested window, a tile must
+    # start by start_date and end no more than max_window_lag before end_date; other
+    # tiles are misses until climate_prefetch.py fetches them again.
+    def get(self, lat, lon, start_date=None, end_date=None):
+        cell_lat, cell_lon = self.cell_of(lat, lon)
+        row = self._connect().execute('SELECT row, start_date, end_date FROM cells WHERE cell_lat = ? AND cell_lon = ?',
+                                      (cell_lat, cell_lon)).fetchone()
+        if row is None:
+            return None
+        if start_date is not None and row[1] > start_date.strftime(DAY_FORMAT):
+            return None
+        if end_date is not None and row[2] < (end_date - self.max_window_lag).strftime(DAY_FORMAT):
+            logger.debug(f"Climate tile for cell {(cell_lat, cell_lon)} ends {row[2]}; too old for {end_date:%Y%m%d}")
+            return None
+        values = self._mapped_values(row[0] + 1)
+        if values is None:
+            return None
+        return dict(zip(CLIMATE_COLUMNS, values[row[0]].tolist()))
+
+    def has_cell(self, cell, start_date, end_date):
+        return self._connect().execute(
+            'SELECT 1 FROM cells WHERE cell_lat = ? AND cell_lon = ? AND start_date = ? AND end_date = ?',
+            (cell[0], cell[1], start_date, end_date)).fetchone() is not None
+
+    # Write a batch of (cell, averages) and record them in the index as one checkpoint
+    def put_many(self, cells, start_date, end_date):
+        if self.readonly:
+            raise PermissionError(f"Climate tile store {self.directory} is open read-only")
+        conn = self._connect()
+        with conn:
+            next_row = conn.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM cells').fetchone()[0]
+            rows = []
+            for cell, averages in cells:
+                existing = conn.execute('SELECT row FROM cells WHERE cell_lat = ? AND cell_lon = ?', cell).fetchone()
+                if existing is None:
+                    rows.append((cell, next_row, averages))
+                    next_row += 1
+                else:
+                    rows.append((cell, existing[0], averages))
+            self._ensure_capacity(next_row)
+            values = self._mapped_values(next_row)
+            for _, row, averages in rows:
+                values[row] = [averages[column] for column in CLIMATE_COLUMNS]
+            values.flush()
+            conn.executemany('''INSERT OR REPLACE INTO cells (cell_lat, cell_lon, row, start_date, end_date)
+                                VALUES (?, ?, ?, ?, ?)''',
+                             [(cell[0], cell[1], row, start_date, end_date) for cell, row, _ in rows])
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cells').fetchone()[0]
@@ -0,0 +1,146 @@
+import sys
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# A fitted RandomForestClassifier flattened into contiguous node arrays, with the
+# SimpleImputer and StandardScaler folded into a single per-feature transform.
+# predict_proba takes raw (unimputed, unscaled) feature rows.
+class FlatForest:
+    def __init__(self, feature, threshold, children_left, children_right, leaf_values,
+                 roots, max_depth, classes, fill_values, offset, scale):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.fill_values = fill_values
+        self.offset = offset
+        self.scale = scale
+
+    @classmethod
+    def from_sklearn(cls, model, imputer, scaler):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        base = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count)
+            # Leaves point at themselves, so extra iterations leave a finished walk in place
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + base)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + base)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            value = tree.value[:, 0, :]
+            # A leaf holding only zero-weight rows predicts zeros, as in sklearn
+            total = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, total, out=np.zeros_like(value, dtype=np.float64), where=total > 0))
+            roots.append(base)
+            base += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        statistics = imputer.statistics_
+        if np.isnan(statistics).any():
+            raise ValueError("Imputer has features with no observed values, which FlatForest does not support")
+        n_features = len(statistics)
+        offset = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children_left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            children_right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            leaf_values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            fill_values=np.asarray(statistics, dtype=np.float64),
+            offset=np.asarray(offset, dtype=np.float64),
+            scale=np.asarray(scale, dtype=np.float64)
+        )
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        X = np.where(np.isnan(X), self.fill_values, X)
+        # Same operation order as StandardScaler, then the float32 cast the trees use
+        return ((X - self.offset) / self.scale).astype(np.float32)
+
+    def apply(self, X_scaled):
+        rows = np.arange(X_scaled.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X_scaled.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X_scaled[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(self.transform(X))
+        return self.leaf_values[leaves].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold,
+                 children_left=self.children_left, children_right=self.children_right,
+                 leaf_values=self.leaf_values, roots=self.roots, max_depth=self.max_depth,
+                 classes=self.classes_, fill_values=self.fill_values,
+                 offset=self.offset, scale=self.scale)
+        logger.info(f"Flattened forest saved as {path}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature'], data['threshold'], data['children_left'],
+                       data['children_right'], data['leaf_values'], data['roots'],
+                       data['max_depth'], data['classes'], data['fill_values'],
+                       data['offset'], data['scale'])
+
+
+# Function to check a flattened forest against sklearn and time both on small batches
+def compare_with_sklearn(forest, model, imputer, scaler, X, repeats=200):
+    expected = model.predict_proba(scaler.transform(imputer.transform(X)))
+    actual = forest.predict_proba(X)
+    max_error = float(np.abs(expected - actual).max())
+
+    timings = {}
+    for batch_size in (1, 8, 64):
+        batch = X[:batch_size]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.predict_proba(scaler.transform(imputer.transform(batch)))
+        sklearn_seconds = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            forest.predict_proba(batch)
+        flat_seconds = (time.perf_counter() - start) / repeats
+        timings[batch_size] = (sklearn_seconds, flat_seconds)
+        logger.info(f"batch={batch_size}: sklearn {sklearn_seconds * 1e3:.3f}ms, "
+                    f"flat {flat_seconds * 1e3:.3f}ms ({sklearn_seconds / flat_seconds:.1f}x)")
+    logger.info(f"Max probability difference from sklearn: {max_error:.2e}")
+    return max_error, timings
+
+
+# Export plant_recommendation_model.joblib (or the given artifact) as a flattened forest
+def main():
+    from plant_model import load_model
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'plant_recommendation_model'
+    model, imputer, scaler = load_model(filename)
+    forest = FlatForest.from_sklearn(model, imputer, scaler)
+    forest.save(f"{filename}.forest.npz")
+
+    rng = np.random.default_rng(42)
+    X = imputer.statistics_ * rng.uniform(0.5, 1.5, size=(64, len(imputer.statistics_)))
+    compare_with_sklearn(forest, model, imputer, scaler, X)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
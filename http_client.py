@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import registry
+
+DEFAULT_TIMEOUT = (3.05, 10)   # (connect, read) seconds
+DEFAULT_MAX_PER_HOST = 16
+DEFAULT_POOL_SIZE = 32
+
+outbound_requests = registry.counter('plant_outbound_requests_total',
+                                     'Outbound HTTP GETs by host and whether they were sent or coalesced')
+
+
+class HostBusyError(requests.exceptions.RequestException):
+    pass
+
+
+# Shared outbound HTTP client: one keep-alive connection pool per host, a cap on
+# concurrent requests per host, default timeouts, and single-flight coalescing, so
+# concurrent GETs for the same URL and params share one upstream request.
+class HTTPClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_per_host=DEFAULT_MAX_PER_HOST, pool_size=DEFAULT_POOL_SIZE):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._host_limits = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _limit(self, host):
+        with self._lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return limit
+
+    def _send(self, url, params, timeout, host):
+        limit = self._limit(host)
+        # Waiting for a slot counts against the connect timeout
+        wait = timeout[0] if isinstance(timeout, tuple) else timeout
+        if not limit.acquire(timeout=wait):
+            raise HostBusyError(f"{self.max_per_host} requests to {host} already in flight")
+        try:
+            outbound_requests.inc(host=host, result='sent')
+            return self.session.get(url, params=params, timeout=timeout)
+        finally:
+            limit.release()
+
+    # GET url; identical concurrent calls wait for the first one and share its response
+    # (or its exception). The shared Response must be treated as read-only.
+    def get(self, url, params=None, timeout=None, coalesce=True):
+        timeout = self.timeout if timeout is None else timeout
+        host = urlsplit(url).netloc
+        if not coalesce:
+            return self._send(url, params, timeout, host)
+
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            outbound_requests.inc(host=host, result='coalesced')
+            wait = sum(timeout) if isinstance(timeout, tuple) else timeout
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeoutError:
+                raise requests.exceptions.Timeout(f"Timed out waiting for in-flight request to {host}")
+
+        try:
+            response = self._send(url, params, timeout, host)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+shared_client = HTTPClient()
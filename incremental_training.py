@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import copy
+import time
+import logging
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+from plant_model import (load_historical_data, historical_arrays, prepare_data, train_model,
+                         load_model, save_model, plant_database)
+
+logger = logging.getLogger(__name__)
+
+
+# Function to list the saved versions of an artifact from its manifest
+def load_manifest(filename='plant_recommendation_model'):
+    path = f"{filename}.versions.json"
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+# Function to save a numbered copy of the artifact, make it current and record it in the manifest
+def save_version(model, imputer, scaler, filename='plant_recommendation_model', **details):
+    manifest = load_manifest(filename)
+    version = manifest[-1]['version'] + 1 if manifest else 1
+    save_model(model, imputer, scaler, f"{filename}.v{version}")
+    save_model(model, imputer, scaler, filename)
+    manifest.append({'version': version, 'file': f"{filename}.v{version}.joblib",
+                     'created_at': time.time(), 'n_estimators': len(model.estimators_), **details})
+    with open(f"{filename}.versions.json.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{filename}.versions.json.tmp", f"{filename}.versions.json")
+    return version
+
+# Function to update the imputer means with new rows, weighting by rows already seen
+def update_imputer(imputer, X_new, n_seen):
+    observed = ~np.isnan(X_new)
+    new_counts = observed.sum(axis=0)
+    new_sums = np.where(observed, X_new, 0).sum(axis=0)
+    imputer.statistics_ = np.where(
+        new_counts > 0,
+        (imputer.statistics_ * n_seen + new_sums) / np.maximum(n_seen + new_counts, 1),
+        imputer.statistics_)
+    return imputer
+
+# Function to move split thresholds of fitted trees from the old scaled space to the new one
+def rescale_thresholds(estimators, old_mean, old_scale, new_mean, new_scale):
+    for estimator in estimators:
+        tree = estimator.tree_
+        split = tree.children_left != -1
+        feature = tree.feature[split]
+        raw = tree.threshold[split] * old_scale[feature] + old_mean[feature]
+        tree.threshold[split] = (raw - new_mean[feature]) / new_scale[feature]
+
+# Function to add trees trained on new records to an existing model.
+# Returns the updated (model, imputer, scaler); the originals are left untouched.
+def update_model(model, imputer, scaler, X_new, y_new, n_new_trees=20, random_state=None):
+    unknown = set(np.unique(y_new)) - set(model.classes_.tolist())
+    if unknown:
+        raise ValueError(f"New records contain classes the model has never seen ({sorted(unknown)}); "
+                         f"a full retrain is needed")
+
+    model = copy.deepcopy(model)
+    imputer = copy.deepcopy(imputer)
+    scaler = copy.deepcopy(scaler)
+
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    n_seen = np.broadcast_to(scaler.n_samples_seen_, old_mean.shape).astype(float)
+    update_imputer(imputer, X_new, n_seen)
+    X_new_imputed = imputer.transform(X_new)
+    scaler.partial_fit(X_new_imputed)
+    rescale_thresholds(model.estimators_, old_mean, old_scale, scaler.mean_, scaler.scale_)
+
+    # Anchor rows with zero weight give every new tree the model's full class list,
+    # so their probability columns line up with the existing trees. The labels take the
+    # model's class dtype: y_new's may be too narrow for the missing names.
+    missing = [c for c in model.classes_ if c not in set(y_new.tolist())]
+    X_fit = np.vstack([scaler.transform(X_new_imputed), np.zeros((len(missing), X_new.shape[1]))])
+    y_fit = np.concatenate([np.asarray(y_new, dtype=model.classes_.dtype),
+                            np.array(missing, dtype=model.classes_.dtype)])
+    weights = np.concatenate([np.ones(len(y_new)), np.zeros(len(missing))])
+
+    params = model.get_params()
+    params.update(n_estimators=n_new_trees, warm_start=False,
+                  random_state=random_state if random_state is not None else len(model.estimators_))
+    new_trees = RandomForestClassifier(**params).fit(X_fit, y_fit, sample_weight=weights)
+    if not np.array_equal(new_trees.classes_, model.classes_):
+        raise ValueError("New trees do not share the model's classes")
+
+    model.estimators_ = model.estimators_ + new_trees.estimators_
+    model.n_estimators = len(model.estimators_)
+    return model, imputer, scaler
+
+# Function to compare an incremental update against a full retrain on held-out new records
+def compare_with_full_retrain(historical_path, new_path, n_new_trees=20, filename='plant_recommendation_model'):
+    model, imputer, scaler = load_model(filename)
+    X_new, y_new = historical_arrays(load_historical_data(new_path))
+    X_fit, X_holdout, y_fit, y_holdout = train_test_split(X_new, y_new, test_size=0.2, random_state=42)
+
+    start = time.perf_counter()
+    updated = update_model(model, imputer, scaler, X_fit, y_fit, n_new_trees)
+    update_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X_all, y_all = prepare_data(load_historical_data(historical_path), plant_database)
+    full = train_model(np.vstack([X_all, X_fit]), np.concatenate([y_all, y_fit]))
+    retrain_seconds = time.perf_counter() - start
+
+    def accuracy(loaded):
+        m, i, s = loaded
+        return accuracy_score(y_holdout, m.predict(s.transform(i.transform(X_holdout))))
+
+    report = {
+        'update_seconds': update_seconds,
+        'retrain_seconds': retrain_seconds,
+        'incremental_accuracy': accuracy(updated),
+        'full_retrain_accuracy': accuracy(full)
+    }
+    report['accuracy_drift'] = report['full_retrain_accuracy'] - report['incremental_accuracy']
+    logger.info(f"Incremental update took {update_seconds:.2f}s vs {retrain_seconds:.2f}s for a full retrain; "
+                f"holdout accuracy {report['incremental_accuracy']:.3f} vs {report['full_retrain_accuracy']:.3f} "
+                f"(drift {report['accuracy_drift']:+.3f})")
+    return report
+
+
+# Usage: python incremental_training.py NEW_RECORDS.csv [--trees N] [--compare HISTORICAL.csv]
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python incremental_training.py NEW_RECORDS.csv [--trees N] [--compare HISTORICAL.csv]")
+        return
+    new_path = sys.argv[1]
+    n_new_trees = int(sys.argv[sys.argv.index('--trees') + 1]) if '--trees' in sys.argv else 20
+
+    if '--compare' in sys.argv:
+        compare_with_full_retrain(sys.argv[sys.argv.index('--compare') + 1], new_path, n_new_trees)
+
+    model, imputer, scaler = load_model()
+    X_new, y_new = historical_arrays(load_historical_data(new_path))
+    start = time.perf_counter()
+    model, imputer, scaler = update_model(model, imputer, scaler, X_new, y_new, n_new_trees)
+    update_seconds = time.perf_counter() - start
+    version = save_version(model, imputer, scaler, records_added=len(y_new), update_seconds=update_seconds,
+                           source=new_path)
+    logger.info(f"Saved model version {version} with {len(model.estimators_)} trees "
+                f"after a {update_seconds:.2f}s update")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import os
+import stat
+import time
+import queue
+import secrets
+import ipaddress
+import threading
+import argparse
+import logging
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import numpy as np
+from model_registry import ModelRegistry
+from metrics import Registry
+from plant_model import FEATURE_COLUMNS, rank_plants, predict_probabilities
+
+logger = logging.getLogger(__name__)
+
+# A Unix socket only this user can connect to; pass host:port to listen on TCP instead
+DEFAULT_ADDRESS = 'plant_inference.sock'
+DEFAULT_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 64
+# Seconds a connection waits for its batch before replying with an error
+DEFAULT_REQUEST_TIMEOUT = 30.0
+# Seconds between a client's model version checks while it is not predicting
+DEFAULT_VERSION_INTERVAL = 30
+# Without PLANT_INFERENCE_AUTHKEY the service generates a random key at startup and writes
+# it here, readable only by its own user, for the web workers on the same host
+DEFAULT_AUTHKEY_FILE = 'plant_inference.key'
+
+# The service keeps its own registry so its metrics can be appended to the web app's /metrics
+service_metrics = Registry()
+queue_depth = service_metrics.histogram('plant_inference_queue_depth', 'Requests waiting when a batch starts',
+                                        buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256))
+batch_size = service_metrics.histogram('plant_inference_batch_size', 'Rows per batched inference',
+                                       buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+batch_seconds = service_metrics.histogram('plant_inference_batch_seconds', 'Time to score one batch in a pool worker')
+request_seconds = service_metrics.histogram('plant_inference_request_seconds',
+                                            'Time from a request entering the queue to its result')
+
+# Loaded in the service process before the pool forks, so workers share it copy-on-write
+_registry = None
+
+
+# Function to parse "host:port" (TCP) or a filesystem path (Unix socket)
+def parse_address(address):
+    if isinstance(address, tuple):
+        return address
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host, int(port)
+    return address
+
+# Function to tell whether an address only accepts connections from this host
+def is_local_address(address):
+    if not isinstance(address, tuple) or address[0] == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(address[0]).is_loopback
+    except ValueError:
+        return False
+
+# Function to get PLANT_INFERENCE_AUTHKEY, or None to use the key file; refuses non-local
+# addresses without it, since a client on another host cannot read the key file
+def env_authkey(address):
+    authkey = os.environ.get('PLANT_INFERENCE_AUTHKEY')
+    if authkey:
+        return authkey.encode()
+    if not is_local_address(address):
+        raise ValueError(f"PLANT_INFERENCE_AUTHKEY must be set to use the inference service at {address}")
+    return None
+
+def authkey_file():
+    return os.environ.get('PLANT_INFERENCE_AUTHKEY_FILE', DEFAULT_AUTHKEY_FILE)
+
+# Function to generate a random authkey and write it to the key file with mode 0600
+def create_authkey():
+    authkey = secrets.token_bytes(32)
+    path = authkey_file()
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    os.replace(tmp_path, path)
+    return authkey
+
+# Function to read the key the service wrote; it changes every time the service starts
+def read_authkey():
+    path = authkey_file()
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        raise ConnectionError(f"Cannot read the inference service authkey from {path}: {e}")
+
+# Function to listen on address; a Unix socket is created with mode 0600, replacing a stale one
+def listen(address, authkey):
+    if isinstance(address, tuple):
+        return Listener(address, backlog=128, authkey=authkey)
+    if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.remove(address)
+    umask = os.umask(0o177)
+    try:
+        return Listener(address, backlog=128, authkey=authkey)
+    finally:
+        os.umask(umask)
+
+# Function to set up a pool worker started with the spawn method, which inherits nothing
+def _init_worker(filename, mmap_mode):
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(filename, mmap_mode=mmap_mode)
+
+# Function to score one batch in a pool worker; returns (model_version, classes, probabilities, seconds)
+def predict_batch(X):
+    loaded = _registry.get()
+    if loaded is None:
+        raise RuntimeError(f"No model could be loaded from {_registry.path}")
+    start = time.perf_counter()
+    classes, probabilities = predict_probabilities(X, *loaded, forest=_registry.forest)
+    return _registry.version, classes, probabilities, time.perf_counter() - start
+
+
+# Collects requests for up to window seconds (or max_batch rows) and scores them as one
+# batch on the process pool. At most one batch per pool worker is in flight; requests
+# that arrive meanwhile wait in the queue and make the next batch bigger.
+class MicroBatcher:
+    def __init__(self, pool, workers, window=DEFAULT_WINDOW_MS / 1000, max_batch=DEFAULT_MAX_BATCH):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(workers)
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        future = Future()
+        self._queue.put((np.asarray(X, dtype=float), future, time.perf_counter()))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.window
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            queue_depth.observe(self._queue.qsize())
+            batch = self._collect(item)
+            self._slots.acquire()
+            X = np.vstack([rows for rows, _, _ in batch])
+            batch_size.observe(len(X))
+            try:
+                result = self.pool.submit(predict_batch, X)
+            except Exception as e:
+                self._slots.release()
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            result.add_done_callback(partial(self._complete, batch))
+
+    def _complete(self, batch, result):
+        self._slots.release()
+        try:
+            version, classes, probabilities, seconds = result.result()
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        batch_seconds.observe(seconds)
+        now = time.perf_counter()
+        offset = 0
+        for rows, future, submitted in batch:
+            future.set_result((version, classes, probabilities[offset:offset + len(rows)]))
+            offset += len(rows)
+            request_seconds.observe(now - submitted)
+
+
+# Owns the loaded model and a process pool; web workers talk to it over a
+# multiprocessing.connection socket through InferenceClient
+class InferenceService:
+    def __init__(self, address=DEFAULT_ADDRESS, filename='plant_recommendation_model', mmap_mode=None,
+                 workers=2, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT):
+        global _registry
+        address = parse_address(address)
+        authkey = env_authkey(address)
+        _registry = ModelRegistry(filename, mmap_mode=mmap_mode)
+        if _registry.preload() is None:
+            raise RuntimeError(f"No model could be loaded from {_registry.path}")
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(filename, mmap_mode))
+        # Start every worker now rather than on the first requests
+        list(self.pool.map(predict_batch, [np.zeros((1, len(FEATURE_COLUMNS)))] * workers))
+        self.batcher = MicroBatcher(self.pool, workers, window_ms / 1000, max_batch)
+        self.request_timeout = request_timeout
+        # Listener's default backlog of 1 drops connections when many web workers start at once
+        self.listener = listen(address, authkey or create_authkey())
+        self.address = self.listener.address
+        self._closed = False
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                kind = message[0]
+                try:
+                    if kind == 'predict':
+                        # The batch still completes into the abandoned future, so it is not cancelled
+                        result = self.batcher.submit(message[1]).result(timeout=self.request_timeout)
+                        conn.send(('ok', *result))
+                    elif kind == 'info':
+                        loaded = _registry.get()
+                        if loaded is None:
+                            conn.send(('error', f"No model could be loaded from {_registry.path}"))
+                        else:
+                            conn.send(('ok', _registry.version, loaded[0].classes_))
+                    elif kind == 'metrics':
+                        conn.send(('ok', service_metrics.render()))
+                    else:
+                        conn.send(('error', f"Unknown request {kind!r}"))
+                except FutureTimeoutError:
+                    logger.error(f"Inference request timed out after {self.request_timeout}s")
+                    conn.send(('error', f"Timed out after {self.request_timeout}s waiting for a batch"))
+                except Exception as e:
+                    logger.error(f"Inference request failed: {e}")
+                    conn.send(('error', str(e)))
+
+    def serve_forever(self):
+        logger.info(f"Inference service listening on {self.address}")
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError) as e:
+                logger.warning(f"Rejected inference connection: {e!r}")
+                continue
+            except OSError:
+                if self._closed:
+                    return
+                raise
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='inference-service', daemon=True).start()
+        return self
+
+    def close(self):
+        self._closed = True
+        self.listener.close()
+        self.batcher.stop()
+        self.pool.shutdown()
+
+
+# One connection per web worker thread to the inference service
+class InferenceClient:
+    def __init__(self, address=DEFAULT_ADDRESS, version_interval=DEFAULT_VERSION_INTERVAL):
+        self.address = parse_address(address)
+        self.authkey = env_authkey(self.address)
+        self.version_interval = version_interval
+        self.model_version = None
+        self._version_checked = 0.0
+        self._local = threading.local()
+
+    # PLANT_INFERENCE_ADDRESS=socket path (or host:port) routes inference to the service
+    @classmethod
+    def from_env(cls):
+        address = os.environ.get('PLANT_INFERENCE_ADDRESS')
+        return cls(address) if address else None
+
+    def _request(self, *message):
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    # The key file is re-read on every reconnect, since a restarted service writes a new one
+                    conn = self._local.conn = Client(self.address, authkey=self.authkey or read_authkey())
+                conn.send(message)
+                reply = conn.recv()
+                break
+            except (EOFError, OSError, AuthenticationError) as e:
+                # The service restarted or dropped the connection; reconnect once
+                self._local.conn = None
+                if attempt == 1:
+                    raise ConnectionError(f"Inference service at {self.address} is unavailable: {e}")
+        if reply[0] != 'ok':
+            raise RuntimeError(f"Inference service error: {reply[1]}")
+        return reply[1:]
+
+    def info(self):
+        self.model_version, classes = self._request('info')
+        self._version_checked = time.monotonic()
+        return self.model_version, classes
+
+    # Function to get the service's model version, asking it again once version_interval
+    # has passed, like ModelRegistry.get() checks the artifact on disk
+    def current_version(self):
+        if self.model_version is None or time.monotonic() - self._version_checked > self.version_interval:
+            # Checked even if the service is down, so a dead service is not asked on every call
+            self._version_checked = time.monotonic()
+            self.info()
+        return self.model_version
+
+    # Returns (classes, probabilities) for raw feature rows
+    def predict_proba(self, X):
+        self.model_version, classes, probabilities = self._request('predict', np.asarray(X, dtype=float))
+        self._version_checked = time.monotonic()
+        return classes, probabilities
+
+    def recommend_for_land_data(self, land_data, plant_database, top_k=5):
+        classes, probabilities = self.predict_proba([[land_data[column] for column in FEATURE_COLUMNS]])
+        return rank_plants(classes, probabilities[0], plant_database, top_k)
+
+    def metrics(self):
+        return self._request('metrics')[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve batched plant model inference to the web workers')
+    parser.add_argument('--address', default=DEFAULT_ADDRESS, help='path for a Unix socket, or host:port')
+    parser.add_argument('--model', default='plant_recommendation_model')
+    parser.add_argument('--mmap', default=None, help="joblib mmap_mode, e.g. r")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--request-timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT)
+    args = parser.parse_args()
+
+    service = InferenceService(args.address, args.model, args.mmap, args.workers, args.window_ms, args.max_batch,
+                               args.request_timeout)
+    try:
+        service.serve_forever()
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
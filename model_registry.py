@@ -0,0 +1,128 @@
+import os
+import gc
+import time
+import threading
+import logging
+import joblib
+from forest_engine import FlatForest
+
+logger = logging.getLogger(__name__)
+
+# Function to get this process's resident memory in bytes
+def resident_memory():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+# Function to get the most resident memory this process has used so far, in bytes
+def peak_resident_memory():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+# Keeps one loaded (model, imputer, scaler) tuple per process and swaps it
+# when a retrained artifact replaces the file on disk. With flatten on, each load
+# also builds a forest_engine.FlatForest, which the serving paths score with.
+class ModelRegistry:
+    def __init__(self, filename='plant_recommendation_model', mmap_mode=None, check_interval=30, flatten=True):
+        self.path = f"{filename}.joblib"
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self.flatten = flatten
+        self.forest = None
+        self.version = None
+        self.load_seconds = None
+        self.loaded_at = None
+        self._loaded = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _artifact_version(self):
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def load(self):
+        version = self._artifact_version()
+        start = time.perf_counter()
+        model, imputer, scaler = joblib.load(self.path, mmap_mode=self.mmap_mode)
+        forest = None
+        if self.flatten:
+            try:
+                forest = FlatForest.from_sklearn(model, imputer, scaler)
+            except ValueError as e:
+                logger.warning(f"Serving {self.path} without a flattened forest: {e}")
+        load_seconds = time.perf_counter() - start
+        # Assigning the tuple is atomic, so readers see either the old or the new model;
+        # the forest carries its own classes, so a reader that catches the old one mid-swap
+        # still gets consistent probabilities
+        self.forest = forest
+        self._loaded = (model, imputer, scaler)
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._last_check = time.monotonic()
+        rss = resident_memory()
+        logger.info(f"Loaded model {self.path} version {version} in {load_seconds:.3f}s "
+                    f"(mmap_mode={self.mmap_mode}, pid={os.getpid()}, rss={rss})")
+        return self._loaded
+
+    def get(self):
+        loaded = self._loaded
+        if loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    try:
+                        self.load()
+                    except Exception as e:
+                        logger.error(f"Error loading model from {self.path}: {e}")
+                        return None
+                return self._loaded
+        if time.monotonic() - self._last_check > self.check_interval:
+            self.reload_if_changed()
+        return self._loaded
+
+    def reload_if_changed(self):
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            try:
+                if self._artifact_version() == self.version:
+                    return False
+                self.load()
+                return True
+            except Exception as e:
+                logger.error(f"Error reloading model from {self.path}, keeping version {self.version}: {e}")
+                return False
+        finally:
+            self._lock.release()
+
+    # Load in the parent before workers fork so they share the pages copy-on-write
+    def preload(self):
+        loaded = self.get()
+        # Keep the collector from touching (and so copying) the preloaded objects
+        gc.freeze()
+        return loaded
+
+    def status(self):
+        return {
+            'path': self.path,
+            'version': self.version,
+            'mmap_mode': self.mmap_mode,
+            'load_seconds': self.load_seconds,
+            'loaded_at': self.loaded_at,
+            'pid': os.getpid(),
+            'rss_bytes': resident_memory()
+        }
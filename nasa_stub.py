@@ -0,0 +1,127 @@
+import json
+import math
+import random
+import time
+import threading
+import argparse
+import logging
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+POWER_PATH = '/api/temporal/daily/point'
+
+
+# Function to make a deterministic synthetic daily value for a parameter at a point
+def synthetic_value(parameter, lat, lon, day):
+    season = math.sin(2 * math.pi * (day.timetuple().tm_yday - 80) / 365.25) * (1 if lat >= 0 else -1)
+    noise = math.sin(lat * 12.9898 + lon * 78.233 + day.toordinal()) * 0.5
+    base = {
+        'T2M': 25 - abs(lat) * 0.4 + 10 * season,
+        'PRECTOTCORR': max(0.0, 2.5 + 2 * noise + math.cos(math.radians(lon))),
+        'ALLSKY_SFC_SW_DWN': 4.5 + 2 * season - abs(lat) * 0.02,
+        'RH2M': 65 + 15 * noise,
+        'WS2M': 3 + abs(noise) * 2,
+        'GWETPROF': 0.5 + 0.2 * noise
+    }.get(parameter, noise)
+    return round(base + noise, 2)
+
+
+# Serves NASA POWER-shaped daily point responses, with optional injected latency and faults
+class NasaPowerStub(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for load tests that open hundreds of connections at once
+    request_queue_size = 512
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, failure_rate=0.0, seed=None):
+        super().__init__(address, NasaPowerStubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{POWER_PATH}"
+
+    # Clients that time out close the socket mid-response; that is expected here
+    def handle_error(self, request, client_address):
+        logger.debug(f"Connection from {client_address} closed before the response was sent")
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='nasa-power-stub', daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class NasaPowerStubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.request_count += 1
+            fail = server.random.random() < server.failure_rate
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        if url.path != POWER_PATH:
+            self._send_json(404, {'message': 'Not found'})
+            return
+        if fail:
+            self._send_json(503, {'message': 'Injected failure'})
+            return
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            lat = float(query['latitude'])
+            lon = float(query['longitude'])
+            start = datetime.strptime(query['start'], '%Y%m%d')
+            end = datetime.strptime(query['end'], '%Y%m%d')
+            parameters = query['parameters'].split(',')
+        except (KeyError, ValueError) as e:
+            self._send_json(422, {'message': f"Invalid request: {e}"})
+            return
+
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        series = {parameter: {day.strftime('%Y%m%d'): synthetic_value(parameter, lat, lon, day) for day in days}
+                  for parameter in parameters}
+        self._send_json(200, {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'parameter': series}
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the NASA POWER daily point API')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each response')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = NasaPowerStub(('127.0.0.1', args.port), latency=args.latency, failure_rate=args.failure_rate)
+    logger.info(f"NASA POWER stub listening; set NASA_POWER_URL={server.base_url}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
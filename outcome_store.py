@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import logging
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from climate_tiles import CLIMATE_COLUMNS
+from soil_grid import SOIL_LAYERS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTCOME_DIR = 'outcome_store'
+DEFAULT_REGION = 'global'
+# Same order as plant_model.FEATURE_COLUMNS
+FEATURE_COLUMNS = CLIMATE_COLUMNS + SOIL_LAYERS
+SCHEMA = {
+    **{column: 'float32' for column in FEATURE_COLUMNS},
+    'plant_name': 'str',
+    'successful_plant': 'int8'
+}
+HASH_COLUMN = '_row_hash'
+REGION_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+# Function to name the .npy file holding one column of a chunk
+def column_path(chunk, column):
+    return os.path.join(chunk, f"{column}.npy")
+
+# Function to turn a date, datetime or 'YYYY-MM[-DD]' string into its 'YYYY-MM' partition month
+def partition_month(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m')
+    value = str(value)
+    for fmt in ('%Y-%m-%d', '%Y-%m'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m')
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid partition date {value!r}; expected YYYY-MM-DD or YYYY-MM")
+
+# Function to check planting outcomes against SCHEMA and return them as typed column arrays
+def validate_outcomes(data):
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame.from_records(data)
+    missing = [column for column in SCHEMA if column not in data.columns]
+    if missing:
+        raise ValueError(f"Outcomes are missing columns: {', '.join(missing)}")
+    extra = [column for column in data.columns if column not in SCHEMA]
+    if extra:
+        raise ValueError(f"Outcomes have columns not in the schema: {', '.join(map(str, extra))}")
+
+    columns = {}
+    for column in FEATURE_COLUMNS:
+        try:
+            columns[column] = pd.to_numeric(data[column], errors='raise').to_numpy(dtype=np.float32)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Column {column} is not numeric: {e}")
+    names = data['plant_name']
+    if names.isna().any() or (names.astype(str).str.strip() == '').any():
+        raise ValueError("Column plant_name has empty values")
+    columns['plant_name'] = names.astype(str).to_numpy().astype(str)
+    success = pd.to_numeric(data['successful_plant'], errors='coerce')
+    if not success.isin([0, 1]).all():
+        raise ValueError("Column successful_plant must be 0 or 1")
+    columns['successful_plant'] = success.to_numpy(dtype=np.int8)
+    return columns
+
+# Function to hash each row's values, so re-imported outcomes can be recognised
+def row_hashes(columns):
+    frame = pd.DataFrame({column: columns[column] for column in SCHEMA})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+# Append-only columnar store for historical planting outcomes. Rows are partitioned
+# by month and region (month=YYYY-MM/region=name); every append writes one immutable
+# chunk directory holding a .npy file per column, so readers memory-map only the
+# columns and partitions they need. Appends skip rows already in the same partition.
+# Deduplication assumes a single writer process at a time.
+class OutcomeStore:
+    def __init__(self, directory=DEFAULT_OUTCOME_DIR):
+        self.directory = directory
+        schema_path = os.path.join(directory, 'schema.json')
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                schema = json.load(f)['columns']
+            if schema != SCHEMA:
+                raise ValueError(f"{directory} has schema {schema}, expected {SCHEMA}")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            with open(schema_path + '.tmp', 'w') as f:
+                json.dump({'columns': SCHEMA, 'partitioning': ['month', 'region']}, f, indent=2)
+            os.replace(schema_path + '.tmp', schema_path)
+
+    @classmethod
+    def open_if_exists(cls, directory=DEFAULT_OUTCOME_DIR):
+        if not os.path.exists(os.path.join(directory, 'schema.json')):
+            return None
+        return cls(directory)
+
+    def _partition_path(self, month, region):
+        return os.path.join(self.directory, f"month={month}", f"region={region}")
+
+    def _chunks(self, partition_path):
+        if not os.path.isdir(partition_path):
+            return []
+        return [os.path.join(partition_path, name) for name in sorted(os.listdir(partition_path))
+                if name.startswith('chunk-')]
+
+    # (month, region, path) of every partition, pruned to the months start..end (inclusive) and regions
+    def partitions(self, start=None, end=None, regions=None):
+        start = partition_month(start) if start is not None else None
+        end = partition_month(end) if end is not None else None
+        result = []
+        for month_dir in sorted(os.listdir(self.directory)):
+            if not month_dir.startswith('month='):
+                continue
+            month = month_dir[len('month='):]
+            if (start is not None and month < start) or (end is not None and month > end):
+                continue
+            for region_dir in sorted(os.listdir(os.path.join(self.directory, month_dir))):
+                region = region_dir[len('region='):]
+                if region_dir.startswith('region=') and (regions is None or region in regions):
+                    result.append((month, region, os.path.join(self.directory, month_dir, region_dir)))
+        return result
+
+    def _write_chunk(self, partition_path, columns, hashes):
+        os.makedirs(partition_path, exist_ok=True)
+        name = f"chunk-{time.time_ns():020d}-{os.getpid()}"
+        tmp_path = os.path.join(partition_path, '.tmp-' + name)
+        os.makedirs(tmp_path)
+        for column in SCHEMA:
+            np.save(column_path(tmp_path, column), columns[column])
+        np.save(column_path(tmp_path, HASH_COLUMN), hashes)
+        # The chunk becomes visible to readers all at once
+        os.rename(tmp_path, os.path.join(partition_path, name))
+
+    # Function to append outcomes observed in one month and region; returns the number of new rows
+    def append(self, data, observed=None, region=DEFAULT_REGION):
+        if not REGION_PATTERN.match(region):
+            raise ValueError(f"Invalid region {region!r}; use letters, digits, '_' and '-'")
+        month = partition_month(observed if observed is not None else date.today())
+        columns = validate_outcomes(data)
+        hashes = row_hashes(columns)
+
+        # Drop duplicates within the batch and rows already stored in this partition
+        partition_path = self._partition_path(month, region)
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first] = True
+        existing = [np.load(column_path(chunk, HASH_COLUMN), mmap_mode='r') for chunk in self._chunks(partition_path)]
+        if existing:
+            keep &= ~np.isin(hashes, np.concatenate(existing))
+        rows = int(keep.sum())
+        if rows == 0:
+            logger.info(f"No new outcomes for {month}/{region} ({len(hashes)} duplicates)")
+            return 0
+        self._write_chunk(partition_path, {column: values[keep] for column, values in columns.items()},
+                          hashes[keep])
+        logger.info(f"Appended {rows} outcomes to {month}/{region} ({len(hashes) - rows} duplicates skipped)")
+        return rows
+
+    # Function to import an outcomes CSV chunk by chunk into one month and region
+    def import_csv(self, file_path, observed=None, region=DEFAULT_REGION, chunksize=1_000_000):
+        rows = 0
+        for chunk in pd.read_csv(file_path, chunksize=chunksize,
+                                 dtype={column: np.float32 for column in FEATURE_COLUMNS}):
+            rows += self.append(chunk, observed, region)
+        return rows
+
+    # Memory-mapped column arrays of every chunk in the selected partitions
+    def _chunk_columns(self, columns, start=None, end=None, regions=None):
+        for _, _, partition_path in self.partitions(start, end, regions):
+            for chunk in self._chunks(partition_path):
+                yield {column: np.load(column_path(chunk, column), mmap_mode='r') for column in columns}
+
+    def row_count(self, start=None, end=None, regions=None):
+        return sum(len(chunk['successful_plant'])
+                   for chunk in self._chunk_columns(['successful_plant'], start, end, regions))
+
+    # Function to read selected columns of the selected partitions as {column: array}
+    def read_columns(self, columns=None, start=None, end=None, regions=None):
+        columns = list(SCHEMA) if columns is None else list(columns)
+        unknown = [column for column in columns if column not in SCHEMA]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        chunks = list(self._chunk_columns(columns, start, end, regions))
+        if not chunks:
+            return {column: np.empty(0, dtype=SCHEMA[column] if SCHEMA[column] != 'str' else str)
+                    for column in columns}
+        return {column: np.concatenate([chunk[column] for chunk in chunks]) for column in columns}
+
+    def read(self, columns=None, start=None, end=None, regions=None):
+        return pd.DataFrame(self.read_columns(columns, start, end, regions))
+
+    # Function to build X, y for training like plant_model.historical_arrays. Each feature
+    # column is copied once, straight from its memory-mapped file into the float32 matrix.
+    def training_arrays(self, start=None, end=None, regions=None, features=FEATURE_COLUMNS):
+        chunks = list(self._chunk_columns(list(features) + ['successful_plant'], start, end, regions))
+        rows = sum(len(chunk['successful_plant']) for chunk in chunks)
+        X = np.empty((rows, len(features)), dtype=np.float32)
+        y = np.empty(rows, dtype='<U1')
+        offset = 0
+        for chunk in chunks:
+            n = len(chunk['successful_plant'])
+            for i, column in enumerate(features):
+                X[offset:offset + n, i] = chunk[column]
+            y[offset:offset + n] = chunk['successful_plant'].astype(str)
+            offset += n
+        logger.info(f"Read {rows} outcomes from {self.directory}")
+        return X, y
+
+    # Function to merge each partition's chunks into one, so reads open fewer files.
+    # Run it while nothing is appending; a crash midway can leave rows in two chunks.
+    def compact(self):
+        for month, region, partition_path in self.partitions():
+            chunks = self._chunks(partition_path)
+            if len(chunks) < 2:
+                continue
+            loaded = [{column: np.load(column_path(chunk, column), mmap_mode='r')
+                       for column in list(SCHEMA) + [HASH_COLUMN]} for chunk in chunks]
+            merged = {column: np.concatenate([chunk[column] for chunk in loaded]) for column in SCHEMA}
+            self._write_chunk(partition_path, merged, np.concatenate([chunk[HASH_COLUMN] for chunk in loaded]))
+            for chunk in chunks:
+                shutil.rmtree(chunk)
+            logger.info(f"Compacted {len(chunks)} chunks in {month}/{region}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the columnar store of historical planting outcomes')
+    parser.add_argument('--store', default=DEFAULT_OUTCOME_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    importer = subparsers.add_parser('import', help='append an outcomes CSV')
+    importer.add_argument('csv')
+    importer.add_argument('--observed', default=None, help='observation date, YYYY-MM-DD or YYYY-MM (default today)')
+    importer.add_argument('--region', default=DEFAULT_REGION)
+    subparsers.add_parser('compact', help="merge each partition's chunks")
+    subparsers.add_parser('info', help='list partitions and row counts')
+    args = parser.parse_args()
+
+    store = OutcomeStore(args.store)
+    if args.command == 'import':
+        store.import_csv(args.csv, args.observed, args.region)
+    elif args.command == 'compact':
+        store.compact()
+    else:
+        for month, region, _ in store.partitions():
+            logger.info(f"{month} {region}: {store.row_count(month, month, [region])} rows")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
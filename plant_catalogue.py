@@ -0,0 +1,122 @@
+import hashlib
+import numpy as np
+from plant_database import plant_database
+
+# plant_database range fields, in the same order as plant_model.FEATURE_COLUMNS
+CATALOGUE_FIELDS = [
+    'optimal_temperature',
+    'optimal_precipitation',
+    'optimal_solar_radiation',
+    'optimal_humidity',
+    'optimal_wind_speed',
+    'optimal_soil_moisture',
+    'optimal_clay_content',
+    'optimal_sand_content',
+    'optimal_silt_content',
+    'optimal_soil_ph',
+    'optimal_soil_organic_carbon'
+]
+
+
+# Plant catalogue backed by contiguous (n_plants, n_features, 2) min/max arrays.
+# Iterating or indexing it yields plant_database-style dicts, so it can be used
+# anywhere the plain list was.
+class PlantCatalogue:
+    def __init__(self, names, ranges, records=None):
+        self.names = np.asarray(names, dtype=str)
+        self.ranges = np.ascontiguousarray(ranges, dtype=np.float64)
+        if self.ranges.shape != (len(self.names), len(CATALOGUE_FIELDS), 2):
+            raise ValueError(f"Expected ranges of shape ({len(self.names)}, {len(CATALOGUE_FIELDS)}, 2), "
+                             f"got {self.ranges.shape}")
+        self._records = records
+        self.index = {name: row for row, name in enumerate(self.names.tolist())}
+        self._class_rows = {}
+        self._last_class_rows = None
+        self._version = None
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        names = [record['plant_name'] for record in records]
+        ranges = np.array([[record[field] for field in CATALOGUE_FIELDS] for record in records],
+                          dtype=np.float64).reshape(len(records), len(CATALOGUE_FIELDS), 2)
+        return cls(names, ranges, records)
+
+    @property
+    def minimums(self):
+        return self.ranges[:, :, 0]
+
+    @property
+    def maximums(self):
+        return self.ranges[:, :, 1]
+
+    @property
+    def midpoints(self):
+        return self.ranges.mean(axis=2)
+
+    # Short content hash of the names and ranges; changes whenever the catalogue does
+    @property
+    def version(self):
+        if self._version is None:
+            digest = hashlib.sha1('\0'.join(self.names.tolist()).encode())
+            digest.update(self.ranges.tobytes())
+            self._version = digest.hexdigest()[:12]
+        return self._version
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.record(self.index[key])
+        return self.record(key)
+
+    def record(self, row):
+        if self._records is not None:
+            return self._records[row]
+        record = {'plant_name': str(self.names[row])}
+        for field, (low, high) in zip(CATALOGUE_FIELDS, self.ranges[row].tolist()):
+            record[field] = (low, high)
+        return record
+
+    def get(self, name, default=None):
+        row = self.index.get(name)
+        return default if row is None else self.record(row)
+
+    def row_of(self, name):
+        return self.index.get(name, -1)
+
+    # Map model.classes_ to catalogue rows (-1 for classes not in the catalogue). Serving
+    # passes the same classes_ array on every call, so that is checked by identity first;
+    # other arrays are keyed on their bytes rather than a rebuilt tuple
+    def class_rows(self, classes):
+        last = self._last_class_rows
+        if last is not None and last[0] is classes:
+            return last[1]
+        names = np.asarray(classes, dtype=str)
+        key = (names.dtype.str, names.tobytes())
+        rows = self._class_rows.get(key)
+        if rows is None:
+            rows = np.array([self.index.get(name, -1) for name in names.tolist()], dtype=np.intp)
+            self._class_rows[key] = rows
+        self._last_class_rows = (classes, rows)
+        return rows
+
+
+# Function to accept either a PlantCatalogue or a plant_database-style list
+def as_catalogue(plants):
+    if isinstance(plants, PlantCatalogue):
+        return plants
+    if plants is plant_database and len(plants) == len(catalogue):
+        return catalogue
+    return PlantCatalogue.from_records(plants)
+
+
+catalogue = PlantCatalogue.from_records(plant_database)
@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import threading
+import logging
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, TimeoutError as FutureTimeoutError
+from http_client import shared_client
+from metrics import span, record_cache
+
+logger = logging.getLogger(__name__)
+
+PIXABAY_URL = "https://pixabay.com/api/?key=2b10itQ9lIJq3gulBGOljmPyWO&q={plant_name}+plant&image_type=photo&per_page=3"
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/200x200?text=No+Image"
+DEFAULT_THUMBNAIL_DIR = 'thumbnails'
+DEFAULT_MISS_TTL = 300   # seconds a failed or empty lookup serves the placeholder before retrying
+
+
+def pixabay_url(plant_name):
+    return PIXABAY_URL.format(plant_name=quote(plant_name))
+
+
+# Thread-safe in-memory cache whose entries expire after ttl seconds
+class TTLCache:
+    def __init__(self, ttl=24 * 3600, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() > expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._data, key=lambda k: self._data[k][1])
+                del self._data[oldest]
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Function to turn a plant name into a safe file name
+def thumbnail_filename(plant_name):
+    return re.sub(r'[^a-z0-9]+', '_', plant_name.lower()).strip('_') + '.jpg'
+
+
+# Resolves plant image URLs concurrently, with caching and optional local thumbnails
+class PlantImageResolver:
+    def __init__(self, timeout=3.0, deadline=5.0, max_workers=8, ttl=24 * 3600,
+                 thumbnail_dir=None, thumbnail_url_prefix='/thumbnails/', miss_ttl=DEFAULT_MISS_TTL):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cache = TTLCache(ttl=ttl)
+        self.miss_ttl = miss_ttl
+        self.thumbnail_dir = thumbnail_dir
+        self.thumbnail_url_prefix = thumbnail_url_prefix
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plant-image')
+        if thumbnail_dir:
+            os.makedirs(thumbnail_dir, exist_ok=True)
+
+    def _local_thumbnail(self, plant_name):
+        if not self.thumbnail_dir:
+            return None
+        filename = thumbnail_filename(plant_name)
+        if os.path.exists(os.path.join(self.thumbnail_dir, filename)):
+            return self.thumbnail_url_prefix + filename
+        return None
+
+    def _store_thumbnail(self, plant_name, image_url):
+        filename = thumbnail_filename(plant_name)
+        response = shared_client.get(image_url, timeout=self.timeout)
+        response.raise_for_status()
+        tmp_path = os.path.join(self.thumbnail_dir, filename + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, os.path.join(self.thumbnail_dir, filename))
+        return self.thumbnail_url_prefix + filename
+
+    def _fetch(self, plant_name):
+        try:
+            with span('pixabay_request'):
+                response = shared_client.get(pixabay_url(plant_name), timeout=self.timeout)
+            return self.found(plant_name, response.json())
+        except Exception as e:
+            logger.error(f"Error fetching image for {plant_name}: {str(e)}")
+        self.cache_miss(plant_name)
+        return None
+
+    # Function to cache the first hit of a decoded Pixabay response, storing its thumbnail
+    # when thumbnails are on; returns None, after caching the miss, if there are no hits
+    def found(self, plant_name, data):
+        if not data['hits']:
+            self.cache_miss(plant_name)
+            return None
+        image_url = data['hits'][0]['webformatURL']
+        if self.thumbnail_dir:
+            try:
+                image_url = self._store_thumbnail(plant_name, image_url)
+            except Exception as e:
+                logger.error(f"Error storing thumbnail for {plant_name}: {str(e)}")
+        self.cache.set(plant_name, image_url)
+        return image_url
+
+    # Function to serve the placeholder for a while after a failed or empty lookup,
+    # so an outage or an unknown plant does not cost a Pixabay call on every request
+    def cache_miss(self, plant_name):
+        self.cache.set(plant_name, PLACEHOLDER_IMAGE, ttl=self.miss_ttl)
+
+    def resolve(self, plant_name):
+        return self.resolve_many([plant_name])[plant_name]
+
+    # Cached or thumbnail URL for a plant, or None if it has to be fetched
+    def _cached(self, plant_name):
+        image_url = self.cache.get(plant_name) or self._local_thumbnail(plant_name)
+        record_cache('plant_image', bool(image_url))
+        # Only real images get their TTL extended; cached misses expire on schedule
+        if image_url and image_url != PLACEHOLDER_IMAGE:
+            self.cache.set(plant_name, image_url)
+        return image_url
+
+    def resolve_many(self, plant_names):
+        images = {}
+        pending = {}
+        for plant_name in dict.fromkeys(plant_names):
+            image_url = self._cached(plant_name)
+            if image_url:
+                images[plant_name] = image_url
+            else:
+                pending[self._executor.submit(self._fetch, plant_name)] = plant_name
+
+        if pending:
+            with span('image_wait'):
+                done, not_done = wait(pending, timeout=self.deadline)
+            for future in done:
+                images[pending[future]] = future.result()
+            for future in not_done:
+                logger.error(f"Image lookup for {pending[future]} missed the {self.deadline}s deadline")
+
+        return {name: images.get(name) or PLACEHOLDER_IMAGE for name in plant_names}
+
+    # Like resolve_many, but yields (plant_name, image_url) as each lookup finishes:
+    # cached images first, then fetches in completion order, placeholders for the rest
+    def iter_resolved(self, plant_names):
+        pending = {}
+        for plant_name in dict.fromkeys(plant_names):
+            image_url = self._cached(plant_name)
+            if image_url:
+                yield plant_name, image_url
+            else:
+                pending[self._executor.submit(self._fetch, plant_name)] = plant_name
+
+        try:
+            for future in as_completed(list(pending), timeout=self.deadline):
+                yield pending.pop(future), future.result() or PLACEHOLDER_IMAGE
+        except FutureTimeoutError:
+            for plant_name in pending.values():
+                logger.error(f"Image lookup for {plant_name} missed the {self.deadline}s deadline")
+                yield plant_name, PLACEHOLDER_IMAGE
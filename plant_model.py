@@ -8,24 +8,104 @@ from sklearn.impute import SimpleImputer
 import joblib
 import requests
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
 import sys
+import os
+import tempfile
 from plant_database import plant_database
+from plant_catalogue import as_catalogue
+from climate_cache import ClimateCache, grid_cell, cell_center, DEFAULT_CACHE_PATH
+from climate_tiles import ClimateTileStore, DEFAULT_TILE_DIR
+from climate_aggregates import ClimateAggregateStore
+from soil_grid import SoilGrid, DEFAULT_SOIL_DIR, SOIL_LAYERS
+from outcome_store import OutcomeStore, DEFAULT_OUTCOME_DIR
+from metrics import span, timed, record_cache, outbound_retries, inference_rows
+from resilience import RetryBudget, CircuitBreaker, stale_fallbacks
+from http_client import shared_client, HostBusyError
+from model_registry import peak_resident_memory
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Function to fetch climate data from NASA POWER API with retry mechanism
-def get_nasa_power_data(lat, lon, max_retries=3, delay=5):
-    base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-    
+# Model input columns, in the order the model was trained on
+FEATURE_COLUMNS = [
+    'avg_temperature',
+    'avg_precipitation',
+    'avg_solar_radiation',
+    'avg_humidity',
+    'avg_wind_speed',
+    'avg_soil_moisture',
+    'clay_content',
+    'sand_content',
+    'silt_content',
+    'soil_ph',
+    'soil_organic_carbon'
+]
+TARGET_COLUMN = 'successful_plant'
+
+# NASA POWER daily point endpoint; NASA_POWER_URL points it at a mirror or a local stub
+NASA_POWER_URL = os.environ.get('NASA_POWER_URL', "https://power.larc.nasa.gov/api/temporal/daily/point")
+
+# NASA POWER parameter behind each climate feature
+POWER_PARAMETERS = {
+    'avg_temperature': 'T2M',
+    'avg_precipitation': 'PRECTOTCORR',
+    'avg_solar_radiation': 'ALLSKY_SFC_SW_DWN',
+    'avg_humidity': 'RH2M',
+    'avg_wind_speed': 'WS2M',
+    'avg_soil_moisture': 'GWETPROF'  # This is the root zone soil moisture
+}
+POWER_FILL_VALUE = -999
+
+# Total time one get_nasa_power_data call may spend on NASA POWER, retries included,
+# and the cap on any single attempt
+NASA_POWER_DEADLINE = float(os.environ.get('NASA_POWER_DEADLINE', 10))
+NASA_POWER_ATTEMPT_TIMEOUT = float(os.environ.get('NASA_POWER_ATTEMPT_TIMEOUT', 6))
+
+# Shared by every caller in the process, so an outage is detected once and then fails fast
+nasa_breaker = CircuitBreaker('nasa_power', failure_threshold=5, reset_timeout=30)
+
+# Persistent climate cache keyed on a quantized grid cell and date window; the file is
+# created at CLIMATE_CACHE_PATH on the first lookup
+climate_cache = ClimateCache(os.environ.get('CLIMATE_CACHE_PATH', DEFAULT_CACHE_PATH))
+
+# Regional climate averages written by climate_prefetch.py, if that job has been run
+climate_tiles = ClimateTileStore.open_if_exists(os.environ.get('CLIMATE_TILE_DIR', DEFAULT_TILE_DIR))
+
+# Gridded soil properties converted by soil_grid.py; SOIL_GRID_BILINEAR=1 interpolates between cells
+soil_grid = SoilGrid.open_if_exists(os.environ.get('SOIL_GRID_DIR', DEFAULT_SOIL_DIR))
+SOIL_GRID_BILINEAR = os.environ.get('SOIL_GRID_BILINEAR') == '1'
+
+# Soil used where there is no soil grid, or the grid has no data for a point
+DEFAULT_SOIL = {
+    'clay_content': 20,
+    'sand_content': 30,
+    'silt_content': 50,
+    'soil_ph': 6.5,
+    'soil_organic_carbon': 3,
+    'soil_type': 'loam'
+}
+
+# Set CLIMATE_AGGREGATES_PATH to keep running daily sums per cell and fetch only the new days;
+# refreshes share get_nasa_power_data's deadline and circuit breaker through fetch_power_daily
+climate_aggregates = None
+if os.environ.get('CLIMATE_AGGREGATES_PATH'):
+    climate_aggregates = ClimateAggregateStore(lambda *args: fetch_power_daily(*args), POWER_PARAMETERS,
+                                               os.environ['CLIMATE_AGGREGATES_PATH'])
+
+# Function to get the trailing 364-day window ending yesterday
+def power_date_window():
     end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
     start_date = end_date - timedelta(days=364)
-    
-    parameters = {
-        "parameters": "T2M,PRECTOTCORR,ALLSKY_SFC_SW_DWN,RH2M,WS2M,GWETPROF",
+    return start_date, end_date
+
+# Function to build the NASA POWER query for a point and date range
+def power_request_params(lat, lon, start_date, end_date):
+    return {
+        "parameters": ",".join(POWER_PARAMETERS.values()),
         "community": "AG",
         "longitude": lon,
         "latitude": lat,
@@ -33,123 +113,294 @@ def get_nasa_power_data(lat, lon, max_retries=3, delay=5):
         "end": end_date.strftime("%Y%m%d"),
         "format": "JSON"
     }
+
+# Function to average the daily series of a NASA POWER response, skipping fill values
+def average_power_parameters(parameter_data):
+    df = pd.DataFrame(parameter_data).replace(POWER_FILL_VALUE, np.nan)
+    return {feature: float(df[parameter].mean()) for feature, parameter in POWER_PARAMETERS.items()}
+
+# Function to fetch the raw daily NASA POWER series for a point, raising on failure.
+# Retries back off exponentially with jitter inside a total deadline; once the circuit
+# breaker opens, calls fail fast without touching the network.
+def fetch_power_daily(lat, lon, start_date, end_date, max_retries=3, delay=0.5, deadline=None,
+                      breaker=nasa_breaker):
+    parameters = power_request_params(lat, lon, start_date, end_date)
+    budget = power_retry_budget(max_retries, delay, deadline)
     
-    for attempt in range(max_retries):
+    for attempt in budget.attempts():
+        if not power_attempt_allowed(breaker):
+            break
         try:
             logger.info(f"Requesting NASA POWER data for lat: {lat}, lon: {lon} (Attempt {attempt + 1})")
             logger.info(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-            response = requests.get(base_url, params=parameters)
+            with span('nasa_power_request'):
+                response = shared_client.get(NASA_POWER_URL, params=parameters, timeout=budget.timeout())
             response.raise_for_status()
             data = response.json()
-            
-            if 'properties' not in data or 'parameter' not in data['properties']:
-                logger.error("Unexpected API response structure")
-                logger.debug(f"API response: {data}")
-                return None
-            
-            df = pd.DataFrame(data['properties']['parameter'])
-            
-            averages = {
-                'avg_temperature': df['T2M'].mean(),
-                'avg_precipitation': df['PRECTOTCORR'].mean(),
-                'avg_solar_radiation': df['ALLSKY_SFC_SW_DWN'].mean(),
-                'avg_humidity': df['RH2M'].mean(),
-                'avg_wind_speed': df['WS2M'].mean(),
-                'avg_soil_moisture': df['GWETPROF'].mean()  # This is the root zone soil moisture
-            }
-            
-            return averages
-        
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP error occurred: {e}")
-            logger.debug(f"Response content: {e.response.content}")
-            logger.debug(f"Request URL: {e.response.url}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching NASA POWER data: {e}")
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            if not power_attempt_failed(e, breaker):
+                break
+        else:
+            return power_attempt_succeeded(data, breaker)
         
-        if attempt < max_retries - 1:
-            logger.info(f"Retrying in {delay} seconds...")
-            time.sleep(delay)
+        pause = power_retry_pause(budget, attempt)
+        if pause is None:
+            break
+        time.sleep(pause)
     
-    logger.error(f"Failed to fetch NASA POWER data after {max_retries} attempts")
-    return None
+    raise ConnectionError(f"Failed to fetch NASA POWER data within {budget.deadline}s")
 
-# Function to get soil data (placeholder)
+# The steps of fetch_power_daily's retry loop around the request itself, shared with the
+# event-loop version in asgi.py
+def power_retry_budget(max_retries=3, delay=0.5, deadline=None):
+    return RetryBudget(NASA_POWER_DEADLINE if deadline is None else deadline, max_retries, delay,
+                       attempt_timeout=NASA_POWER_ATTEMPT_TIMEOUT)
+
+def power_attempt_allowed(breaker):
+    if breaker is not None and not breaker.allow():
+        logger.warning("NASA POWER circuit breaker is open; skipping request")
+        return False
+    return True
+
+# Function to count a failed attempt against the breaker; returns whether a retry can help
+def power_attempt_failed(e, breaker):
+    if isinstance(e, HostBusyError):
+        # Our own per-host cap was full, so the request never reached NASA POWER
+        logger.warning(f"NASA POWER request not sent: {e}")
+        if breaker is not None:
+            breaker.release()
+        return True
+    if isinstance(e, requests.exceptions.HTTPError):
+        logger.error(f"HTTP error occurred: {e}")
+        logger.debug(f"Response content: {e.response.content}")
+        status = e.response.status_code
+        if status < 500 and status != 429:
+            # The request itself is wrong; NASA POWER is up, and retrying will not help
+            if breaker is not None:
+                breaker.record_success()
+            return False
+    else:
+        logger.error(f"Error fetching NASA POWER data: {e!r}")
+    if breaker is not None:
+        breaker.record_failure()
+    return True
+
+# Function to return the daily series of a decoded response, raising if it has none
+def power_attempt_succeeded(data, breaker):
+    if breaker is not None:
+        breaker.record_success()
+    if 'properties' not in data or 'parameter' not in data['properties']:
+        logger.debug(f"API response: {data}")
+        raise ValueError("Unexpected API response structure")
+    return data['properties']['parameter']
+
+def power_retry_pause(budget, attempt):
+    pause = budget.backoff(attempt)
+    if pause is not None:
+        logger.info(f"Retrying in {pause:.2f} seconds...")
+        outbound_retries.inc(upstream='nasa_power')
+    return pause
+
+# Function to mark the last cached averages for a cell as stale, when NASA POWER is unavailable
+def stale_climate_data(lat, lon, cache):
+    stale = cache.get_latest(lat, lon) if cache is not None else None
+    if stale is None:
+        return None
+    logger.warning(f"Serving stale climate data for lat: {lat}, lon: {lon}")
+    stale_fallbacks.inc(upstream='nasa_power')
+    return {**stale, 'stale': True}
+
+# Function to fetch climate averages from NASA POWER API with retry mechanism. When the
+# retries run out or the circuit breaker is open, the cell's last cached averages are
+# served instead, marked stale.
+def get_nasa_power_data(lat, lon, max_retries=3, delay=0.5, cache=climate_cache, deadline=None,
+                        breaker=nasa_breaker):
+    cached = cached_climate_data(lat, lon, cache)
+    if cached is not None:
+        return cached
+    return fetch_climate_averages(lat, lon, max_retries, delay, cache, deadline, breaker)
+
+# Function to fetch and cache a point's averages, skipping the cache lookup
+def fetch_climate_averages(lat, lon, max_retries=3, delay=0.5, cache=climate_cache, deadline=None,
+                           breaker=nasa_breaker):
+    start_date, end_date = power_date_window()
+    try:
+        parameter_data = fetch_power_daily(lat, lon, start_date, end_date, max_retries, delay, deadline, breaker)
+    except (ValueError, ConnectionError) as e:
+        return fetch_failed_climate_data(lat, lon, e, cache)
+    return store_power_averages(lat, lon, start_date, end_date, parameter_data, cache)
+
+# Function to look up the cached averages for a point's current NASA POWER window
+def cached_climate_data(lat, lon, cache=climate_cache):
+    if cache is None:
+        return None
+    start_date, end_date = power_date_window()
+    cached = cache.get(lat, lon, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"))
+    record_cache('climate', cached is not None)
+    if cached is not None:
+        logger.info(f"Climate cache hit for lat: {lat}, lon: {lon}")
+    return cached
+
+# Function to average a fetched daily series and cache it for the window it covers
+def store_power_averages(lat, lon, start_date, end_date, parameter_data, cache=climate_cache):
+    averages = average_power_parameters(parameter_data)
+    if cache is not None:
+        cache.set(lat, lon, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"), averages)
+    return averages
+
+# Function to handle a failed fetch: no data for a malformed response, otherwise the stale fallback
+def fetch_failed_climate_data(lat, lon, error, cache=climate_cache):
+    logger.error(str(error))
+    if isinstance(error, ValueError):
+        return None
+    return stale_climate_data(lat, lon, cache)
+
+# Function to get soil data from the local soil grid
+@timed('soil_lookup')
 def get_soil_data(lat, lon):
-    # Placeholder data - replace with actual API call or data source
-    return {
-        'clay_content': 20,
-        'sand_content': 30,
-        'silt_content': 50,
-        'soil_ph': 6.5,
-        'soil_organic_carbon': 3,
-        'soil_type': 'loam'
-    }
+    if soil_grid is not None:
+        soil_data = soil_grid.lookup(lat, lon, SOIL_GRID_BILINEAR)
+        if soil_data is not None:
+            return soil_data
+        logger.debug(f"No soil grid data for lat: {lat}, lon: {lon}; using defaults")
+    return dict(DEFAULT_SOIL)
+
+# Function to get soil features for many coordinates at once, as an (N, 5) array in SOIL_LAYERS order
+def get_soil_features(coords):
+    defaults = np.array([DEFAULT_SOIL[layer] for layer in SOIL_LAYERS], dtype=float)
+    if soil_grid is None or not coords:
+        return np.tile(defaults, (len(coords), 1))
+    lats, lons = zip(*coords)
+    with span('soil_lookup'):
+        values = soil_grid.lookup_many(lats, lons, SOIL_GRID_BILINEAR)
+    values[np.isnan(values).any(axis=1)] = defaults
+    return values
+
+# Function to get climate averages for a point: the prefetched tiles, then the daily
+# aggregates, then NASA POWER
+def get_climate_data(lat, lon):
+    climate_data, found = local_climate_data(lat, lon)
+    if not found:
+        climate_data = fetch_climate_averages(lat, lon, cache=climate_cache)
+    return climate_data
+
+# Function to look up a point's climate averages without a direct NASA POWER request: the
+# prefetched tiles, the daily aggregates, then the climate cache. Returns (climate_data, found);
+# found is False when the caller still has to fetch from NASA POWER.
+def local_climate_data(lat, lon):
+    climate_data = climate_tiles.get(lat, lon, *power_date_window()) if climate_tiles is not None else None
+    if climate_tiles is not None:
+        record_cache('climate_tiles', climate_data is not None)
+    if climate_data is None and climate_aggregates is not None:
+        try:
+            climate_data = climate_aggregates.get(lat, lon)
+        except Exception as e:
+            # The refresh has already spent this request's NASA POWER budget
+            logger.error(f"Error refreshing climate aggregates: {e}")
+            return stale_climate_data(lat, lon, climate_cache), True
+    if climate_data is None:
+        climate_data = cached_climate_data(lat, lon, climate_cache)
+    return climate_data, climate_data is not None
 
 # Function to combine climate and soil data
+@timed('land_data')
 def get_land_data(lat, lon):
-    climate_data = get_nasa_power_data(lat, lon)
+    return combine_land_data(get_climate_data(lat, lon), get_soil_data(lat, lon))
+
+def combine_land_data(climate_data, soil_data):
     if climate_data is None:
         logger.error("Failed to get climate data")
         return None
-    
-    soil_data = get_soil_data(lat, lon)
     return {**climate_data, **soil_data}
 
 # Function to load historical data from CSV
 def load_historical_data(file_path):
     try:
-        df = pd.read_csv(file_path)
-        historical_data = df.to_dict('records')
-        logger.info(f"Loaded {len(historical_data)} historical records from {file_path}")
-        return historical_data
+        df = pd.read_csv(file_path, usecols=FEATURE_COLUMNS + [TARGET_COLUMN],
+                         dtype={column: np.float32 for column in FEATURE_COLUMNS})
+        logger.info(f"Loaded {len(df)} historical records from {file_path}")
+        return df
     except Exception as e:
         logger.error(f"Error loading historical data from {file_path}: {e}")
-        return []
+        return pd.DataFrame(columns=FEATURE_COLUMNS + [TARGET_COLUMN])
+
+# Function to turn a historical DataFrame (or list of records) into X, y arrays
+def historical_arrays(historical_data):
+    if not isinstance(historical_data, pd.DataFrame):
+        historical_data = pd.DataFrame.from_records(historical_data, columns=FEATURE_COLUMNS + [TARGET_COLUMN])
+    X = historical_data[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    y = historical_data[TARGET_COLUMN].astype(str).to_numpy().astype(str)
+    return X, y
+
+# Function to add one row per plant_database entry, using the midpoint of each optimal range
+def add_catalogue_rows(X, y, plant_database):
+    catalogue = as_catalogue(plant_database)
+    X = np.concatenate([X, catalogue.midpoints.astype(np.float32)])
+    y = np.concatenate([y, catalogue.names])
+    return X, y
 
 # Updated function to prepare data for the model
 def prepare_data(historical_data, plant_database):
-    X = []
-    y = []
-    for data in historical_data:
-        X.append([
-            data['avg_temperature'],
-            data['avg_precipitation'],
-            data['avg_solar_radiation'],
-            data['avg_humidity'],
-            data['avg_wind_speed'],
-            data['avg_soil_moisture'],
-            data['clay_content'],
-            data['sand_content'],
-            data['silt_content'],
-            data['soil_ph'],
-            data['soil_organic_carbon']
-        ])
-        y.append(data['successful_plant'])
+    X, y = historical_arrays(historical_data)
+    return add_catalogue_rows(X, y, plant_database)
+
+# Function to prepare data from an OutcomeStore, reading only the feature and target
+# columns of the partitions between the start and end months and in the given regions
+def prepare_data_from_store(store, plant_database, start=None, end=None, regions=None):
+    X, y = store.training_arrays(start, end, regions, FEATURE_COLUMNS)
+    return add_catalogue_rows(X, y, plant_database)
+
+# Function to stream X, y chunks from a CSV too large to load at once
+def iter_historical_chunks(file_path, chunksize=1_000_000):
+    reader = pd.read_csv(file_path, usecols=FEATURE_COLUMNS + [TARGET_COLUMN],
+                         dtype={column: np.float32 for column in FEATURE_COLUMNS}, chunksize=chunksize)
+    for chunk in reader:
+        yield historical_arrays(chunk)
+
+# Function to prepare data from a CSV chunk by chunk, reporting time per million rows and peak memory.
+# Each chunk's features are appended to an anonymous temporary file and X comes back
+# memory-mapped from it, so only one chunk of features is in memory at a time. The labels
+# are still held in memory, and train_model's split copies X, so training memory still
+# grows with the file.
+def prepare_data_chunked(file_path, plant_database, chunksize=1_000_000):
+    start = time.perf_counter()
+    peak_before = peak_resident_memory()
+    features = tempfile.TemporaryFile()
+    y_chunks = []
+    rows = 0
+    for X_chunk, y_chunk in iter_historical_chunks(file_path, chunksize):
+        X_chunk.tofile(features)
+        y_chunks.append(y_chunk)
+        rows += len(X_chunk)
+        logger.info(f"Prepared {rows} rows from {file_path}")
     
-    # Add data from plant_database
-    for plant in plant_database:
-        X.append([
-            np.mean(plant['optimal_temperature']),
-            np.mean(plant['optimal_precipitation']),
-            np.mean(plant['optimal_solar_radiation']),
-            np.mean(plant['optimal_humidity']),
-            np.mean(plant['optimal_wind_speed']),
-            np.mean(plant['optimal_soil_moisture']),
-            np.mean(plant['optimal_clay_content']),
-            np.mean(plant['optimal_sand_content']),
-            np.mean(plant['optimal_silt_content']),
-            np.mean(plant['optimal_soil_ph']),
-            np.mean(plant['optimal_soil_organic_carbon'])
-        ])
-        y.append(plant['plant_name'])
+    catalogue = as_catalogue(plant_database)
+    catalogue.midpoints.astype(np.float32).tofile(features)
+    features.flush()
+    X = np.memmap(features, dtype=np.float32, mode='r', shape=(rows + len(catalogue.names), len(FEATURE_COLUMNS)))
+    y = np.concatenate(y_chunks + [catalogue.names])
     
-    return np.array(X), np.array(y)
+    elapsed = time.perf_counter() - start
+    millions = max(rows, 1) / 1e6
+    # X lives in the temporary file, so its nbytes says nothing about memory; the peak RSS
+    # does, and how much it grew is what this call needed beyond what was already used
+    peak = peak_resident_memory()
+    memory = '' if peak is None else (f", peak RSS {peak / 2**20:.1f} MiB, "
+                                      f"{(peak - peak_before) / 2**20:.1f} MiB above the peak before")
+    logger.info(f"Prepared {rows} rows in {elapsed:.2f}s ({elapsed / millions:.2f}s per million rows{memory})")
+    return X, y
 
-# Function to train the model
-def train_model(X, y):
+# Forest settings used by train_model unless overridden
+DEFAULT_FOREST_PARAMS = {
+    'n_estimators': 200,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'max_features': 'sqrt',
+    'random_state': 42
+}
+
+# Function to train the model; trees are built on all cores unless n_jobs says otherwise
+def train_model(X, y, n_jobs=-1, **forest_params):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     imputer = SimpleImputer(strategy='mean')
@@ -160,8 +411,10 @@ def train_model(X, y):
     X_train_scaled = scaler.fit_transform(X_train_imputed)
     X_test_scaled = scaler.transform(X_test_imputed)
     
-    model = RandomForestClassifier(n_estimators=200, min_samples_split=5, min_samples_leaf=2, max_features='sqrt', random_state=42)
+    model = RandomForestClassifier(**{**DEFAULT_FOREST_PARAMS, **forest_params}, n_jobs=n_jobs)
     model.fit(X_train_scaled, y_train)
+    # Serving predicts a row or two at a time, where a thread pool costs more than it saves
+    model.set_params(n_jobs=None)
     
     y_pred = model.predict(X_test_scaled)
     accuracy = accuracy_score(y_test, y_pred)
@@ -173,51 +426,115 @@ def train_model(X, y):
 
 # Function to save the trained model
 def save_model(model, imputer, scaler, filename='plant_recommendation_model'):
-    joblib.dump((model, imputer, scaler), f"{filename}.joblib")
+    # Write to a temporary file and rename, so a running app never reads a partial artifact
+    joblib.dump((model, imputer, scaler), f"{filename}.joblib.tmp")
+    os.replace(f"{filename}.joblib.tmp", f"{filename}.joblib")
     logger.info(f"Model saved as {filename}.joblib")
 
 # Function to load a saved model
-def load_model(filename='plant_recommendation_model'):
-    model, imputer, scaler = joblib.load(f"{filename}.joblib")
+def load_model(filename='plant_recommendation_model', mmap_mode=None):
+    model, imputer, scaler = joblib.load(f"{filename}.joblib", mmap_mode=mmap_mode)
     return model, imputer, scaler
 
 # Function to recommend plants based on land data
-def recommend_plants(lat, lon, model, imputer, scaler, plant_database):
+def recommend_plants(lat, lon, model, imputer, scaler, plant_database, top_k=5, forest=None):
     land_data = get_land_data(lat, lon)
     if land_data is None:
         logger.error("Unable to get land data for recommendations")
         return []
     
-    input_data = np.array([[
-        land_data['avg_temperature'],
-        land_data['avg_precipitation'],
-        land_data['avg_solar_radiation'],
-        land_data['avg_humidity'],
-        land_data['avg_wind_speed'],
-        land_data['avg_soil_moisture'],
-        land_data['clay_content'],
-        land_data['sand_content'],
-        land_data['silt_content'],
-        land_data['soil_ph'],
-        land_data['soil_organic_carbon']
-    ]])
-    
-    input_imputed = imputer.transform(input_data)
-    input_scaled = scaler.transform(input_imputed)
-    
-    probabilities = model.predict_proba(input_scaled)[0]
-    plant_scores = list(zip(model.classes_, probabilities))
+    return recommend_for_land_data(land_data, model, imputer, scaler, plant_database, top_k, forest)
+
+# Function to score raw feature rows, returning (classes, probabilities). A flattened
+# forest (forest_engine.FlatForest), when given, imputes, scales and walks the trees in
+# one vectorized pass instead.
+def predict_probabilities(input_data, model, imputer, scaler, forest=None):
+    if forest is not None:
+        return forest.classes_, forest.predict_proba(input_data)
+    return model.classes_, model.predict_proba(scaler.transform(imputer.transform(input_data)))
+
+# Function to score already-fetched land data and return the top_k plants
+def recommend_for_land_data(land_data, model, imputer, scaler, plant_database, top_k=5, forest=None):
+    input_data = np.array([[land_data[column] for column in FEATURE_COLUMNS]])
     
-    recommendations = sorted(plant_scores, key=lambda x: x[1], reverse=True)[:5]
+    with span('model_inference'):
+        classes, probabilities = predict_probabilities(input_data, model, imputer, scaler, forest)
+    inference_rows.observe(1)
+    return rank_plants(classes, probabilities[0], plant_database, top_k)
+
+# Function to turn one row of class probabilities into the top_k catalogue plants
+def rank_plants(classes, probabilities, plant_database, top_k=5):
+    top, top_scores = top_classes(np.asarray(probabilities)[np.newaxis], top_k)
     
+    catalogue = as_catalogue(plant_database)
+    class_rows = catalogue.class_rows(classes)
     plant_recommendations = []
-    for plant, score in recommendations:
-        plant_data = next((item for item in plant_database if item['plant_name'] == plant), None)
-        if plant_data:
-            plant_recommendations.append({'plant': plant, 'score': score, 'data': plant_data})
+    for class_index, score in zip(top[0], top_scores[0]):
+        catalogue_row = class_rows[class_index]
+        if catalogue_row >= 0:
+            plant_recommendations.append({'plant': classes[class_index], 'score': score,
+                                          'data': catalogue.record(catalogue_row)})
     
     return plant_recommendations
 
+# Function to get the top_k class indices and scores of each row, best first, without
+# sorting every class
+def top_classes(probabilities, top_k):
+    k = min(top_k, probabilities.shape[1])
+    if k <= 0:
+        empty = np.empty((len(probabilities), 0), dtype=np.intp)
+        return empty, probabilities[:, :0]
+    top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(probabilities, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+# Function to recommend plants for many coordinates in one pass
+def recommend_plants_batch(coords, model, imputer, scaler, plant_database, top_k=5, max_workers=8, forest=None):
+    coords = list(coords)
+    if not coords:
+        return []
+    
+    # Points in the same climate cell share one climate lookup
+    cells = [grid_cell(lat, lon, climate_cache.resolution) for lat, lon in coords]
+    unique_cells = list(dict.fromkeys(cells))
+    logger.info(f"Fetching climate data for {len(unique_cells)} cells covering {len(coords)} coordinates")
+    
+    def fetch_cell(cell):
+        lat, lon = cell_center(cell, climate_cache.resolution)
+        return get_climate_data(lat, lon)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        cell_climate = dict(zip(unique_cells, executor.map(fetch_cell, unique_cells)))
+    
+    climate_columns = FEATURE_COLUMNS[:-len(SOIL_LAYERS)]
+    valid = [i for i, cell in enumerate(cells) if cell_climate[cell] is not None]
+    
+    results = [[] for _ in coords]
+    if not valid:
+        logger.error("Unable to get land data for any coordinate in the batch")
+        return results
+    
+    climate = np.array([[cell_climate[cells[i]][column] for column in climate_columns] for i in valid], dtype=float)
+    soil = get_soil_features([coords[i] for i in valid])
+    input_data = np.hstack([climate, soil])
+    with span('model_inference'):
+        classes, probabilities = predict_probabilities(input_data, model, imputer, scaler, forest)
+    inference_rows.observe(len(input_data))
+    
+    top, top_scores = top_classes(probabilities, top_k)
+    
+    catalogue = as_catalogue(plant_database)
+    class_rows = catalogue.class_rows(classes)
+    for row, i in enumerate(valid):
+        for class_index, score in zip(top[row], top_scores[row]):
+            catalogue_row = class_rows[class_index]
+            if catalogue_row >= 0:
+                results[i].append({'plant': classes[class_index], 'score': score,
+                                   'data': catalogue.record(catalogue_row)})
+    
+    return results
+
 # Main function
 def main():
     latitude = 40.7128
@@ -233,14 +550,21 @@ def main():
     except Exception as e:
         logger.info(f"Training new model... (Reason: {e})")
         
-        # Load historical data from CSV
-        historical_data = load_historical_data('C:/Users/user/Desktop/mmm/plant_historical_data.csv')
+        # Train from the outcome store when there is one, otherwise from the CSV
+        store = OutcomeStore.open_if_exists(os.environ.get('PLANT_OUTCOME_STORE', DEFAULT_OUTCOME_DIR))
+        if store is not None:
+            rows = store.row_count()
+            X, y = prepare_data_from_store(store, plant_database)
+        else:
+            historical_data = load_historical_data(os.environ.get('PLANT_HISTORICAL_DATA',
+                                                                  'plant_historical_data.csv'))
+            rows = len(historical_data)
+            X, y = prepare_data(historical_data, plant_database)
         
-        if not historical_data:
+        if rows == 0:
             logger.error("No historical data available. Cannot train model.")
             return
         
-        X, y = prepare_data(historical_data, plant_database)
         model, imputer, scaler = train_model(X, y)
         save_model(model, imputer, scaler)
     
@@ -0,0 +1,148 @@
+import sqlite3
+import json
+import time
+import argparse
+import logging
+from datetime import timedelta
+from climate_cache import grid_cell, cell_center
+from storage import SQLiteDatabase, LocationStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = 'plants.db'
+DEFAULT_TILE_RESOLUTION = 0.1  # degrees, matching the climate cache cells
+# How many days the climate window a tile was scored on may trail the current one; a
+# 365-day average barely moves in a week, but a tile from last season is a miss
+DEFAULT_MAX_WINDOW_LAG_DAYS = 7
+DAY_FORMAT = '%Y%m%d'
+
+
+# Precomputed top-k recommendations per grid tile, stored in plants.db with the end of
+# the NASA POWER window their climate data covered
+class RecommendationTileStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH, resolution=DEFAULT_TILE_RESOLUTION,
+                 max_window_lag_days=DEFAULT_MAX_WINDOW_LAG_DAYS):
+        self.database = SQLiteDatabase(db_path)
+        self.resolution = resolution
+        self.max_window_lag = timedelta(days=max_window_lag_days)
+
+    def init_db(self):
+        conn = self.database.connection()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS recommendation_tiles
+                            (tile_lat INTEGER NOT NULL,
+                             tile_lon INTEGER NOT NULL,
+                             model_version TEXT NOT NULL,
+                             recommendations TEXT NOT NULL,
+                             created_at REAL NOT NULL,
+                             climate_end TEXT NOT NULL DEFAULT '',
+                             PRIMARY KEY (tile_lat, tile_lon, model_version))''')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(recommendation_tiles)')]
+            if 'climate_end' not in columns:
+                # Tiles stored before the window was recorded count as outdated
+                conn.execute("ALTER TABLE recommendation_tiles ADD COLUMN climate_end TEXT NOT NULL DEFAULT ''")
+
+    def tile_of(self, lat, lon):
+        return grid_cell(lat, lon, self.resolution)
+
+    # Oldest climate window end still served when the current window ends at window_end
+    def oldest_window_end(self, window_end):
+        return (window_end - self.max_window_lag).strftime(DAY_FORMAT)
+
+    # Recommendations for the point's tile, or None; with window_end, tiles scored on a
+    # climate window more than max_window_lag older are misses
+    def get(self, lat, lon, model_version, window_end=None):
+        tile_lat, tile_lon = self.tile_of(lat, lon)
+        oldest_end = self.oldest_window_end(window_end) if window_end is not None else ''
+        try:
+            row = self.database.connection().execute(
+                '''SELECT recommendations FROM recommendation_tiles
+                   WHERE tile_lat = ? AND tile_lon = ? AND model_version = ? AND climate_end >= ?''',
+                (tile_lat, tile_lon, model_version, oldest_end)).fetchone()
+        except sqlite3.OperationalError:
+            # Table not created yet, so nothing is precomputed
+            return None
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, tiles, model_version, window_end):
+        now = time.time()
+        climate_end = window_end.strftime(DAY_FORMAT)
+        conn = self.database.connection()
+        with conn:
+            conn.executemany('''INSERT OR REPLACE INTO recommendation_tiles
+                                (tile_lat, tile_lon, model_version, recommendations, created_at, climate_end)
+                                VALUES (?, ?, ?, ?, ?, ?)''',
+                             [(tile[0], tile[1], model_version, json.dumps(recommendations), now, climate_end)
+                              for tile, recommendations in tiles])
+
+    # Drop tiles computed by any other model version or, with window_end, on an outdated climate window
+    def invalidate(self, model_version, window_end=None):
+        oldest_end = self.oldest_window_end(window_end) if window_end is not None else ''
+        conn = self.database.connection()
+        with conn:
+            deleted = conn.execute('DELETE FROM recommendation_tiles WHERE model_version != ? OR climate_end < ?',
+                                   (model_version, oldest_end)).rowcount
+        logger.info(f"Invalidated {deleted} recommendation tiles not built by model {model_version} "
+                    f"on a climate window ending {oldest_end or 'any day'} or later")
+        return deleted
+
+    def tiles_in_bbox(self, south, west, north, east):
+        lat_min, lon_min = self.tile_of(south, west)
+        lat_max, lon_max = self.tile_of(north, east)
+        return [(tile_lat, tile_lon)
+                for tile_lat in range(lat_min, lat_max + 1)
+                for tile_lon in range(lon_min, lon_max + 1)]
+
+    # The tiles users ask about most, as of the last user_locations rollup (storage.py --maintain)
+    def popular_tiles(self, limit=100):
+        locations = LocationStore(self.database.path, resolution=self.resolution)
+        locations.init_db()
+        return [tile for tile, _ in locations.heatmap(limit=limit)]
+
+
+# Function to compute and store recommendations for the given tiles
+def precompute_tiles(store, tiles, model, imputer, scaler, plant_database, model_version, top_k=5, forest=None):
+    tiles = list(dict.fromkeys(tiles))
+    if not tiles:
+        return 0
+    from plant_model import recommend_plants_batch, power_date_window
+    coords = [cell_center(tile, store.resolution) for tile in tiles]
+    start = time.perf_counter()
+    _, window_end = power_date_window()
+    results = recommend_plants_batch(coords, model, imputer, scaler, plant_database, top_k=top_k, forest=forest)
+    computed = [(tile, [{'plant': str(rec['plant']), 'score': float(rec['score'])} for rec in recommendations])
+                for tile, recommendations in zip(tiles, results) if recommendations]
+    store.put_many(computed, model_version, window_end)
+    logger.info(f"Precomputed {len(computed)} of {len(tiles)} tiles in {time.perf_counter() - start:.1f}s")
+    return len(computed)
+
+
+def main():
+    from model_registry import ModelRegistry
+    from plant_catalogue import catalogue
+    from plant_model import power_date_window
+
+    parser = argparse.ArgumentParser(description='Precompute recommendations per grid tile')
+    parser.add_argument('--bbox', nargs=4, type=float, metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'))
+    parser.add_argument('--popular', type=int, default=0, help='also precompute the N most requested tiles')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--model', default='plant_recommendation_model')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model)
+    model, imputer, scaler = registry.load()
+    store = RecommendationTileStore(args.db)
+    store.init_db()
+    store.invalidate(registry.version, power_date_window()[1])
+
+    tiles = []
+    if args.bbox:
+        tiles += store.tiles_in_bbox(*args.bbox)
+    if args.popular:
+        tiles += store.popular_tiles(args.popular)
+    precompute_tiles(store, tiles, model, imputer, scaler, catalogue, registry.version, args.top_k, registry.forest)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,107 @@
+import time
+import random
+import threading
+import logging
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+breaker_transitions = registry.counter('plant_circuit_breaker_transitions_total',
+                                       'Circuit breaker state changes by breaker and new state')
+stale_fallbacks = registry.counter('plant_stale_fallbacks_total',
+                                   'Responses served from stale data because an upstream failed')
+
+
+# Time and attempt budget for one logical call, including all its retries.
+# Backoff is exponential with full jitter and never sleeps past the deadline.
+class RetryBudget:
+    def __init__(self, deadline, max_attempts=3, base_delay=0.5, max_delay=8.0, attempt_timeout=None):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.expires_at = time.monotonic() + deadline
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def attempts(self):
+        for attempt in range(self.max_attempts):
+            if self.remaining() <= 0:
+                return
+            yield attempt
+
+    # Timeout for the next attempt: the per-attempt cap, clipped to what is left
+    def timeout(self):
+        remaining = self.remaining()
+        return remaining if self.attempt_timeout is None else min(self.attempt_timeout, remaining)
+
+    # Seconds to wait before retrying after this attempt, or None if no retry fits in the budget
+    def backoff(self, attempt):
+        if attempt >= self.max_attempts - 1:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if delay >= self.remaining():
+            return None
+        return delay
+
+
+# Fails fast after failure_threshold consecutive failures. After reset_timeout seconds one
+# probe call is let through (half-open); its result closes or re-opens the breaker.
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        if state != self.state:
+            logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+            breaker_transitions.inc(breaker=self.name, state=state)
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    # An attempt that never reached the dependency; frees a half-open probe slot
+    # without counting for or against it
+    def release(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def status(self):
+        return {'name': self.name, 'state': self.state, 'failures': self.failures}
@@ -0,0 +1,218 @@
+import os
+import math
+import json
+import argparse
+import logging
+import numpy as np
+
+try:
+    import rasterio
+except ImportError:
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOIL_DIR = 'soil_grid'
+# Same order as the soil columns of plant_model.FEATURE_COLUMNS
+SOIL_LAYERS = [
+    'clay_content',
+    'sand_content',
+    'silt_content',
+    'soil_ph',
+    'soil_organic_carbon'
+]
+# SoilGrids stores clay/sand/silt in g/kg, pH x10 and organic carbon in dg/kg;
+# these factors convert them to %, pH and %, the units of the training data
+SOILGRIDS_SCALES = {
+    'clay_content': 0.1,
+    'sand_content': 0.1,
+    'silt_content': 0.1,
+    'soil_ph': 0.1,
+    'soil_organic_carbon': 0.01
+}
+
+
+# Function to read an ESRI ASCII grid into (values, geotransform, nodata).
+# geotransform is (origin_lon, pixel_width, origin_lat, pixel_height) of the top-left corner.
+def read_ascii_grid(path):
+    header = {}
+    with open(path) as f:
+        for _ in range(6):
+            position = f.tell()
+            line = f.readline()
+            # Keys and values may be separated by any run of spaces or tabs
+            parts = line.split(None, 1)
+            if len(parts) != 2 or parts[0].lower() not in ('ncols', 'nrows', 'xllcorner', 'yllcorner', 'xllcenter',
+                                                           'yllcenter', 'cellsize', 'nodata_value'):
+                f.seek(position)
+                break
+            header[parts[0].lower()] = float(parts[1])
+        values = np.loadtxt(f, dtype=np.float32, ndmin=2)
+    rows, cols, size = int(header['nrows']), int(header['ncols']), header['cellsize']
+    if values.shape != (rows, cols):
+        raise ValueError(f"{path}: header says {rows}x{cols}, data is {values.shape[0]}x{values.shape[1]}")
+    left = header['xllcorner'] if 'xllcorner' in header else header['xllcenter'] - size / 2
+    bottom = header['yllcorner'] if 'yllcorner' in header else header['yllcenter'] - size / 2
+    return values, (left, size, bottom + rows * size, -size), header.get('nodata_value')
+
+# Function to read one raster band: ESRI ASCII grids natively, anything else through rasterio
+def read_raster(path):
+    if path.lower().endswith('.asc'):
+        return read_ascii_grid(path)
+    if rasterio is None:
+        raise ImportError(f"Reading {path} needs rasterio; convert it to an ESRI ASCII grid (.asc) or install rasterio")
+    with rasterio.open(path) as src:
+        transform = src.transform
+        if transform.b != 0 or transform.d != 0:
+            raise ValueError(f"{path} is rotated; only north-up rasters are supported")
+        return src.read(1).astype(np.float32), (transform.c, transform.a, transform.f, transform.e), src.nodata
+
+# Function to convert one raster per soil layer into a memory-mappable grid directory
+def convert_rasters(sources, directory=DEFAULT_SOIL_DIR, scales=None):
+    missing = [layer for layer in SOIL_LAYERS if layer not in sources]
+    if missing:
+        raise ValueError(f"Missing rasters for {', '.join(missing)}")
+    scales = scales or {}
+
+    grid = None
+    geotransform = None
+    for i, layer in enumerate(SOIL_LAYERS):
+        values, transform, nodata = read_raster(sources[layer])
+        if grid is None:
+            grid = np.full(values.shape + (len(SOIL_LAYERS),), np.nan, dtype=np.float32)
+            geotransform = transform
+        elif values.shape != grid.shape[:2] or not np.allclose(transform, geotransform):
+            raise ValueError(f"{sources[layer]} is not on the same grid as {sources[SOIL_LAYERS[0]]}")
+        values = values.astype(np.float32)
+        if nodata is not None:
+            values[values == nodata] = np.nan
+        grid[:, :, i] = values * scales.get(layer, 1.0)
+        logger.info(f"Read {layer} from {sources[layer]} ({values.shape[0]}x{values.shape[1]})")
+
+    os.makedirs(directory, exist_ok=True)
+    values_path = os.path.join(directory, 'values.f32')
+    grid.tofile(values_path + '.tmp')
+    os.replace(values_path + '.tmp', values_path)
+    meta = {'layers': SOIL_LAYERS, 'rows': grid.shape[0], 'cols': grid.shape[1],
+            'geotransform': list(geotransform)}
+    with open(os.path.join(directory, 'grid.json.tmp'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(os.path.join(directory, 'grid.json.tmp'), os.path.join(directory, 'grid.json'))
+    logger.info(f"Wrote {grid.nbytes / 2**20:.1f} MiB soil grid to {directory}")
+    return directory
+
+# Function to name the USDA texture class for a clay/sand/silt mix (percentages)
+def texture_class(clay, sand, silt):
+    if silt + 1.5 * clay < 15:
+        return 'sand'
+    if silt + 2 * clay < 30:
+        return 'loamy sand'
+    if clay >= 40:
+        if silt >= 40:
+            return 'silty clay'
+        return 'clay' if sand <= 45 else 'sandy clay'
+    if clay >= 35 and sand > 45:
+        return 'sandy clay'
+    if clay >= 27:
+        if sand <= 20:
+            return 'silty clay loam'
+        return 'clay loam' if sand <= 45 else 'sandy clay loam'
+    if clay >= 20 and sand > 45 and silt < 28:
+        return 'sandy clay loam'
+    if silt >= 80 and clay < 12:
+        return 'silt'
+    if silt >= 50:
+        return 'silt loam'
+    if clay >= 7 and sand <= 52:
+        return 'loam'
+    return 'sandy loam'
+
+
+# Gridded soil properties in a float32 (rows, cols, layers) array, memory-mapped
+# read-only so every worker process shares the same pages through the page cache.
+# Cell (row, col) covers lon origin_lon + col * pixel_width and lat origin_lat + row * pixel_height.
+class SoilGrid:
+    def __init__(self, directory=DEFAULT_SOIL_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, 'grid.json')) as f:
+            meta = json.load(f)
+        if meta['layers'] != SOIL_LAYERS:
+            raise ValueError(f"{directory} has layers {meta['layers']}, expected {SOIL_LAYERS}")
+        self.rows, self.cols = meta['rows'], meta['cols']
+        self.origin_lon, self.pixel_width, self.origin_lat, self.pixel_height = meta['geotransform']
+        self.values = np.memmap(os.path.join(directory, 'values.f32'), dtype=np.float32, mode='r',
+                                shape=(self.rows, self.cols, len(SOIL_LAYERS))).view(np.ndarray)
+
+    @classmethod
+    def open_if_exists(cls, directory=DEFAULT_SOIL_DIR):
+        if not os.path.exists(os.path.join(directory, 'grid.json')):
+            return None
+        return cls(directory)
+
+    # Fractional pixel coordinates of each point, measured from the top-left corner
+    def _pixels(self, lats, lons):
+        return ((np.asarray(lats, dtype=np.float64) - self.origin_lat) / self.pixel_height,
+                (np.asarray(lons, dtype=np.float64) - self.origin_lon) / self.pixel_width)
+
+    # Vectorized lookup for N points: an (N, 5) float array, NaN where there is no data.
+    # With interpolate=True, values are blended bilinearly between the four nearest cell
+    # centres, skipping neighbours without data.
+    def lookup_many(self, lats, lons, interpolate=False):
+        rows, cols = self._pixels(lats, lons)
+        result = np.full((rows.size, len(SOIL_LAYERS)), np.nan)
+        if not interpolate:
+            r, c = np.floor(rows).astype(np.intp), np.floor(cols).astype(np.intp)
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+            result[inside] = self.values[r[inside], c[inside]]
+            return result
+
+        # Offsets to the centres above-left of each point
+        rows, cols = rows - 0.5, cols - 0.5
+        r0, c0 = np.floor(rows).astype(np.intp), np.floor(cols).astype(np.intp)
+        fr, fc = rows - r0, cols - c0
+        total = np.zeros_like(result)
+        weights = np.zeros_like(result)
+        for dr, dc, w in ((0, 0, (1 - fr) * (1 - fc)), (0, 1, (1 - fr) * fc), (1, 0, fr * (1 - fc)), (1, 1, fr * fc)):
+            r, c = r0 + dr, c0 + dc
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+            values = np.full_like(result, np.nan)
+            values[inside] = self.values[r[inside], c[inside]]
+            valid = ~np.isnan(values)
+            total += np.where(valid, values, 0) * w[:, None]
+            weights += valid * w[:, None]
+        np.divide(total, weights, out=result, where=weights > 0)
+        # A point on the centre of an edge cell puts all the weight outside the grid; use the cell itself
+        return np.where(weights > 0, result, self.lookup_many(lats, lons))
+
+    # O(1) lookup for one point, as a get_soil_data-style dict; None outside the grid or without data
+    def lookup(self, lat, lon, interpolate=False):
+        if interpolate:
+            values = self.lookup_many([lat], [lon], interpolate=True)[0]
+        else:
+            row = math.floor((lat - self.origin_lat) / self.pixel_height)
+            col = math.floor((lon - self.origin_lon) / self.pixel_width)
+            if not (0 <= row < self.rows and 0 <= col < self.cols):
+                return None
+            values = self.values[row, col]
+        if np.isnan(values).any():
+            return None
+        soil = {layer: round(value, 4) for layer, value in zip(SOIL_LAYERS, values.tolist())}
+        soil['soil_type'] = texture_class(soil['clay_content'], soil['sand_content'], soil['silt_content'])
+        return soil
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert soil rasters into a memory-mapped soil grid')
+    for layer in SOIL_LAYERS:
+        parser.add_argument(f"--{layer.replace('_', '-')}", dest=layer, required=True,
+                            help=f"raster for {layer} (.asc, or any format rasterio reads)")
+    parser.add_argument('--output', default=DEFAULT_SOIL_DIR)
+    parser.add_argument('--soilgrids', action='store_true', help='rescale from SoilGrids units')
+    args = parser.parse_args()
+
+    sources = {layer: getattr(args, layer) for layer in SOIL_LAYERS}
+    convert_rasters(sources, args.output, SOILGRIDS_SCALES if args.soilgrids else None)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
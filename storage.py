@@ -0,0 +1,337 @@
+import os
+import sqlite3
+import threading
+import queue
+import time
+import argparse
+import tempfile
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from climate_cache import grid_cell, DEFAULT_RESOLUTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = 'plants.db'
+DEFAULT_ROLLUP_BATCH = 100_000
+DEFAULT_PRUNE_BATCH = 10_000
+DEFAULT_ROLLUP_INTERVAL = 60     # seconds between background rollups in the web app
+DEFAULT_WRITE_TIMEOUT = 30        # seconds to wait for a write-behind commit, like the connect timeout
+
+PRAGMAS = [
+    'PRAGMA journal_mode=WAL',        # readers no longer block the writer, and vice versa
+    'PRAGMA synchronous=NORMAL',      # safe with WAL; fsync on checkpoint instead of every commit
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA cache_size=-16000',       # 16 MB page cache per connection
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456'
+]
+
+
+# One tuned SQLite connection per thread for a database file
+class SQLiteDatabase:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Collects inserts from many threads and commits them together in one transaction
+class WriteBehindQueue:
+    def __init__(self, database, batch_size=256, flush_interval=0.0):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='sqlite-write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params):
+        future = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Whatever queued up during the previous commit goes into this one;
+            # flush_interval optionally waits a little longer for stragglers
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        batch.append(self._queue.get(timeout=timeout))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    # Any failure goes to the batch's futures; the thread carries on with the next batch
+    def _commit(self, batch):
+        try:
+            conn = self.database.connection()
+            with conn:
+                row_ids = [conn.execute(sql, params).lastrowid for sql, params, _ in batch]
+        except Exception as e:
+            logger.error(f"Write-behind commit of {len(batch)} statements failed: {e!r}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), row_id in zip(batch, row_ids):
+            if not future.done():
+                future.set_result(row_id)
+
+
+# Storage for the user_locations table. New rows are periodically folded into
+# per-grid-cell counts (per day and all time), so demand queries read O(cells) rollup
+# rows, and rolled-up rows past the retention period can be deleted.
+class LocationStore:
+    def __init__(self, path=DEFAULT_DB_PATH, write_behind=False, resolution=DEFAULT_RESOLUTION,
+                 write_timeout=DEFAULT_WRITE_TIMEOUT):
+        self.database = SQLiteDatabase(path)
+        self.writer = WriteBehindQueue(self.database) if write_behind else None
+        self.resolution = resolution
+        self.write_timeout = write_timeout
+
+    def connection(self):
+        return self.database.connection()
+
+    def init_db(self):
+        conn = self.connection()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS user_locations
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             latitude REAL NOT NULL,
+                             longitude REAL NOT NULL,
+                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+            # Only served coordinate scans, which now read the rollups
+            conn.execute('DROP INDEX IF EXISTS idx_user_locations_lat_lon')
+            # Covers the retention scan in prune (created_at plus the rowid)
+            conn.execute('''CREATE INDEX IF NOT EXISTS idx_user_locations_created_at
+                            ON user_locations (created_at)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS location_rollup_state
+                            (key TEXT PRIMARY KEY, value TEXT NOT NULL)''')
+            # Clustered by day, so a trailing window reads only its own days
+            conn.execute('''CREATE TABLE IF NOT EXISTS location_daily_counts
+                            (day TEXT NOT NULL,
+                             cell_lat INTEGER NOT NULL,
+                             cell_lon INTEGER NOT NULL,
+                             count INTEGER NOT NULL,
+                             PRIMARY KEY (day, cell_lat, cell_lon)) WITHOUT ROWID''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS location_cell_counts
+                            (cell_lat INTEGER NOT NULL,
+                             cell_lon INTEGER NOT NULL,
+                             count INTEGER NOT NULL,
+                             PRIMARY KEY (cell_lat, cell_lon)) WITHOUT ROWID''')
+            # Covers "busiest cells first" (the primary key columns ride along in the index)
+            conn.execute('''CREATE INDEX IF NOT EXISTS idx_location_cell_counts_count
+                            ON location_cell_counts (count)''')
+            conn.execute("INSERT OR IGNORE INTO location_rollup_state VALUES ('resolution', ?)",
+                         (repr(self.resolution),))
+            conn.execute("INSERT OR IGNORE INTO location_rollup_state VALUES ('last_location_id', '0')")
+        resolution = float(self._state(conn, 'resolution'))
+        if resolution != self.resolution:
+            raise ValueError(f"{self.database.path} rolls locations up at {resolution} degrees, not {self.resolution}")
+
+    def _state(self, conn, key):
+        return conn.execute('SELECT value FROM location_rollup_state WHERE key = ?', (key,)).fetchone()[0]
+
+    def save_location(self, latitude, longitude):
+        sql = "INSERT INTO user_locations (latitude, longitude) VALUES (?, ?)"
+        if self.writer is not None:
+            try:
+                return self.writer.submit(sql, (latitude, longitude)).result(timeout=self.write_timeout)
+            except FutureTimeoutError:
+                # Surfaces like a locked database, which callers already handle; the
+                # insert stays queued and may still commit
+                raise sqlite3.OperationalError(f"Write-behind insert not committed within {self.write_timeout}s")
+        conn = self.connection()
+        with conn:
+            return conn.execute(sql, (latitude, longitude)).lastrowid
+
+    def get_location(self, location_id):
+        return self.connection().execute(
+            "SELECT latitude, longitude FROM user_locations WHERE id = ?", (location_id,)).fetchone()
+
+    # Function to fold rows added since the last rollup into the per-cell counts; returns how many.
+    # AUTOINCREMENT ids are never reused, so the last rolled-up id is a safe watermark.
+    def rollup(self, batch_size=DEFAULT_ROLLUP_BATCH):
+        conn = self.connection()
+        total = 0
+        while True:
+            with conn:
+                # Taking the write lock first stops two workers from counting the same rows
+                conn.execute('BEGIN IMMEDIATE')
+                last_id = int(self._state(conn, 'last_location_id'))
+                rows = conn.execute('''SELECT id, latitude, longitude, created_at FROM user_locations
+                                       WHERE id > ? ORDER BY id LIMIT ?''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    return total
+                daily = {}
+                cells = {}
+                for _, latitude, longitude, created_at in rows:
+                    cell = grid_cell(latitude, longitude, self.resolution)
+                    key = (str(created_at)[:10],) + cell
+                    daily[key] = daily.get(key, 0) + 1
+                    cells[cell] = cells.get(cell, 0) + 1
+                conn.executemany('''INSERT INTO location_daily_counts (day, cell_lat, cell_lon, count)
+                                    VALUES (?, ?, ?, ?)
+                                    ON CONFLICT (day, cell_lat, cell_lon) DO UPDATE SET count = count + excluded.count''',
+                                 [key + (count,) for key, count in daily.items()])
+                conn.executemany('''INSERT INTO location_cell_counts (cell_lat, cell_lon, count) VALUES (?, ?, ?)
+                                    ON CONFLICT (cell_lat, cell_lon) DO UPDATE SET count = count + excluded.count''',
+                                 [cell + (count,) for cell, count in cells.items()])
+                conn.execute("UPDATE location_rollup_state SET value = ? WHERE key = 'last_location_id'",
+                             (str(rows[-1][0]),))
+            total += len(rows)
+            logger.info(f"Rolled up {total} user locations")
+            if len(rows) < batch_size:
+                return total
+
+    # Function to run rollup() every `interval` seconds on a daemon thread, so heatmap
+    # reads stay current without rolling up inline
+    def start_rollup(self, interval):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.rollup()
+                except sqlite3.Error as e:
+                    logger.error(f"Location rollup failed: {e}")
+
+        threading.Thread(target=run, name='location-rollup', daemon=True).start()
+
+    # Function to delete rolled-up rows and daily counts older than retention_days, in small
+    # transactions so inserts are never blocked for long; returns how many rows were deleted.
+    # Links to /recommendations/<id> for deleted rows stop working. The all-time per-cell
+    # counts are kept.
+    def prune(self, retention_days, batch_size=DEFAULT_PRUNE_BATCH):
+        self.rollup()
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.connection()
+        deleted = 0
+        while True:
+            with conn:
+                last_id = int(self._state(conn, 'last_location_id'))
+                count = conn.execute('''DELETE FROM user_locations WHERE id IN
+                                        (SELECT id FROM user_locations WHERE created_at < ? AND id <= ? LIMIT ?)''',
+                                     (cutoff, last_id, batch_size)).rowcount
+            deleted += count
+            if count < batch_size:
+                break
+        # One day of counts per transaction; a day has at most one row per cell
+        days = [row[0] for row in conn.execute('SELECT DISTINCT day FROM location_daily_counts WHERE day < ?',
+                                               (cutoff[:10],))]
+        for day in days:
+            with conn:
+                conn.execute('DELETE FROM location_daily_counts WHERE day = ?', (day,))
+        logger.info(f"Pruned {deleted} user locations and {len(days)} days of counts older than {retention_days} days")
+        return deleted
+
+    # Function to get [(cell, count)] from the rollups, busiest first: all time, or the
+    # last `days` days (UTC), optionally only cells inside bbox (south, west, north, east)
+    def heatmap(self, days=None, bbox=None, limit=None):
+        conditions = []
+        params = []
+        if days is not None:
+            conditions.append('day >= ?')
+            params.append((datetime.utcnow().date() - timedelta(days=days - 1)).isoformat())
+        if bbox is not None:
+            south, west, north, east = bbox
+            lat_min, lon_min = grid_cell(south, west, self.resolution)
+            lat_max, lon_max = grid_cell(north, east, self.resolution)
+            conditions.append('cell_lat BETWEEN ? AND ? AND cell_lon BETWEEN ? AND ?')
+            params += [lat_min, lat_max, lon_min, lon_max]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if days is None:
+            sql = f'SELECT cell_lat, cell_lon, count FROM location_cell_counts {where} ORDER BY count DESC'
+        else:
+            sql = f'''SELECT cell_lat, cell_lon, SUM(count) AS count FROM location_daily_counts {where}
+                      GROUP BY cell_lat, cell_lon ORDER BY count DESC'''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [((cell_lat, cell_lon), count) for cell_lat, cell_lon, count in self.connection().execute(sql, params)]
+
+
+# Function to measure insert/select latency percentiles under concurrent load
+def benchmark(store, threads=16, operations=500):
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def worker(_):
+        inserts, selects = [], []
+        for i in range(operations):
+            start = time.perf_counter()
+            location_id = store.save_location(40.0 + i * 1e-4, -74.0)
+            inserts.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.get_location(location_id)
+            selects.append(time.perf_counter() - start)
+        return inserts, selects
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    inserts = [t for r in results for t in r[0]]
+    selects = [t for r in results for t in r[1]]
+    report = {
+        'threads': threads,
+        'operations': len(inserts),
+        'inserts_per_second': len(inserts) / elapsed,
+        'insert_p50_ms': percentile(inserts, 0.50) * 1e3,
+        'insert_p99_ms': percentile(inserts, 0.99) * 1e3,
+        'select_p50_ms': percentile(selects, 0.50) * 1e3,
+        'select_p99_ms': percentile(selects, 0.99) * 1e3
+    }
+    logger.info(f"Location store benchmark: {report}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the user_locations store on a scratch database')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=500)
+    parser.add_argument('--write-behind', action='store_true')
+    parser.add_argument('--maintain', metavar='DB', help='instead of benchmarking, roll up the locations in DB')
+    parser.add_argument('--retention-days', type=int,
+                        help='with --maintain, also delete older rolled-up rows and daily counts')
+    args = parser.parse_args()
+
+    if args.maintain:
+        store = LocationStore(args.maintain)
+        store.init_db()
+        if args.retention_days is not None:
+            store.prune(args.retention_days)
+        else:
+            store.rollup()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocationStore(os.path.join(tmp, 'bench.db'), write_behind=args.write_behind)
+        store.init_db()
+        benchmark(store, args.threads, args.operations)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
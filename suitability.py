@@ -0,0 +1,95 @@
+import logging
+import numpy as np
+import plant_model
+from plant_catalogue import as_catalogue, catalogue as default_catalogue
+from plant_model import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+# Function to build an (N, 11) feature matrix from land_data dicts or arrays
+def feature_matrix(features):
+    if isinstance(features, dict):
+        features = [features]
+    if len(features) and isinstance(features[0], dict):
+        features = [[data.get(column, np.nan) for column in FEATURE_COLUMNS] for data in features]
+    return np.array(features, dtype=np.float64, ndmin=2)
+
+# Function to measure how far each feature falls outside each plant's range, in range widths.
+# Returns an (N, n_plants, 11) array; 0 means inside the range, NaN means the feature is missing.
+def range_distances(X, catalogue=default_catalogue):
+    catalogue = as_catalogue(catalogue)
+    X = feature_matrix(X)[:, None, :]
+    low = catalogue.minimums[None, :, :]
+    high = catalogue.maximums[None, :, :]
+    # Ranges of zero width would divide by zero; treat them as 10% of the value
+    width = np.maximum(high - low, 0.1 * np.abs(high))
+    width = np.where(width > 0, width, 1.0)
+    return np.maximum(np.maximum(low - X, X - high), 0.0) / width
+
+# Function to combine per-factor distances into one score per plant; missing factors are skipped
+def scores_from_distances(distances):
+    return np.nanmean(np.exp(-distances ** 2), axis=2)
+
+# Function to score every plant against every location, 1.0 meaning all factors are in range
+def score_suitability(X, catalogue=default_catalogue):
+    return scores_from_distances(range_distances(X, catalogue))
+
+# Function to rank plants by suitability, in the same shape as plant_model.recommend_plants
+def recommend_by_suitability(features, catalogue=default_catalogue, top_k=5):
+    catalogue = as_catalogue(catalogue)
+    single = isinstance(features, dict) or np.ndim(features) == 1
+    X = feature_matrix(features)
+    distances = range_distances(X, catalogue)
+    scores = scores_from_distances(distances)
+
+    k = min(top_k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+
+    results = []
+    for row in range(len(X)):
+        recommendations = []
+        for plant_row in top[row]:
+            outside = [FEATURE_COLUMNS[f] for f in np.flatnonzero(distances[row, plant_row] > 0)]
+            recommendations.append({
+                'plant': catalogue.names[plant_row],
+                'score': scores[row, plant_row],
+                'data': catalogue.record(plant_row),
+                'outside_range': outside
+            })
+        results.append(recommendations)
+    return results[0] if single else results
+
+# Function to blend model probabilities with suitability scores.
+# probabilities is (N, n_classes) from model.predict_proba; returns (N, n_plants).
+def blend_scores(probabilities, classes, X, catalogue=default_catalogue, weight=0.5):
+    catalogue = as_catalogue(catalogue)
+    probabilities = np.array(probabilities, ndmin=2)
+    class_rows = catalogue.class_rows(classes)
+    known = class_rows >= 0
+    model_scores = np.zeros((len(probabilities), len(catalogue)))
+    model_scores[:, class_rows[known]] = probabilities[:, known]
+    return (1 - weight) * model_scores + weight * score_suitability(X, catalogue)
+
+# Function to find climate averages held locally for a point, whatever window they cover:
+# the prefetched tiles, the daily aggregates as last refreshed, then the last cached averages
+def local_climate_averages(lat, lon, cache=None):
+    if plant_model.climate_tiles is not None:
+        climate_data = plant_model.climate_tiles.get(lat, lon)
+        if climate_data is not None:
+            return climate_data
+    if plant_model.climate_aggregates is not None:
+        climate_data = plant_model.climate_aggregates.averages(lat, lon)
+        if climate_data is not None:
+            return climate_data
+    cache = plant_model.climate_cache if cache is None else cache
+    return cache.get_latest(lat, lon) if cache is not None else None
+
+# Function to recommend from local climate data only, without touching the network
+def quick_recommendations(lat, lon, catalogue=default_catalogue, top_k=5, cache=None):
+    climate_data = local_climate_averages(lat, lon, cache)
+    if climate_data is None:
+        logger.info(f"No local climate data for lat: {lat}, lon: {lon}")
+        return []
+    return recommend_by_suitability({**climate_data, **plant_model.get_soil_data(lat, lon)}, catalogue, top_k)
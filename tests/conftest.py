@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# plant_model looks for climate_tiles/ and keeps climate_cache.db in the working
+# directory, so the tests run from a scratch directory
+WORKDIR = tempfile.TemporaryDirectory(prefix='plant-tests-')
+os.chdir(WORKDIR.name)
+
+from nasa_stub import NasaPowerStub
+import plant_model
+from plant_catalogue import as_catalogue
+from climate_cache import ClimateCache
+
+
+def pytest_unconfigure(config):
+    os.chdir(REPO_ROOT)
+    WORKDIR.cleanup()
+
+
+# Function to make noisy training rows around each plant's optimal midpoints
+def synthetic_outcomes(rows_per_plant=40, seed=0):
+    catalogue = as_catalogue(plant_model.plant_database)
+    rng = np.random.default_rng(seed)
+    X = np.repeat(catalogue.midpoints, rows_per_plant, axis=0)
+    X = (X * rng.normal(1.0, 0.1, X.shape)).astype(np.float32)
+    y = np.repeat(catalogue.names, rows_per_plant)
+    return X, y
+
+
+# A small forest trained on synthetic_outcomes, saved like plant_model.save_model;
+# returns the filename without .joblib
+@pytest.fixture(scope='session')
+def model_file(tmp_path_factory):
+    X, y = synthetic_outcomes()
+    filename = str(tmp_path_factory.mktemp('model') / 'plant_recommendation_model')
+    plant_model.save_model(*plant_model.train_model(X, y, n_jobs=1, n_estimators=10), filename=filename)
+    return filename
+
+
+# A local NASA POWER stand-in, with plant_model pointed at it for the test
+@pytest.fixture
+def nasa_stub(monkeypatch):
+    stub = NasaPowerStub().start()
+    monkeypatch.setattr(plant_model, 'NASA_POWER_URL', stub.base_url)
+    yield stub
+    stub.stop()
+
+
+# A test client for app.py scoring with the model_file model, against the NASA POWER stub,
+# with fresh location, tile and climate stores and every plant image already resolved
+@pytest.fixture
+def client(model_file, nasa_stub, tmp_path, monkeypatch):
+    import app
+    from model_registry import ModelRegistry
+    from plant_images import PlantImageResolver
+    from recommendation_tiles import RecommendationTileStore
+    from storage import LocationStore
+    monkeypatch.setattr(plant_model, 'climate_cache', ClimateCache(str(tmp_path / 'climate_cache.db')))
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+    monkeypatch.setattr(app, 'inference_client', None)
+    monkeypatch.setattr(app, 'model_registry', ModelRegistry(model_file))
+    location_store = LocationStore(str(tmp_path / 'plants.db'))
+    tile_store = RecommendationTileStore(str(tmp_path / 'plants.db'))
+    monkeypatch.setattr(app, 'location_store', location_store)
+    monkeypatch.setattr(app, 'tile_store', tile_store)
+    location_store.init_db()
+    tile_store.init_db()
+    resolver = PlantImageResolver()
+    for name in app.catalogue.names:
+        resolver.cache.set(str(name), f"https://images.test/{name}.jpg")
+    monkeypatch.setattr(app, 'image_resolver', resolver)
+    return app.app.test_client()
+
+
+@pytest.fixture
+def location_id(client):
+    import app
+    return app.location_store.save_location(10.0, 20.0)
@@ -0,0 +1,47 @@
+import pytest
+import app
+from plant_images import PLACEHOLDER_IMAGE
+
+
+def test_response_is_tagged_and_revalidates(client, location_id):
+    response = client.get(f'/api/recommendations/{location_id}?top_k=4')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['total'] == 4 and len(body['recommendations']) == 4
+    assert body['model_version'] == app.model_registry.version and not body['stale'] and not body['degraded']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+
+    again = client.get(f'/api/recommendations/{location_id}?top_k=4', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag
+    other_query = client.get(f'/api/recommendations/{location_id}?top_k=3', headers={'If-None-Match': etag})
+    assert other_query.status_code == 200
+
+
+def test_pages_split_the_ranking(client, location_id):
+    everything = client.get(f'/api/recommendations/{location_id}?top_k=5&per_page=5').get_json()['recommendations']
+    first = client.get(f'/api/recommendations/{location_id}?top_k=5&per_page=2').get_json()
+    third = client.get(f'/api/recommendations/{location_id}?top_k=5&per_page=2&page=3').get_json()
+    assert first['total'] == third['total'] == 5
+    assert first['recommendations'] == everything[:2]
+    assert third['recommendations'] == everything[4:]
+    name = everything[1]['name']
+    search = client.get(f'/api/recommendations/{location_id}?top_k=5&q={name.upper()}').get_json()
+    assert [rec['name'] for rec in search['recommendations']] == [name]
+
+
+def test_placeholder_images_are_not_cached(client, location_id):
+    top = client.get(f'/api/recommendations/{location_id}?top_k=1').get_json()['recommendations'][0]['name']
+    app.image_resolver.cache.set(top, PLACEHOLDER_IMAGE)
+    response = client.get(f'/api/recommendations/{location_id}?top_k=1')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers and response.headers['Cache-Control'] == 'no-store'
+
+
+@pytest.mark.parametrize('query', ['top_k=0', 'top_k=x', 'per_page=51', 'page=0'])
+def test_bad_parameters_are_rejected(client, location_id, query):
+    assert client.get(f'/api/recommendations/{location_id}?{query}').status_code == 400
+
+
+def test_unknown_location_is_not_found(client):
+    assert client.get('/api/recommendations/999').status_code == 404
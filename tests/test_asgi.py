@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+import plant_model
+import app
+import asgi
+from async_http import AsyncHTTPClient
+from climate_cache import ClimateCache
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def climate(nasa_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(plant_model, 'climate_cache', ClimateCache(str(tmp_path / 'climate_cache.db')))
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+    yield nasa_stub
+    # The breaker is shared with every other test in the process
+    plant_model.nasa_breaker.record_success()
+
+
+# Each test runs its own event loop, so each gets its own connection pool
+def run(coroutine):
+    async def with_client():
+        asgi.http_client = AsyncHTTPClient()
+        try:
+            return await coroutine
+        finally:
+            await asgi.http_client.close()
+    return asyncio.run(with_client())
+
+
+def test_async_climate_data_matches_the_sync_path(climate):
+    expected = plant_model.fetch_climate_averages(12.0, 34.0, cache=None)
+    climate_data = run(asgi.get_climate_data_async(12.0, 34.0))
+    assert climate_data == pytest.approx(expected)
+
+    # Cached by the async fetch, so the sync lookup needs no request
+    requests_before = climate.request_count
+    assert plant_model.get_climate_data(12.0, 34.0) == pytest.approx(expected)
+    assert climate.request_count == requests_before
+
+
+def test_async_fetch_falls_back_to_stale_averages(climate):
+    failures = plant_model.nasa_breaker.failures
+    plant_model.climate_cache.set(12.0, 34.0, '20200101', '20201231',
+                                  {feature: 1.0 for feature in plant_model.POWER_PARAMETERS})
+    climate.failure_rate = 1.0
+    climate_data = run(asgi.get_climate_data_async(12.0, 34.0))
+    assert climate_data['stale'] is True
+    assert plant_model.nasa_breaker.failures > failures
+
+
+def test_async_recommendations_match_the_flask_path(climate, model_file, monkeypatch):
+    monkeypatch.setattr(app, 'model_registry', ModelRegistry(model_file))
+    expected, stale = app.recommend_plants(12.0, 34.0)
+    recommendations, async_stale = run(asgi.recommend_plants_async(12.0, 34.0))
+    assert [rec['name'] for rec in recommendations] == [rec['name'] for rec in expected]
+    assert [rec['score'] for rec in recommendations] == pytest.approx([rec['score'] for rec in expected])
+    assert stale is async_stale is False
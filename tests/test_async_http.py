@@ -0,0 +1,114 @@
+import asyncio
+import json
+import pytest
+import requests
+from async_http import AsyncHTTPClient
+
+BODY = json.dumps({'ok': True}).encode()
+KEEP_ALIVE = b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (len(BODY), BODY)
+
+
+# HTTP/1.1 server that answers every request on a connection with the next of its responses
+class ScriptedServer:
+    def __init__(self, *responses, close_after_response=False):
+        self.responses = responses
+        self.close_after_response = close_after_response
+        self.connections = 0
+        self.requests = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/data"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while await reader.readline():
+            while await reader.readline() not in (b'\r\n', b''):
+                pass
+            writer.write(self.responses[min(self.requests, len(self.responses) - 1)])
+            self.requests += 1
+            await writer.drain()
+            if self.close_after_response:
+                break
+        writer.close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_connections_are_reused():
+    async def scenario():
+        client = AsyncHTTPClient()
+        async with ScriptedServer(KEEP_ALIVE) as server:
+            for _ in range(3):
+                response = await client.get(server.url, params={'q': 1})
+                assert response.json() == {'ok': True}
+            await client.close()
+        return server
+    server = run(scenario())
+    assert (server.connections, server.requests) == (1, 3)
+
+
+def test_chunked_response_with_trailers_leaves_the_connection_usable():
+    chunked = (b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+               b'5\r\n{"ok"\r\n6\r\n: true\r\n1\r\n}\r\n0\r\nX-Trailer: 1\r\n\r\n')
+
+    async def scenario():
+        client = AsyncHTTPClient()
+        async with ScriptedServer(chunked) as server:
+            first = await client.get(server.url)
+            second = await client.get(server.url)
+            await client.close()
+        return server, first, second
+    server, first, second = run(scenario())
+    assert first.json() == second.json() == {'ok': True}
+    assert server.connections == 1
+
+
+def test_connection_close_is_not_pooled():
+    closing = KEEP_ALIVE.replace(b'\r\n\r\n', b'\r\nConnection: close\r\n\r\n', 1)
+
+    async def scenario():
+        client = AsyncHTTPClient()
+        async with ScriptedServer(closing, close_after_response=True) as server:
+            for _ in range(2):
+                await client.get(server.url)
+            await client.close()
+        return server
+    assert run(scenario()).connections == 2
+
+
+def test_idle_connection_closed_by_the_server_is_replaced():
+    async def scenario():
+        client = AsyncHTTPClient()
+        # Advertises keep-alive, then hangs up anyway
+        async with ScriptedServer(KEEP_ALIVE, close_after_response=True) as server:
+            await client.get(server.url)
+            await asyncio.sleep(0.05)
+            response = await client.get(server.url)
+            await client.close()
+        return server, response
+    server, response = run(scenario())
+    assert response.json() == {'ok': True}
+    assert server.connections == 2
+
+
+def test_http_errors_are_requests_http_errors():
+    unavailable = b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n'
+
+    async def scenario():
+        client = AsyncHTTPClient()
+        async with ScriptedServer(unavailable) as server:
+            response = await client.get(server.url)
+            await client.close()
+        return response
+    response = run(scenario())
+    with pytest.raises(requests.exceptions.HTTPError) as raised:
+        response.raise_for_status()
+    assert raised.value.response.status_code == 503
@@ -0,0 +1,29 @@
+import os
+import sys
+import plant_model
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from bench_plant_model import make_historical_csv, measure, compare
+
+
+def test_synthetic_history_loads_like_the_real_csv(tmp_path):
+    path = make_historical_csv(str(tmp_path / 'historical.csv'), 500)
+    historical = plant_model.load_historical_data(path)
+    assert len(historical) == 500
+    X, y = plant_model.prepare_data(historical, plant_model.plant_database)
+    assert X.shape == (500 + len(plant_model.plant_database), len(plant_model.FEATURE_COLUMNS))
+
+
+def test_measure_keeps_the_fastest_run_and_the_peak():
+    calls = []
+    result, value = measure(lambda: calls.append(bytearray(1 << 20)) or len(calls), repeats=3)
+    assert value == 3 and len(calls) == 4
+    assert result['seconds'] >= 0 and result['peak_bytes'] >= 1 << 20
+    assert measure(lambda: None, memory=False)[0]['peak_bytes'] is None
+
+
+def test_compare_flags_stages_past_the_tolerance():
+    baseline = {'results': {'a@1': {'seconds': 1.0}, 'b@1': {'seconds': 1.0}, 'c@1': {'seconds': 0.0}}}
+    results = {'a@1': {'seconds': 1.1}, 'b@1': {'seconds': 1.5}, 'c@1': {'seconds': 0.1}, 'new@1': {'seconds': 9.0}}
+    assert compare(results, baseline, tolerance=0.2) == ['b@1', 'c@1']
+    assert compare(results, {}, tolerance=0.2) == []
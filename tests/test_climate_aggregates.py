@@ -0,0 +1,151 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+import plant_model
+from climate_aggregates import ClimateAggregateStore
+from climate_cache import ClimateCache
+from resilience import CircuitBreaker
+
+TODAY = datetime(2024, 6, 1)
+
+
+# A store whose refreshes go through plant_model.fetch_power_daily with a short deadline
+def aggregate_store(path, breaker, deadline=0.5):
+    fetch = lambda *args: plant_model.fetch_power_daily(*args, max_retries=2, delay=0.05, deadline=deadline,
+                                                        breaker=breaker)
+    return ClimateAggregateStore(fetch, plant_model.POWER_PARAMETERS, str(path))
+
+
+def test_refresh_rolls_the_window_forward(nasa_stub, tmp_path):
+    store = aggregate_store(tmp_path / 'aggregates.db', CircuitBreaker('test'), deadline=10)
+    assert store.refresh(10.0, 20.0, today=TODAY) > 0
+    requests_before = nasa_stub.request_count
+    assert store.refresh(10.0, 20.0, today=TODAY) == 0
+    assert nasa_stub.request_count == requests_before
+
+    averages = store.averages(10.0, 20.0)
+    assert set(averages) == set(plant_model.POWER_PARAMETERS)
+
+
+def test_slow_refresh_stops_at_the_deadline(nasa_stub, tmp_path):
+    nasa_stub.latency = 2.0
+    store = aggregate_store(tmp_path / 'aggregates.db', CircuitBreaker('test'))
+
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        store.get(10.0, 20.0)
+    assert time.monotonic() - started < 1.5
+
+    # The failed attempt is recorded, so the next request does not wait on it again
+    requests_before = nasa_stub.request_count
+    assert store.get(10.0, 20.0) is None
+    assert nasa_stub.request_count == requests_before
+
+
+def test_failing_refreshes_open_the_breaker(nasa_stub, tmp_path):
+    nasa_stub.failure_rate = 1.0
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+    store = aggregate_store(tmp_path / 'aggregates.db', breaker, deadline=5)
+
+    with pytest.raises(ConnectionError):
+        store.refresh(10.0, 20.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    requests_before = nasa_stub.request_count
+    with pytest.raises(ConnectionError):
+        store.refresh(30.0, 40.0)
+    assert nasa_stub.request_count == requests_before
+
+
+def test_failed_refresh_serves_the_last_window(nasa_stub, tmp_path):
+    store = aggregate_store(tmp_path / 'aggregates.db', CircuitBreaker('test'), deadline=10)
+    store.refresh(10.0, 20.0, today=TODAY)
+    expected = store.averages(10.0, 20.0)
+
+    nasa_stub.failure_rate = 1.0
+    assert store.get(10.0, 20.0) == expected
+
+
+def test_climate_data_falls_back_to_the_stale_cache(nasa_stub, tmp_path, monkeypatch):
+    cache = ClimateCache(str(tmp_path / 'cache.db'))
+    cache.set(10.0, 20.0, '20230101', '20231231', {feature: 1.0 for feature in plant_model.POWER_PARAMETERS})
+    monkeypatch.setattr(plant_model, 'climate_cache', cache)
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates',
+                        aggregate_store(tmp_path / 'aggregates.db', CircuitBreaker('test')))
+    nasa_stub.failure_rate = 1.0
+
+    climate_data = plant_model.get_climate_data(10.0, 20.0)
+
+    assert climate_data['stale'] is True
+    assert climate_data['avg_temperature'] == 1.0
+    assert nasa_stub.request_count == 2
+
+
+PARAMETERS = {'avg_temperature': 'T2M', 'avg_humidity': 'RH2M'}
+
+
+# Deterministic daily values; days listed in `missing` come back as the fill value
+class DailySource:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    @staticmethod
+    def values(day):
+        return {'T2M': day.toordinal() % 31, 'RH2M': 50 + day.toordinal() % 7}
+
+    def __call__(self, lat, lon, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        data = {'T2M': {}, 'RH2M': {}}
+        day = start_date
+        while day <= end_date:
+            key = day.strftime('%Y%m%d')
+            for parameter, value in self.values(day).items():
+                data[parameter][key] = -999 if key in self.missing else value
+            day += timedelta(days=1)
+        return data
+
+
+def window_averages(end, days=365):
+    rows = [DailySource.values(end - timedelta(days=offset)) for offset in range(days)]
+    return {'avg_temperature': sum(row['T2M'] for row in rows) / days,
+            'avg_humidity': sum(row['RH2M'] for row in rows) / days}
+
+
+def test_window_rolls_forward_with_only_the_new_days(tmp_path):
+    source = DailySource()
+    store = ClimateAggregateStore(source, PARAMETERS, str(tmp_path / 'aggregates.db'))
+    assert store.refresh(10.0, 20.0, today=TODAY) == 365
+    assert store.averages(10.0, 20.0) == pytest.approx(window_averages(TODAY - timedelta(days=1)))
+
+    assert store.refresh(10.0, 20.0, today=TODAY + timedelta(days=10)) == 10
+    assert source.calls[-1] == (TODAY, TODAY + timedelta(days=9))
+    assert store.averages(10.0, 20.0) == pytest.approx(window_averages(TODAY + timedelta(days=9)))
+
+
+def test_trailing_fill_days_are_fetched_again(tmp_path):
+    late = (TODAY - timedelta(days=1)).strftime('%Y%m%d')
+    source = DailySource(missing={late})
+    store = ClimateAggregateStore(source, PARAMETERS, str(tmp_path / 'aggregates.db'))
+    assert store.refresh(10.0, 20.0, today=TODAY) == 364
+
+    source.missing.clear()
+    assert store.refresh(10.0, 20.0, today=TODAY) == 1
+    assert source.calls[-1] == (TODAY - timedelta(days=1), TODAY - timedelta(days=1))
+    assert store.averages(10.0, 20.0) == pytest.approx(window_averages(TODAY - timedelta(days=1)))
+
+
+def test_backfill_feeds_the_monthly_normals(tmp_path):
+    store = ClimateAggregateStore(DailySource(), PARAMETERS, str(tmp_path / 'aggregates.db'))
+    with pytest.raises(ValueError):
+        store.backfill(10.0, 20.0)
+    store.refresh(10.0, 20.0, today=TODAY)
+    window = store.averages(10.0, 20.0)
+    assert store.backfill(10.0, 20.0, years=1) == 365
+
+    # Older years only reach the monthly sums, never the trailing window
+    assert store.averages(10.0, 20.0) == window
+    monthly = store.monthly(10.0, 20.0)
+    assert min(monthly) == (2022, 6) and max(monthly) == (2024, 5)
+    assert set(store.monthly_normals(10.0, 20.0)) == set(range(1, 13))
@@ -0,0 +1,60 @@
+import os
+import time
+from climate_cache import ClimateCache, grid_cell, cell_center
+
+AVERAGES = {'avg_temperature': 21.5}
+
+
+def accessed_at(cache, lat, lon):
+    cell = grid_cell(lat, lon, cache.resolution)
+    return cache._connect().execute('SELECT accessed_at FROM climate_cache WHERE cell_lat = ? AND cell_lon = ?',
+                                    cell).fetchone()[0]
+
+
+def test_the_file_is_created_on_first_use(tmp_path):
+    path = str(tmp_path / 'climate_cache.db')
+    cache = ClimateCache(path)
+    assert not os.path.exists(path)
+    assert cache.get(1.0, 2.0, '20240101', '20241231') is None
+    assert os.path.exists(path)
+
+
+def test_hits_update_the_access_time_coarsely(tmp_path):
+    cache = ClimateCache(str(tmp_path / 'climate_cache.db'), access_resolution=3600)
+    cache.set(1.0, 2.0, '20240101', '20241231', AVERAGES)
+    written = accessed_at(cache, 1.0, 2.0)
+    assert cache.get(1.0, 2.0, '20240101', '20241231') == AVERAGES
+    assert accessed_at(cache, 1.0, 2.0) == written
+
+    cache.access_resolution = 0
+    time.sleep(0.01)
+    cache.get(1.0, 2.0, '20240101', '20241231')
+    assert accessed_at(cache, 1.0, 2.0) > written
+
+
+def test_eviction_runs_every_few_inserts(tmp_path):
+    cache = ClimateCache(str(tmp_path / 'climate_cache.db'), max_entries=3, evict_every=4)
+    for i in range(3):
+        cache.set(float(i), 0.0, '20240101', '20241231', AVERAGES)
+    cache.set(3.0, 0.0, '20240101', '20241231', AVERAGES)
+    # The fourth insert ran evict() and trimmed the cache back to max_entries
+    assert len(cache) == 3
+    for i in range(4, 7):
+        cache.set(float(i), 0.0, '20240101', '20241231', AVERAGES)
+    assert len(cache) == 6
+    cache.set(7.0, 0.0, '20240101', '20241231', AVERAGES)
+    assert len(cache) == 3
+    assert cache.get(7.0, 0.0, '20240101', '20241231') == AVERAGES
+
+
+def test_expired_entries_are_kept_as_the_stale_fallback(tmp_path):
+    cache = ClimateCache(str(tmp_path / 'climate_cache.db'), ttl=0)
+    cache.set(1.0, 2.0, '20240101', '20241231', AVERAGES)
+    time.sleep(0.01)
+    assert cache.get(1.0, 2.0, '20240101', '20241231') is None
+    assert cache.get_latest(1.0, 2.0) == AVERAGES
+
+
+def test_cell_center_round_trips():
+    cell = grid_cell(12.34, -56.78)
+    assert grid_cell(*cell_center(cell)) == cell
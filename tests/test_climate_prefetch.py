@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+import requests
+from climate_cache import cell_center
+from climate_prefetch import cells_in_bbox, fetch_cell, prefetch
+from climate_tiles import ClimateTileStore, CLIMATE_COLUMNS
+
+RESOLUTION = 0.5
+START_DATE = datetime(2024, 1, 1)
+END_DATE = datetime(2024, 1, 31)
+
+
+def test_cells_in_bbox_covers_the_corners():
+    cells = cells_in_bbox(10.0, 20.0, 11.0, 21.0, RESOLUTION)
+    assert len(cells) == 9
+    assert cells[0] == (20, 40) and cells[-1] == (22, 42)
+
+
+def test_prefetch_stores_every_cell(nasa_stub, tmp_path):
+    store = ClimateTileStore(str(tmp_path / 'tiles'), resolution=RESOLUTION, readonly=False)
+    cells = cells_in_bbox(10.0, 20.0, 11.0, 21.0, RESOLUTION)
+
+    stored, failed = prefetch(store, cells, START_DATE, END_DATE, concurrency=4, rate=None, checkpoint_every=4)
+
+    assert (stored, failed) == (len(cells), 0)
+    assert nasa_stub.request_count == len(cells)
+    assert len(store) == len(cells)
+    for cell in cells:
+        assert store.has_cell(cell, '20240101', '20240131')
+
+
+def test_tiles_match_a_direct_fetch(nasa_stub, tmp_path):
+    directory = str(tmp_path / 'tiles')
+    store = ClimateTileStore(directory, resolution=RESOLUTION, readonly=False)
+    cells = cells_in_bbox(-5.0, 30.0, -4.0, 31.0, RESOLUTION)
+    prefetch(store, cells, START_DATE, END_DATE, concurrency=2, rate=None)
+
+    # A read-only opener, like the web workers, sees the same values
+    reader = ClimateTileStore(directory)
+    assert reader.resolution == RESOLUTION
+    for cell in cells:
+        expected = fetch_cell(cell, RESOLUTION, START_DATE, END_DATE)
+        tile = reader.get(*cell_center(cell, RESOLUTION))
+        assert list(tile) == CLIMATE_COLUMNS
+        for column in CLIMATE_COLUMNS:
+            assert tile[column] == pytest.approx(expected[column], rel=1e-6)
+    assert reader.get(50.0, 50.0) is None
+
+
+def test_prefetch_resumes_without_refetching(nasa_stub, tmp_path):
+    store = ClimateTileStore(str(tmp_path / 'tiles'), resolution=RESOLUTION, readonly=False)
+    cells = cells_in_bbox(0.0, 0.0, 1.0, 1.0, RESOLUTION)
+    prefetch(store, cells[:4], START_DATE, END_DATE, rate=None)
+    requests_before = nasa_stub.request_count
+
+    stored, failed = prefetch(store, cells, START_DATE, END_DATE, rate=None)
+
+    assert (stored, failed) == (len(cells) - 4, 0)
+    assert nasa_stub.request_count - requests_before == len(cells) - 4
+    assert len(store) == len(cells)
+
+
+def test_fetch_cell_raises_after_its_retries(nasa_stub):
+    nasa_stub.failure_rate = 1.0
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetch_cell((0, 0), RESOLUTION, START_DATE, END_DATE, max_retries=1)
+    assert nasa_stub.request_count == 1
+
+
+def test_failed_cells_are_not_stored(nasa_stub, tmp_path, monkeypatch):
+    import climate_prefetch
+    # One attempt per cell, so the test does not sleep through the backoff
+    monkeypatch.setattr(climate_prefetch, 'fetch_cell',
+                        lambda *args, **kwargs: fetch_cell(*args, **kwargs, max_retries=1))
+    nasa_stub.failure_rate = 1.0
+    store = ClimateTileStore(str(tmp_path / 'tiles'), resolution=RESOLUTION, readonly=False)
+    cells = cells_in_bbox(0.0, 0.0, 0.5, 0.5, RESOLUTION)
+
+    stored, failed = prefetch(store, cells, START_DATE, END_DATE, rate=None)
+
+    assert (stored, failed) == (0, len(cells))
+    assert len(store) == 0
+
+
+def test_tiles_outside_the_requested_window_are_misses(nasa_stub, tmp_path):
+    store = ClimateTileStore(str(tmp_path / 'tiles'), resolution=RESOLUTION, readonly=False)
+    prefetch(store, [(20, 40)], START_DATE, END_DATE, rate=None)
+    lat, lon = cell_center((20, 40), RESOLUTION)
+
+    assert store.get(lat, lon, START_DATE, END_DATE) is not None
+    assert store.get(lat, lon, START_DATE + timedelta(days=7), END_DATE + timedelta(days=7)) is not None
+    assert store.get(lat, lon, START_DATE + timedelta(days=30), END_DATE + timedelta(days=30)) is None
+    assert store.get(lat, lon, START_DATE - timedelta(days=1), END_DATE) is None
+
+
+def test_read_only_opener_does_not_write_the_index(nasa_stub, tmp_path):
+    directory = str(tmp_path / 'tiles')
+    store = ClimateTileStore(directory, resolution=RESOLUTION, readonly=False)
+    prefetch(store, [(20, 40)], START_DATE, END_DATE, rate=None)
+
+    reader = ClimateTileStore.open_if_exists(directory)
+    assert reader.resolution == RESOLUTION and len(reader) == 1
+    with pytest.raises(sqlite3.OperationalError):
+        reader._connect().execute('CREATE TABLE scratch (value)')
+    with pytest.raises(ValueError):
+        # Read-only, so a missing index is not created
+        ClimateTileStore(str(tmp_path / 'empty'))
+    assert ClimateTileStore.open_if_exists(str(tmp_path / 'empty')) is None
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import plant_model
+from conftest import synthetic_outcomes
+from forest_engine import FlatForest
+from incremental_training import update_model
+from model_registry import ModelRegistry
+from plant_catalogue import catalogue
+
+
+def sklearn_proba(model, imputer, scaler, X):
+    return model.predict_proba(scaler.transform(imputer.transform(X)))
+
+
+# Rows around the training data, some with missing features for the imputer to fill
+def scoring_rows(seed=3):
+    X, _ = synthetic_outcomes(rows_per_plant=10, seed=seed)
+    X = X.astype(np.float64)
+    X[::7, 2] = np.nan
+    X[::11, -1] = np.nan
+    return X
+
+
+def test_matches_sklearn_predict_proba(model_file):
+    model, imputer, scaler = plant_model.load_model(model_file)
+    forest = FlatForest.from_sklearn(model, imputer, scaler)
+    X = scoring_rows()
+    assert np.array_equal(forest.classes_, model.classes_)
+    assert np.allclose(forest.predict_proba(X), sklearn_proba(model, imputer, scaler, X), rtol=0, atol=1e-12)
+    assert np.array_equal(forest.predict(X), model.predict(scaler.transform(imputer.transform(X))))
+
+
+def test_matches_sklearn_after_an_incremental_update(model_file):
+    model, imputer, scaler = plant_model.load_model(model_file)
+    X_new, y_new = synthetic_outcomes(rows_per_plant=5, seed=4)
+    model, imputer, scaler = update_model(model, imputer, scaler, X_new[y_new == 'Rice'],
+                                          y_new[y_new == 'Rice'], n_new_trees=5, random_state=0)
+    forest = FlatForest.from_sklearn(model, imputer, scaler)
+    X = scoring_rows()
+    assert np.allclose(forest.predict_proba(X), sklearn_proba(model, imputer, scaler, X), rtol=0, atol=1e-12)
+
+
+def test_save_and_load_round_trip(model_file, tmp_path):
+    model, imputer, scaler = plant_model.load_model(model_file)
+    forest = FlatForest.from_sklearn(model, imputer, scaler)
+    path = str(tmp_path / 'forest.npz')
+    forest.save(path)
+    X = scoring_rows()
+    assert np.array_equal(FlatForest.load(path).predict_proba(X), forest.predict_proba(X))
+
+
+def test_registry_serves_through_the_flattened_forest(model_file):
+    registry = ModelRegistry(model_file)
+    model, imputer, scaler = registry.get()
+    assert isinstance(registry.forest, FlatForest)
+    X = scoring_rows()
+    classes, probabilities = plant_model.predict_probabilities(X, model, imputer, scaler, registry.forest)
+    assert np.array_equal(classes, model.classes_)
+    assert np.allclose(probabilities, sklearn_proba(model, imputer, scaler, X), rtol=0, atol=1e-12)
+    assert ModelRegistry(model_file, flatten=False).get() is not None
+
+
+def test_batch_recommendations_agree_with_and_without_the_forest(model_file, nasa_stub, monkeypatch):
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+    registry = ModelRegistry(model_file)
+    loaded = registry.get()
+    coords = [(10.0, 20.0), (-30.0, 140.0), (45.0, -100.0)]
+
+    flat = plant_model.recommend_plants_batch(coords, *loaded, catalogue, top_k=3, forest=registry.forest)
+    reference = plant_model.recommend_plants_batch(coords, *loaded, catalogue, top_k=3)
+
+    for flat_recs, reference_recs in zip(flat, reference):
+        assert [rec['plant'] for rec in flat_recs] == [rec['plant'] for rec in reference_recs]
+        assert [rec['score'] for rec in flat_recs] == pytest.approx([rec['score'] for rec in reference_recs])
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import plant_model
+from http_client import HTTPClient, HostBusyError
+from resilience import CircuitBreaker
+
+PARAMS = {'parameters': 'T2M', 'latitude': 10.0, 'longitude': 20.0, 'start': '20240101', 'end': '20240131'}
+
+
+def test_concurrent_identical_gets_share_one_request(nasa_stub):
+    nasa_stub.latency = 0.3
+    client = HTTPClient()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.get(nasa_stub.base_url, params=PARAMS), range(8)))
+    assert nasa_stub.request_count == 1
+    assert len({id(response) for response in responses}) == 1
+    assert responses[0].json()['properties']['parameter']['T2M']
+
+
+def test_uncoalesced_gets_are_sent_separately(nasa_stub):
+    client = HTTPClient()
+    for _ in range(3):
+        client.get(nasa_stub.base_url, params=PARAMS, coalesce=False)
+    assert nasa_stub.request_count == 3
+
+
+def test_full_host_cap_raises_host_busy(nasa_stub):
+    nasa_stub.latency = 0.5
+    client = HTTPClient(timeout=(0.05, 5), max_per_host=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        slow = pool.submit(client.get, nasa_stub.base_url, PARAMS)
+        while nasa_stub.request_count == 0:
+            time.sleep(0.01)
+        with pytest.raises(HostBusyError):
+            client.get(nasa_stub.base_url, params={**PARAMS, 'latitude': 11.0})
+        assert slow.result().status_code == 200
+    assert nasa_stub.request_count == 1
+
+
+def test_host_busy_does_not_count_against_the_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.0)
+    for _ in range(3):
+        assert plant_model.power_attempt_failed(HostBusyError('cap full'), breaker)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+    # A half-open probe that never left the process frees its slot for the next attempt
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    plant_model.power_attempt_failed(HostBusyError('cap full'), breaker)
+    assert breaker.allow()
@@ -0,0 +1,61 @@
+import json
+import numpy as np
+import pytest
+from conftest import synthetic_outcomes
+from incremental_training import update_model, save_version, load_manifest
+from plant_model import load_model
+
+
+# Rows for one plant only, so y_new's string dtype is narrower than the longest class name
+def single_class_batch(name='Rice', rows=20):
+    X, y = synthetic_outcomes(seed=1)
+    X = X[y == name][:rows]
+    return X, np.array([name] * len(X))
+
+
+def test_single_class_update_keeps_the_classes(model_file):
+    model, imputer, scaler = load_model(model_file)
+    X_new, y_new = single_class_batch()
+    assert y_new.dtype.itemsize < model.classes_.dtype.itemsize
+
+    updated, _, _ = update_model(model, imputer, scaler, X_new, y_new, n_new_trees=5, random_state=0)
+
+    assert np.array_equal(updated.classes_, model.classes_)
+    assert len(updated.estimators_) == len(model.estimators_) + 5
+
+
+def test_update_leaves_the_original_untouched(model_file):
+    model, imputer, scaler = load_model(model_file)
+    trees, mean = len(model.estimators_), scaler.mean_.copy()
+    update_model(model, imputer, scaler, *single_class_batch('Soybean'), n_new_trees=3)
+    assert len(model.estimators_) == trees
+    assert np.array_equal(scaler.mean_, mean)
+
+
+def test_updated_model_still_scores_every_class(model_file):
+    model, imputer, scaler = load_model(model_file)
+    X_new, y_new = single_class_batch()
+    updated, imputer, scaler = update_model(model, imputer, scaler, X_new, y_new, n_new_trees=5)
+    X, _ = synthetic_outcomes(rows_per_plant=2, seed=2)
+    probabilities = updated.predict_proba(scaler.transform(imputer.transform(X)))
+    assert probabilities.shape == (len(X), len(model.classes_))
+    assert np.allclose(probabilities.sum(axis=1), 1.0)
+
+
+def test_unknown_class_needs_a_full_retrain(model_file):
+    model, imputer, scaler = load_model(model_file)
+    X_new, _ = single_class_batch()
+    with pytest.raises(ValueError):
+        update_model(model, imputer, scaler, X_new, np.array(['Cactus'] * len(X_new)))
+
+
+def test_save_version_numbers_the_artifacts(model_file, tmp_path):
+    model, imputer, scaler = load_model(model_file)
+    filename = str(tmp_path / 'model')
+    assert save_version(model, imputer, scaler, filename) == 1
+    assert save_version(model, imputer, scaler, filename, records_added=20) == 2
+    manifest = load_manifest(filename)
+    assert [entry['version'] for entry in manifest] == [1, 2]
+    assert manifest[1]['records_added'] == 20
+    with open(f"{filename}.versions.json") as f:
+        assert json.load(f) == manifest
@@ -0,0 +1,117 @@
+import os
+import stat
+import socket
+import numpy as np
+import pytest
+import inference_service
+from inference_service import InferenceService, InferenceClient, env_authkey
+from plant_model import FEATURE_COLUMNS
+
+
+@pytest.fixture
+def key_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'plant_inference.key')
+    monkeypatch.delenv('PLANT_INFERENCE_AUTHKEY', raising=False)
+    monkeypatch.setenv('PLANT_INFERENCE_AUTHKEY_FILE', path)
+    return path
+
+
+@pytest.fixture
+def service(model_file, key_file, tmp_path):
+    service = InferenceService(str(tmp_path / 'inference.sock'), model_file, workers=1).start()
+    yield service
+    service.close()
+
+
+def test_default_address_is_a_unix_socket():
+    assert isinstance(inference_service.parse_address(inference_service.DEFAULT_ADDRESS), str)
+
+
+def test_non_local_address_needs_an_authkey(key_file):
+    with pytest.raises(ValueError):
+        env_authkey(('10.0.0.5', 8790))
+    with pytest.raises(ValueError):
+        InferenceClient('0.0.0.0:8790')
+    assert env_authkey(('127.0.0.1', 8790)) is None
+    assert env_authkey('/run/plant_inference.sock') is None
+
+
+def test_env_authkey_is_used_for_any_address(monkeypatch):
+    monkeypatch.setenv('PLANT_INFERENCE_AUTHKEY', 'secret')
+    assert env_authkey(('10.0.0.5', 8790)) == b'secret'
+
+
+def test_service_writes_a_private_random_key(service, key_file):
+    assert stat.S_IMODE(os.stat(key_file).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(service.address).st_mode) == 0o600
+    with open(key_file, 'rb') as f:
+        key = f.read()
+    assert len(key) == 32 and key != b'plant-inference-local'
+
+
+def test_client_predicts_with_the_key_file(service, model_file):
+    client = InferenceClient(service.address)
+    version, classes = client.info()
+    assert version is not None and len(classes) > 0
+    classes, probabilities = client.predict_proba(np.zeros((2, len(FEATURE_COLUMNS))))
+    assert probabilities.shape == (2, len(classes))
+    assert np.allclose(probabilities.sum(axis=1), 1.0)
+
+
+def test_wrong_key_is_rejected_and_the_service_keeps_serving(service, monkeypatch):
+    monkeypatch.setenv('PLANT_INFERENCE_AUTHKEY', 'not-the-key')
+    with pytest.raises(ConnectionError):
+        InferenceClient(service.address).info()
+    monkeypatch.delenv('PLANT_INFERENCE_AUTHKEY')
+    assert InferenceClient(service.address).info()[0] is not None
+
+
+def test_missing_key_file_is_a_connection_error(key_file, tmp_path):
+    with pytest.raises(ConnectionError):
+        InferenceClient(str(tmp_path / 'missing.sock')).info()
+
+
+def test_stale_socket_is_replaced(model_file, key_file, tmp_path):
+    address = str(tmp_path / 'inference.sock')
+    # Left behind by a service that was killed
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(address)
+    stale.close()
+    service = InferenceService(address, model_file, workers=1).start()
+    try:
+        assert InferenceClient(address).info()[0] is not None
+    finally:
+        service.close()
+
+
+def test_a_stuck_batch_times_out_and_the_connection_keeps_serving(service, monkeypatch):
+    from concurrent.futures import Future
+    service.request_timeout = 0.1
+    submit = service.batcher.submit
+    monkeypatch.setattr(service.batcher, 'submit', lambda X: Future())
+    client = InferenceClient(service.address)
+    with pytest.raises(RuntimeError, match='Timed out'):
+        client.predict_proba(np.zeros((1, len(FEATURE_COLUMNS))))
+    monkeypatch.setattr(service.batcher, 'submit', submit)
+    assert client.predict_proba(np.zeros((1, len(FEATURE_COLUMNS))))[1].shape[0] == 1
+
+
+def test_info_without_a_model_is_an_error_reply(service, monkeypatch):
+    get = inference_service._registry.get
+    monkeypatch.setattr(inference_service._registry, 'get', lambda: None)
+    client = InferenceClient(service.address)
+    with pytest.raises(RuntimeError, match='No model'):
+        client.info()
+    monkeypatch.setattr(inference_service._registry, 'get', get)
+    assert client.info()[0] is not None
+
+
+def test_model_version_is_refreshed_on_an_interval(service):
+    client = InferenceClient(service.address, version_interval=60)
+    version = client.current_version()
+    assert version is not None
+    # A version seen before the service reloaded; within the interval it is kept
+    client.model_version = 'old'
+    assert client.current_version() == 'old'
+    client.version_interval = 0
+    assert client.current_version() == version
@@ -0,0 +1,41 @@
+import pytest
+import app
+from metrics import Registry, span, stage_seconds, timed
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = Registry()
+    counter = registry.counter('test_total', 'A counter')
+    assert registry.counter('test_total', 'A counter') is counter
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    counter.inc(kind='say "hi"\n')
+    histogram = registry.histogram('test_seconds', 'A histogram', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'test_total{kind="a"} 3' in lines
+    assert 'test_total{kind="say \\"hi\\"\\n"} 1' in lines
+    start = lines.index('# TYPE test_seconds histogram') + 1
+    assert lines[start:start + 5] == [
+        'test_seconds_bucket{le="0.1"} 1', 'test_seconds_bucket{le="1.0"} 2', 'test_seconds_bucket{le="+Inf"} 3',
+        'test_seconds_sum 5.55', 'test_seconds_count 3']
+    assert counter.value(kind='a') == 3 and histogram.count() == 3
+
+
+def test_span_records_failed_stages_too():
+    before = stage_seconds.count(stage='test_span')
+    with pytest.raises(ValueError):
+        with span('test_span'):
+            raise ValueError()
+    timed('test_span')(lambda: None)()
+    assert stage_seconds.count(stage='test_span') == before + 2
+
+
+def test_metrics_endpoint_counts_requests():
+    client = app.app.test_client()
+    client.get('/model/status')
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert 'plant_http_request_seconds_count{endpoint="model_status"' in response.get_data(as_text=True)
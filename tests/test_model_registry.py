@@ -0,0 +1,54 @@
+import os
+import shutil
+import numpy as np
+import plant_model
+from conftest import synthetic_outcomes
+from model_registry import ModelRegistry
+
+
+def copy_model(model_file, tmp_path):
+    filename = str(tmp_path / 'model')
+    shutil.copy(f"{model_file}.joblib", f"{filename}.joblib")
+    return filename
+
+
+def test_model_is_loaded_once(model_file):
+    registry = ModelRegistry(model_file)
+    loaded = registry.get()
+    assert loaded is not None and registry.get() is loaded
+    status = registry.status()
+    assert status['version'] == registry.version and status['load_seconds'] >= 0
+
+
+def test_missing_artifact_gives_none(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'missing'))
+    assert registry.get() is None and registry.version is None
+
+
+def test_replaced_artifact_is_swapped_in(model_file, tmp_path):
+    filename = copy_model(model_file, tmp_path)
+    registry = ModelRegistry(filename, check_interval=0)
+    old = registry.get()
+    old_version = registry.version
+    assert not registry.reload_if_changed()
+
+    X, y = synthetic_outcomes(rows_per_plant=10, seed=9)
+    plant_model.save_model(*plant_model.train_model(X, y, n_jobs=1, n_estimators=3), filename=filename)
+    os.utime(f"{filename}.joblib", ns=(1, 1))
+
+    new = registry.get()
+    assert new is not old and registry.version != old_version
+    assert len(new[0].estimators_) == 3
+    assert np.array_equal(registry.forest.classes_, new[0].classes_)
+
+
+def test_a_broken_replacement_keeps_the_loaded_model(model_file, tmp_path):
+    filename = copy_model(model_file, tmp_path)
+    registry = ModelRegistry(filename, check_interval=0)
+    loaded = registry.get()
+    version = registry.version
+    with open(f"{filename}.joblib", 'wb') as f:
+        f.write(b'not a model')
+
+    assert not registry.reload_if_changed()
+    assert registry.get() is loaded and registry.version == version
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+import plant_model
+from outcome_store import FEATURE_COLUMNS, OutcomeStore, partition_month
+
+
+# Function to make n outcome rows whose values depend on seed
+def outcomes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.uniform(0, 100, (n, len(FEATURE_COLUMNS))).round(2), columns=FEATURE_COLUMNS)
+    data['plant_name'] = rng.choice(['Tomato', 'Wheat', 'Rice'], n)
+    data['successful_plant'] = rng.integers(0, 2, n)
+    return data
+
+
+def test_appends_skip_rows_already_stored(tmp_path):
+    store = OutcomeStore(str(tmp_path / 'store'))
+    data = outcomes(20)
+    assert store.append(pd.concat([data, data.head(5)]), observed='2024-03-15') == 20
+    assert store.append(data, observed='2024-03-01') == 0
+    # The same rows in another month or region are different observations
+    assert store.append(data, observed='2024-04-01') == 20
+    assert store.append(data.head(3), observed='2024-03-01', region='north') == 3
+    assert store.row_count() == 43
+
+
+def test_reads_prune_months_and_regions(tmp_path):
+    store = OutcomeStore(str(tmp_path / 'store'))
+    for month, seed in (('2024-01', 1), ('2024-02', 2), ('2024-03', 3)):
+        store.append(outcomes(10, seed), observed=month)
+    store.append(outcomes(4, 4), observed='2024-02', region='north')
+
+    assert [partition[:2] for partition in store.partitions('2024-02', '2024-03')] == [
+        ('2024-02', 'global'), ('2024-02', 'north'), ('2024-03', 'global')]
+    assert store.row_count(start='2024-02', regions=['global']) == 20
+    february = store.read(['avg_temperature', 'plant_name'], '2024-02', '2024-02', ['global'])
+    expected = outcomes(10, 2)
+    assert february['avg_temperature'].tolist() == pytest.approx(expected['avg_temperature'].tolist())
+    assert february['plant_name'].tolist() == expected['plant_name'].tolist()
+    assert store.read_columns(['soil_ph'], start='2025-01')['soil_ph'].size == 0
+
+
+def test_training_arrays_match_prepare_data(tmp_path):
+    store = OutcomeStore(str(tmp_path / 'store'))
+    data = outcomes(30, 5)
+    store.append(data, observed='2024-05')
+
+    X, y = plant_model.prepare_data_from_store(store, plant_model.plant_database)
+    X_expected, y_expected = plant_model.prepare_data(data, plant_model.plant_database)
+    assert np.array_equal(X, X_expected) and np.array_equal(y, y_expected)
+
+
+def test_compact_merges_chunks_without_losing_rows(tmp_path):
+    store = OutcomeStore(str(tmp_path / 'store'))
+    for seed in range(3):
+        store.append(outcomes(5, seed), observed='2024-06')
+    before = store.read()
+    store.compact()
+    _, _, path = store.partitions()[0]
+    assert len(store._chunks(path)) == 1
+    pd.testing.assert_frame_equal(store.read(), before)
+    # Deduplication still sees the compacted rows
+    assert store.append(outcomes(5, 1), observed='2024-06') == 0
+
+
+def test_invalid_outcomes_are_rejected(tmp_path):
+    store = OutcomeStore(str(tmp_path / 'store'))
+    with pytest.raises(ValueError):
+        store.append(outcomes(3).drop(columns=['soil_ph']))
+    bad_label = outcomes(3)
+    bad_label.loc[0, 'successful_plant'] = 2
+    with pytest.raises(ValueError):
+        store.append(bad_label)
+    with pytest.raises(ValueError):
+        store.append(outcomes(3), region='../escape')
+    with pytest.raises(ValueError):
+        partition_month('March 2024')
+    assert store.row_count() == 0
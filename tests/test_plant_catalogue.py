@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import plant_model
+from plant_catalogue import PlantCatalogue, CATALOGUE_FIELDS, as_catalogue, catalogue
+from plant_database import plant_database
+
+
+def test_records_round_trip_through_the_arrays():
+    assert len(catalogue) == len(plant_database)
+    assert as_catalogue(plant_database) is catalogue
+    rebuilt = PlantCatalogue(catalogue.names, catalogue.ranges)
+    for plant in plant_database:
+        record = rebuilt[plant['plant_name']]
+        for field in CATALOGUE_FIELDS:
+            assert record[field] == pytest.approx(tuple(plant[field]))
+    assert rebuilt.version == catalogue.version
+    assert 'Cactus' not in catalogue and catalogue.get('Cactus') is None
+
+
+def test_ranges_must_cover_every_field():
+    with pytest.raises(ValueError):
+        PlantCatalogue(['Tomato'], np.zeros((1, 2, 2)))
+
+
+def test_class_rows_maps_classes_and_reuses_the_mapping():
+    classes = np.array(['Wheat', 'Cactus', 'Tomato'])
+    rows = catalogue.class_rows(classes)
+    assert rows.tolist() == [catalogue.row_of('Wheat'), -1, catalogue.row_of('Tomato')]
+    assert catalogue.class_rows(classes) is rows
+    # An equal array from elsewhere (e.g. unpickled from the inference service) hits the cache too
+    assert catalogue.class_rows(classes.copy()) is rows
+    assert catalogue.class_rows(['Tomato']).tolist() == [catalogue.row_of('Tomato')]
+
+
+def test_rank_plants_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    classes = np.array(list(catalogue.names) + ['Cactus'])
+    for _ in range(20):
+        probabilities = rng.dirichlet(np.ones(len(classes)))
+        for top_k in (1, 3, 10):
+            expected = sorted(zip(classes, probabilities), key=lambda pair: pair[1], reverse=True)[:top_k]
+            expected = [(plant, score) for plant, score in expected if plant in catalogue]
+            recs = plant_model.rank_plants(classes, probabilities, catalogue, top_k)
+            assert [(rec['plant'], rec['score']) for rec in recs] == expected
+            assert all(rec['data'] is catalogue[rec['plant']] for rec in recs)
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+import plant_images
+from plant_images import PlantImageResolver, PLACEHOLDER_IMAGE, TTLCache, thumbnail_filename
+
+
+# Pixabay stand-in: hits for every plant except 'Unknown', slow for 'Slow', 500 for 'Broken'
+class PixabayHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if self.path.startswith('/images/'):
+            self._send(200, b'jpeg bytes', 'image/jpeg')
+            return
+        plant = parse_qs(urlparse(self.path).query)['q'][0].rsplit(' ', 1)[0]
+        if plant == 'Slow':
+            time.sleep(1.0)
+        if plant == 'Broken':
+            self._send(500, b'{}', 'application/json')
+            return
+        hits = [] if plant == 'Unknown' else [{'webformatURL': f"{server.base}/images/{plant}.jpg"}]
+        self._send(200, json.dumps({'hits': hits}).encode(), 'application/json')
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def pixabay(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PixabayHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.base = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(plant_images, 'PIXABAY_URL', server.base + '/api/?q={plant_name}+plant')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_resolve_many_fetches_each_plant_once(pixabay):
+    resolver = PlantImageResolver()
+    images = resolver.resolve_many(['Tomato', 'Wheat', 'Tomato'])
+    assert images == {'Tomato': f"{pixabay.base}/images/Tomato.jpg", 'Wheat': f"{pixabay.base}/images/Wheat.jpg"}
+    assert pixabay.request_count == 2
+    assert resolver.resolve('Tomato') == images['Tomato']
+    assert pixabay.request_count == 2
+
+
+def test_failed_and_empty_lookups_are_negatively_cached(pixabay):
+    resolver = PlantImageResolver(miss_ttl=60)
+    assert resolver.resolve_many(['Unknown', 'Broken']) == {'Unknown': PLACEHOLDER_IMAGE, 'Broken': PLACEHOLDER_IMAGE}
+    requests_made = pixabay.request_count
+    resolver.resolve_many(['Unknown', 'Broken'])
+    assert pixabay.request_count == requests_made
+
+
+def test_slow_lookups_fall_back_to_the_placeholder(pixabay):
+    resolver = PlantImageResolver(deadline=0.2)
+    start = time.monotonic()
+    images = resolver.resolve_many(['Slow', 'Rice'])
+    assert time.monotonic() - start < 0.9
+    assert images['Slow'] == PLACEHOLDER_IMAGE and images['Rice'].endswith('/Rice.jpg')
+    # iter_resolved gives up at the same deadline
+    assert list(PlantImageResolver(deadline=0.2).iter_resolved(['Slow']))[0] == ('Slow', PLACEHOLDER_IMAGE)
+
+
+def test_thumbnails_are_stored_and_served_locally(pixabay, tmp_path):
+    directory = tmp_path / 'thumbnails'
+    resolver = PlantImageResolver(thumbnail_dir=str(directory))
+    assert resolver.resolve('Sweet Potato') == '/thumbnails/' + thumbnail_filename('Sweet Potato')
+    assert (directory / 'sweet_potato.jpg').read_bytes() == b'jpeg bytes'
+    # A new resolver (another worker) finds the thumbnail without asking Pixabay
+    requests_made = pixabay.request_count
+    assert PlantImageResolver(thumbnail_dir=str(directory)).resolve('Sweet Potato') == '/thumbnails/sweet_potato.jpg'
+    assert pixabay.request_count == requests_made
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set('a', 1, ttl=0)
+    cache.set('b', 2)
+    time.sleep(0.01)
+    assert cache.get('a') is None
+    cache.set('c', 3)
+    cache.set('d', 4)
+    assert cache.get('d') == 4 and sum(cache.get(key) is not None for key in 'bcd') == 2
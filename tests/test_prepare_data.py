@@ -0,0 +1,43 @@
+import logging
+import numpy as np
+import pandas as pd
+import plant_model
+from plant_model import FEATURE_COLUMNS, TARGET_COLUMN, plant_database
+from conftest import synthetic_outcomes
+
+
+def write_history(path, rows_per_plant=20):
+    X, y = synthetic_outcomes(rows_per_plant=rows_per_plant, seed=5)
+    X[::9, 1] = np.nan
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    df[TARGET_COLUMN] = y
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_prepare_data_appends_one_row_per_plant(tmp_path):
+    df = write_history(tmp_path / 'history.csv')
+    X, y = plant_model.prepare_data(df, plant_database)
+    assert X.dtype == np.float32 and X.shape == (len(df) + len(plant_database), len(FEATURE_COLUMNS))
+    assert list(y[-len(plant_database):]) == [plant['plant_name'] for plant in plant_database]
+    # A list of records gives the same arrays as a DataFrame
+    X_records, y_records = plant_model.prepare_data(df.to_dict('records'), plant_database)
+    assert np.array_equal(X_records, X, equal_nan=True) and np.array_equal(y_records, y)
+
+
+def test_chunked_matches_in_memory(tmp_path):
+    path = tmp_path / 'history.csv'
+    write_history(path)
+    X, y = plant_model.prepare_data(plant_model.load_historical_data(path), plant_database)
+    X_chunked, y_chunked = plant_model.prepare_data_chunked(path, plant_database, chunksize=7)
+    assert isinstance(X_chunked, np.memmap)
+    assert np.array_equal(np.asarray(X_chunked), X, equal_nan=True)
+    assert np.array_equal(y_chunked, y)
+
+
+def test_chunked_reports_peak_memory(tmp_path, caplog):
+    path = tmp_path / 'history.csv'
+    write_history(path, rows_per_plant=2)
+    with caplog.at_level(logging.INFO, logger='plant_model'):
+        plant_model.prepare_data_chunked(path, plant_database)
+    assert 'peak RSS' in caplog.text
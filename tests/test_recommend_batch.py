@@ -0,0 +1,44 @@
+import pytest
+import plant_model
+from climate_cache import ClimateCache, grid_cell, cell_center
+from plant_catalogue import catalogue
+
+
+@pytest.fixture
+def local_climate(nasa_stub, tmp_path, monkeypatch):
+    # Only the stubbed NASA POWER and a fresh cache, so every lookup is counted
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+    monkeypatch.setattr(plant_model, 'climate_cache', ClimateCache(str(tmp_path / 'climate_cache.db')))
+    return nasa_stub
+
+
+def centre(lat, lon):
+    return cell_center(grid_cell(lat, lon, plant_model.climate_cache.resolution), plant_model.climate_cache.resolution)
+
+
+def test_batch_matches_one_at_a_time(local_climate, model_file):
+    loaded = plant_model.load_model(model_file)
+    coords = [centre(10.0, 20.0), centre(-30.0, 140.0), centre(45.0, -100.0)]
+
+    batch = plant_model.recommend_plants_batch(coords, *loaded, catalogue, top_k=3)
+
+    assert len(batch) == len(coords)
+    for (lat, lon), recs in zip(coords, batch):
+        single = plant_model.recommend_plants(lat, lon, *loaded, catalogue, top_k=3)
+        assert [rec['plant'] for rec in recs] == [rec['plant'] for rec in single]
+        assert [rec['score'] for rec in recs] == pytest.approx([rec['score'] for rec in single])
+        assert all(rec['data'] is catalogue[rec['plant']] for rec in recs)
+
+
+def test_points_in_one_cell_share_a_climate_fetch(local_climate, model_file):
+    loaded = plant_model.load_model(model_file)
+    lat, lon = centre(10.0, 20.0)
+    resolution = plant_model.climate_cache.resolution
+    coords = [(lat, lon), (lat + resolution / 4, lon - resolution / 4), centre(-30.0, 140.0)]
+
+    batch = plant_model.recommend_plants_batch(coords, *loaded, catalogue, top_k=2)
+
+    assert local_climate.request_count == 2
+    assert all(len(recs) == 2 for recs in batch)
+    assert plant_model.recommend_plants_batch([], *loaded, catalogue) == []
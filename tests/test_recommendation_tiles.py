@@ -0,0 +1,63 @@
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+import plant_model
+from plant_catalogue import catalogue
+from recommendation_tiles import RecommendationTileStore, precompute_tiles
+
+WINDOW_END = datetime(2024, 6, 1)
+RECOMMENDATIONS = [{'plant': 'Rice', 'score': 0.9}]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecommendationTileStore(str(tmp_path / 'plants.db'))
+    store.init_db()
+    return store
+
+
+def test_tiles_from_an_older_climate_window_are_misses(store):
+    store.put_many([(store.tile_of(10.0, 20.0), RECOMMENDATIONS)], 'v1', WINDOW_END)
+
+    assert store.get(10.0, 20.0, 'v1', WINDOW_END) == RECOMMENDATIONS
+    assert store.get(10.0, 20.0, 'v1', WINDOW_END + timedelta(days=7)) == RECOMMENDATIONS
+    assert store.get(10.0, 20.0, 'v1', WINDOW_END + timedelta(days=8)) is None
+    assert store.get(10.0, 20.0, 'v2', WINDOW_END) is None
+
+
+def test_invalidate_drops_other_models_and_outdated_windows(store):
+    store.put_many([((1, 1), RECOMMENDATIONS)], 'v1', WINDOW_END)
+    store.put_many([((2, 2), RECOMMENDATIONS)], 'v2', WINDOW_END - timedelta(days=30))
+    store.put_many([((3, 3), RECOMMENDATIONS)], 'v2', WINDOW_END)
+
+    assert store.invalidate('v2', WINDOW_END) == 2
+    count = store.database.connection().execute('SELECT COUNT(*) FROM recommendation_tiles').fetchone()[0]
+    assert count == 1
+
+
+def test_tiles_stored_before_the_window_column_are_outdated(tmp_path):
+    path = str(tmp_path / 'plants.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('''CREATE TABLE recommendation_tiles
+                        (tile_lat INTEGER NOT NULL, tile_lon INTEGER NOT NULL, model_version TEXT NOT NULL,
+                         recommendations TEXT NOT NULL, created_at REAL NOT NULL,
+                         PRIMARY KEY (tile_lat, tile_lon, model_version))''')
+        conn.execute("INSERT INTO recommendation_tiles VALUES (100, 200, 'v1', '[]', 0)")
+    store = RecommendationTileStore(path)
+    store.init_db()
+    assert store.get(10.0, 20.0, 'v1', WINDOW_END) is None
+    assert store.get(10.0, 20.0, 'v1') == []
+
+
+def test_precompute_records_the_current_window(store, nasa_stub, model_file, monkeypatch):
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+    model, imputer, scaler = plant_model.load_model(model_file)
+    tiles = [store.tile_of(10.0, 20.0), store.tile_of(-5.0, 30.0)]
+
+    assert precompute_tiles(store, tiles, model, imputer, scaler, catalogue, 'v1', top_k=3) == 2
+
+    _, window_end = plant_model.power_date_window()
+    recommendations = store.get(10.0, 20.0, 'v1', window_end)
+    assert len(recommendations) == 3
+    assert store.get(10.0, 20.0, 'v1', window_end + timedelta(days=30)) is None
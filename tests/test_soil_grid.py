@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from soil_grid import SOIL_LAYERS, SoilGrid, convert_rasters, read_ascii_grid, texture_class
+
+NODATA = -9999
+
+
+# Function to write a 3x4 ESRI ASCII grid of 1-degree cells with its top-left corner at (12N, 10E)
+def write_grid(path, values, separator=' '):
+    rows, cols = values.shape
+    header = [('ncols', cols), ('nrows', rows), ('xllcorner', 10.0), ('yllcorner', 12.0 - rows),
+              ('cellsize', 1.0), ('NODATA_value', NODATA)]
+    with open(path, 'w') as f:
+        for key, value in header:
+            f.write(f"{key}{separator}{value}\n")
+        for row in values:
+            f.write(' '.join(str(value) for value in row) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def grid(tmp_path):
+    base = np.arange(12, dtype=np.float32).reshape(3, 4)
+    sources = {}
+    for i, layer in enumerate(SOIL_LAYERS):
+        values = base + 10 * (i + 1)
+        if layer == 'soil_ph':
+            values[2, 3] = NODATA
+        sources[layer] = write_grid(tmp_path / f"{layer}.asc", values, separator='\t' if i % 2 else '   ')
+    return SoilGrid(convert_rasters(sources, str(tmp_path / 'soil_grid')))
+
+
+def test_header_separators_and_shape_are_checked(tmp_path):
+    values, transform, nodata = read_ascii_grid(write_grid(tmp_path / 'a.asc', np.zeros((3, 4)), '\t'))
+    assert values.shape == (3, 4) and transform == (10.0, 1.0, 12.0, -1.0) and nodata == NODATA
+    path = tmp_path / 'b.asc'
+    write_grid(path, np.zeros((3, 4)))
+    with open(path, 'a') as f:
+        f.write('0 0 0 0\n')
+    with pytest.raises(ValueError):
+        read_ascii_grid(str(path))
+
+
+def test_lookup_reads_the_cell_under_the_point(grid):
+    soil = grid.lookup(11.5, 10.5)
+    assert [soil[layer] for layer in SOIL_LAYERS] == [10.0, 20.0, 30.0, 40.0, 50.0]
+    assert grid.lookup(9.5, 12.5)['clay_content'] == 10 + 10
+    assert soil['soil_type'] == texture_class(10.0, 20.0, 30.0)
+    assert grid.lookup(20.0, 10.5) is None and grid.lookup(11.5, 30.0) is None
+    # One layer without data makes the whole cell missing
+    assert grid.lookup(9.5, 13.5) is None
+
+
+def test_lookup_many_matches_lookup(grid):
+    lats = [11.5, 10.2, 9.9, 20.0, 9.5]
+    lons = [10.5, 12.7, 11.1, 10.5, 13.5]
+    values = grid.lookup_many(lats, lons)
+    for lat, lon, row in zip(lats, lons, values):
+        soil = grid.lookup(lat, lon)
+        if soil is None:
+            assert np.isnan(row).any()
+        else:
+            assert row.tolist() == [soil[layer] for layer in SOIL_LAYERS]
+
+
+def test_bilinear_lookup_blends_neighbouring_cells(grid):
+    # On a cell centre the cell's own value, halfway between two centres their mean
+    assert grid.lookup(10.5, 11.5, interpolate=True)['clay_content'] == pytest.approx(15.0)
+    assert grid.lookup(10.5, 12.0, interpolate=True)['clay_content'] == pytest.approx(15.5)
+    assert grid.lookup(11.0, 11.5, interpolate=True)['clay_content'] == pytest.approx(13.0)
+    # Edge centres have no outside neighbours to blend with
+    assert grid.lookup(11.5, 10.5, interpolate=True)['clay_content'] == pytest.approx(10.0)
+
+
+def test_rasters_must_share_one_grid(tmp_path):
+    sources = {layer: write_grid(tmp_path / f"{layer}.asc", np.zeros((3, 4))) for layer in SOIL_LAYERS}
+    sources['soil_ph'] = write_grid(tmp_path / 'small.asc', np.zeros((2, 4)))
+    with pytest.raises(ValueError):
+        convert_rasters(sources, str(tmp_path / 'soil_grid'))
+    with pytest.raises(ValueError):
+        convert_rasters({'clay_content': sources['clay_content']}, str(tmp_path / 'soil_grid'))
+    assert SoilGrid.open_if_exists(str(tmp_path / 'soil_grid')) is None
+
+
+def test_texture_classes():
+    assert texture_class(5, 90, 5) == 'sand'
+    assert texture_class(50, 20, 30) == 'clay'
+    assert texture_class(20, 40, 40) == 'loam'
+    assert texture_class(10, 20, 70) == 'silt loam'
@@ -0,0 +1,58 @@
+import time
+import sqlite3
+import pytest
+from climate_cache import grid_cell
+from storage import LocationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocationStore(str(tmp_path / 'plants.db'), resolution=1.0)
+    store.init_db()
+    return store
+
+
+def test_rollup_feeds_the_heatmap(store):
+    for _ in range(3):
+        store.save_location(10.2, 20.7)
+    store.save_location(-33.9, 151.2)
+    assert store.heatmap() == []
+
+    assert store.rollup() == 4
+    assert store.heatmap() == [(grid_cell(10.2, 20.7, 1.0), 3), (grid_cell(-33.9, 151.2, 1.0), 1)]
+    assert store.heatmap(days=1) == store.heatmap()
+    assert store.heatmap(bbox=(0, 0, 30, 30)) == [(grid_cell(10.2, 20.7, 1.0), 3)]
+    # Rows are counted once
+    assert store.rollup() == 0
+    assert store.heatmap(limit=1) == [(grid_cell(10.2, 20.7, 1.0), 3)]
+
+
+def test_background_rollup_keeps_the_heatmap_current(store):
+    store.save_location(10.2, 20.7)
+    store.start_rollup(0.05)
+    deadline = time.monotonic() + 5
+    while not store.heatmap() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert store.heatmap() == [(grid_cell(10.2, 20.7, 1.0), 1)]
+
+
+def test_the_web_app_rolls_up_by_default():
+    import app
+    assert app.LOCATION_ROLLUP_INTERVAL > 0
+
+
+def test_write_behind_inserts_return_their_ids(tmp_path):
+    store = LocationStore(str(tmp_path / 'plants.db'), write_behind=True)
+    store.init_db()
+    first = store.save_location(1.0, 2.0)
+    assert store.save_location(3.0, 4.0) == first + 1
+    assert tuple(store.get_location(first)) == (1.0, 2.0)
+
+
+def test_a_stalled_write_behind_insert_is_an_operational_error(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    store = LocationStore(str(tmp_path / 'plants.db'), write_behind=True, write_timeout=0.05)
+    store.init_db()
+    monkeypatch.setattr(store.writer, 'submit', lambda sql, params: Future())
+    with pytest.raises(sqlite3.OperationalError):
+        store.save_location(1.0, 2.0)
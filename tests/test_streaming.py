@@ -0,0 +1,58 @@
+import json
+import re
+import threading
+import app
+
+
+# Function to pull the receivePlants() updates out of a streamed page
+def updates(html):
+    return [json.loads(payload) for payload in re.findall(r'<script>receivePlants\((.*?)\);</script>', html)]
+
+
+def test_streamed_page_sends_cards_then_images(client, location_id):
+    response = client.get(f'/recommendations/{location_id}?stream=1')
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200 and response.headers['X-Accel-Buffering'] == 'no'
+    assert html.rstrip().endswith('</html>')
+
+    sent = updates(html)
+    plants = sent[0]['plants']
+    assert len(plants) == 5 and sent[0]['stale'] is False
+    assert all(plant['image'] == app.PLACEHOLDER_IMAGE for plant in plants)
+    images = {name: url for update in sent[1:-1] for name, url in update['images'].items()}
+    assert images == {plant['name']: f"https://images.test/{plant['name']}.jpg" for plant in plants}
+    assert sent[-1] == {'done': True}
+
+
+def test_shell_is_sent_before_the_recommendations(client, location_id, monkeypatch):
+    scored = threading.Event()
+    recommend_plants = app.recommend_plants
+
+    def slow_recommend_plants(*args, **kwargs):
+        assert scored.wait(5)
+        return recommend_plants(*args, **kwargs)
+    monkeypatch.setattr(app, 'recommend_plants', slow_recommend_plants)
+
+    response = client.get(f'/recommendations/{location_id}?stream=1', buffered=False)
+    chunks = response.iter_encoded()
+    shell = next(chunks).decode()
+    assert '<html' in shell and not updates(shell)
+    scored.set()
+    rest = b''.join(chunks).decode()
+    assert updates(rest)[0]['plants'] and updates(rest)[-1] == {'done': True}
+
+
+def test_a_failure_after_the_shell_is_shown_on_the_page(client, location_id, monkeypatch):
+    def failing_recommend_plants(*args, **kwargs):
+        raise RuntimeError('upstream exploded')
+    monkeypatch.setattr(app, 'recommend_plants', failing_recommend_plants)
+
+    response = client.get(f'/recommendations/{location_id}?stream=1')
+    assert response.status_code == 200
+    assert updates(response.get_data(as_text=True)) == [{'error': app.STREAM_ERROR_MESSAGE}, {'done': True}]
+
+
+def test_unstreamed_page_renders_the_cards(client, location_id):
+    html = client.get(f'/recommendations/{location_id}?stream=0').get_data(as_text=True)
+    assert 'https://images.test/' in html and not updates(html)
+    assert client.get('/recommendations/999').status_code == 302
@@ -0,0 +1,87 @@
+from datetime import timedelta
+import numpy as np
+import pytest
+import plant_model
+import app
+from climate_cache import ClimateCache
+from climate_tiles import ClimateTileStore, CLIMATE_COLUMNS
+from model_registry import ModelRegistry
+from plant_catalogue import catalogue
+from suitability import recommend_by_suitability, score_suitability, quick_recommendations
+
+
+def midpoint_land_data(plant_row):
+    return dict(zip(plant_model.FEATURE_COLUMNS, catalogue.midpoints[plant_row].tolist()))
+
+
+def midpoint_climate(plant_row):
+    return {column: midpoint_land_data(plant_row)[column] for column in CLIMATE_COLUMNS}
+
+
+# Plant names the scorer ranks first for this climate on the default soil. Several plants
+# can tie, so callers pass the climate exactly as stored (tiles round to float32).
+def expected_plants(climate, top_k):
+    land_data = {**climate, **plant_model.get_soil_data(10.0, 20.0)}
+    return [rec['plant'] for rec in recommend_by_suitability(land_data, top_k=top_k)]
+
+
+@pytest.fixture
+def no_local_climate(tmp_path, monkeypatch):
+    monkeypatch.setattr(plant_model, 'climate_cache', ClimateCache(str(tmp_path / 'climate_cache.db')))
+    monkeypatch.setattr(plant_model, 'climate_tiles', None)
+    monkeypatch.setattr(plant_model, 'climate_aggregates', None)
+
+
+# A tile store holding the midpoint climate of the given plant for the point's cell, fetched a year ago
+def old_tile(tmp_path, lat, lon, plant_row):
+    store = ClimateTileStore(str(tmp_path / 'tiles'), resolution=0.5, readonly=False)
+    start_date, end_date = plant_model.power_date_window()
+    start_date, end_date = start_date - timedelta(days=365), end_date - timedelta(days=365)
+    store.put_many([(store.cell_of(lat, lon), midpoint_climate(plant_row))],
+                   start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d'))
+    return store
+
+
+def test_each_plant_is_fully_suited_to_its_own_midpoints():
+    scores = score_suitability(catalogue.midpoints)
+    assert np.allclose(np.diag(scores), 1.0)
+    assert (scores <= 1.0).all() and (scores > 0.0).all()
+
+
+def test_recommendations_are_ranked_and_explain_misses():
+    recommendations = recommend_by_suitability(midpoint_land_data(0), top_k=3)
+    assert recommendations[0]['plant'] == catalogue.names[0]
+    assert recommendations[0]['outside_range'] == []
+    assert [rec['score'] for rec in recommendations] == sorted((rec['score'] for rec in recommendations), reverse=True)
+
+
+def test_quick_recommendations_use_tiles_from_any_window(no_local_climate, tmp_path, monkeypatch):
+    assert quick_recommendations(10.0, 20.0) == []
+    tiles = old_tile(tmp_path, 10.0, 20.0, 1)
+    monkeypatch.setattr(plant_model, 'climate_tiles', tiles)
+    # Too old for the live lookup, but good enough for the fallback
+    assert plant_model.local_climate_data(10.0, 20.0) == (None, False)
+    assert ([rec['plant'] for rec in quick_recommendations(10.0, 20.0, top_k=2)]
+            == expected_plants(tiles.get(10.0, 20.0), 2))
+
+
+def test_quick_recommendations_fall_back_to_the_cache(no_local_climate):
+    plant_model.climate_cache.set(10.0, 20.0, '20200101', '20201231', midpoint_climate(2))
+    assert [rec['plant'] for rec in quick_recommendations(10.0, 20.0, top_k=3)] == expected_plants(midpoint_climate(2), 3)
+
+
+def test_failed_climate_fetch_serves_degraded_recommendations(no_local_climate, nasa_stub, model_file, tmp_path,
+                                                              monkeypatch):
+    monkeypatch.setattr(app, 'model_registry', ModelRegistry(model_file))
+    monkeypatch.setattr(plant_model, 'NASA_POWER_DEADLINE', 0.5)
+    tiles = old_tile(tmp_path, 10.0, 20.0, 3)
+    monkeypatch.setattr(plant_model, 'climate_tiles', tiles)
+    nasa_stub.failure_rate = 1.0
+    try:
+        recommendations, stale = app.recommend_plants(10.0, 20.0, top_k=3)
+    finally:
+        plant_model.nasa_breaker.record_success()
+
+    assert stale is True
+    assert [rec['name'] for rec in recommendations] == expected_plants(tiles.get(10.0, 20.0), 3)
+    assert all(rec['degraded'] for rec in recommendations)
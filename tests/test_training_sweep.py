@@ -0,0 +1,43 @@
+import csv
+from conftest import synthetic_outcomes
+from plant_model import DEFAULT_FOREST_PARAMS
+from training_sweep import DEFAULT_GRID, cache_folds, run_sweep, sweep_configs
+
+
+def test_sweep_configs_cover_the_grid_or_a_sample():
+    grid = {'n_estimators': [5, 10], 'max_depth': [None, 3, 6]}
+    assert len(sweep_configs(grid)) == 6
+    sample = sweep_configs(grid, n_random=4, seed=1)
+    assert len(sample) == 4 and sample == sweep_configs(grid, n_random=4, seed=1)
+    assert all(config in sweep_configs(grid) for config in sample)
+
+
+def test_folds_are_cached_once(tmp_path):
+    X, y = synthetic_outcomes(rows_per_plant=10)
+    path = cache_folds(X, y, n_folds=3, cache_dir=str(tmp_path))
+    assert cache_folds(X, y, n_folds=3, cache_dir=str(tmp_path)) == path
+    assert cache_folds(X[1:], y[1:], n_folds=3, cache_dir=str(tmp_path)) != path
+
+
+def test_leaderboard_reports_the_parameters_used(tmp_path):
+    X, y = synthetic_outcomes(rows_per_plant=10)
+    configs = [{'n_estimators': 5}, {'n_estimators': 5, 'max_depth': 3, 'min_samples_leaf': 1}]
+    path = str(tmp_path / 'leaderboard.csv')
+
+    leaderboard = run_sweep(X, y, configs, n_folds=2, workers=1, leaderboard_path=path,
+                            cache_dir=str(tmp_path / 'folds'))
+
+    assert len(leaderboard) == 2
+    for row in leaderboard:
+        assert set(DEFAULT_GRID) <= set(row)
+        assert row['n_estimators'] == 5
+        assert row['min_samples_split'] == DEFAULT_FOREST_PARAMS['min_samples_split']
+        assert row['max_features'] == DEFAULT_FOREST_PARAMS['max_features']
+        assert 0.0 <= row['mean_accuracy'] <= 1.0
+    shallow = next(row for row in leaderboard if row['max_depth'] == 3)
+    assert shallow['min_samples_leaf'] == 1
+    default = next(row for row in leaderboard if row is not shallow)
+    assert default['min_samples_leaf'] == DEFAULT_FOREST_PARAMS['min_samples_leaf']
+    with open(path, newline='') as f:
+        assert [row['n_estimators'] for row in csv.DictReader(f)] == ['5', '5']
+    assert leaderboard[0]['mean_accuracy'] >= leaderboard[1]['mean_accuracy']
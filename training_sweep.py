@@ -0,0 +1,133 @@
+import os
+import csv
+import time
+import random
+import hashlib
+import itertools
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import KFold
+from sklearn.metrics import accuracy_score
+from plant_model import load_historical_data, prepare_data, plant_database, DEFAULT_FOREST_PARAMS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'fold_cache'
+DEFAULT_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_depth': [None, 10, 20],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2']
+}
+
+
+# Function to impute and scale each fold once and cache the result on disk.
+# Returns the cache file path; workers memory-map it instead of re-preprocessing.
+def cache_folds(X, y, n_folds=5, random_state=42, cache_dir=DEFAULT_CACHE_DIR):
+    digest = hashlib.sha1(np.ascontiguousarray(X).tobytes() + np.asarray(y, dtype=str).tobytes()
+                          + f"{n_folds}-{random_state}".encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"folds-{digest}.joblib")
+    if os.path.exists(path):
+        logger.info(f"Using cached folds {path}")
+        return path
+
+    folds = []
+    for train_index, test_index in KFold(n_folds, shuffle=True, random_state=random_state).split(X):
+        imputer = SimpleImputer(strategy='mean')
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(imputer.fit_transform(X[train_index]))
+        X_test = scaler.transform(imputer.transform(X[test_index]))
+        folds.append((X_train, X_test, y[train_index], y[test_index]))
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(folds, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    logger.info(f"Cached {n_folds} preprocessed folds in {path}")
+    return path
+
+# Function to list the configurations to try: the full grid, or n random draws from it
+def sweep_configs(grid=DEFAULT_GRID, n_random=None, seed=42):
+    keys = sorted(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if n_random is not None and n_random < len(configs):
+        configs = random.Random(seed).sample(configs, n_random)
+    return configs
+
+# Function to build the forest a configuration trains: train_model's defaults with the
+# configuration's values on top
+def sweep_estimator(config, n_jobs=1):
+    return RandomForestClassifier(**{**DEFAULT_FOREST_PARAMS, **config}, n_jobs=n_jobs)
+
+# Function to fit one configuration on one cached fold (runs in a worker process)
+def evaluate_fold(folds_path, fold_index, config, latency_repeats=50):
+    X_train, X_test, y_train, y_test = joblib.load(folds_path, mmap_mode='r')[fold_index]
+    model = sweep_estimator(config)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+
+    row = X_test[:1]
+    start = time.perf_counter()
+    for _ in range(latency_repeats):
+        model.predict_proba(row)
+    latency_ms = (time.perf_counter() - start) / latency_repeats * 1e3
+    return accuracy, fit_seconds, latency_ms
+
+# Function to cross-validate every configuration on a process pool and write a leaderboard
+def run_sweep(X, y, configs, n_folds=5, workers=None, leaderboard_path='leaderboard.csv',
+              cache_dir=DEFAULT_CACHE_DIR):
+    folds_path = cache_folds(X, y, n_folds, cache_dir=cache_dir)
+    jobs = [(c, f) for c in range(len(configs)) for f in range(n_folds)]
+    logger.info(f"Evaluating {len(configs)} configurations x {n_folds} folds on {workers or os.cpu_count()} processes")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(evaluate_fold, folds_path, f, configs[c]) for c, f in jobs]
+        results = [future.result() for future in futures]
+    logger.info(f"Sweep finished in {time.perf_counter() - start:.1f}s")
+
+    leaderboard = []
+    for c, config in enumerate(configs):
+        scores = np.array([r for (job_c, _), r in zip(jobs, results) if job_c == c])
+        # Parameters the configuration leaves out are reported at the value actually used
+        params = sweep_estimator(config).get_params()
+        leaderboard.append({
+            **{k: params[k] for k in sorted(DEFAULT_GRID)},
+            'mean_accuracy': float(scores[:, 0].mean()),
+            'std_accuracy': float(scores[:, 0].std()),
+            'mean_fit_seconds': float(scores[:, 1].mean()),
+            'predict_latency_ms': float(scores[:, 2].mean())
+        })
+    leaderboard.sort(key=lambda r: (-r['mean_accuracy'], r['predict_latency_ms']))
+
+    with open(leaderboard_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(leaderboard[0]))
+        writer.writeheader()
+        writer.writerows(leaderboard)
+    logger.info(f"Leaderboard written to {leaderboard_path}; best: {leaderboard[0]}")
+    return leaderboard
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter sweep for the plant model')
+    parser.add_argument('data', help='historical outcomes CSV')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--random', type=int, default=None, help='try N random configurations instead of the grid')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--leaderboard', default='leaderboard.csv')
+    args = parser.parse_args()
+
+    X, y = prepare_data(load_historical_data(args.data), plant_database)
+    run_sweep(X, y, sweep_configs(n_random=args.random), args.folds, args.workers, args.leaderboard)
+
+if __name__ == "__main__":
+    main()